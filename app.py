@@ -2,13 +2,21 @@
 
 import streamlit as st
 
-from src.data_loader import cargar_datos, render_file_upload_section
+from src.data_loader import (
+    cargar_datos_analiticos,
+    render_file_upload_section,
+    render_lotes_upload_section,
+    version_dataset,
+)
+from src.agregaciones import activar_motor
 from src.ui.theme import configure_page, apply_plotly_theme, inject_global_styles
 from src.ui.sidebar import render_sidebar_filters, render_sidebar_export
 from src.ui.header import render_header
 from src.ui.tabs import render_tabs
 from src.ui.reporting import render_report_section
 from src.ui.chat import render_chat_sidebar_config, render_chat_panel
+from src.ui.perfilador import iniciar_rerun, finalizar_rerun, medir, render_perfilador_sidebar
+from src.telemetria import iniciar_exposicion
 
 
 # =============================================================================
@@ -21,55 +29,68 @@ configure_page()
 # =============================================================================
 apply_plotly_theme()
 inject_global_styles()
+iniciar_exposicion()
+iniciar_rerun()
 
-
-# =============================================================================
-# 2. Carga de archivos (upload con defaults)
-# =============================================================================
-ruta_inv, ruta_feed, ruta_trans = render_file_upload_section()
-
+# El rerun se cierra aunque el script termine antes (st.stop) o Streamlit
+# lo interrumpa por un cambio de widget.
 try:
-    df_dss, health_scores, metricas_calidad = cargar_datos(
-        ruta_inv, ruta_feed, ruta_trans
-    )
-except Exception as e:
-    st.error(f"❌ Error al cargar los datos: {e}")
-    st.stop()
-
-
-# =============================================================================
-# 3. Sidebar – Filtros globales y exportación
-# =============================================================================
-df_filtrado = render_sidebar_filters(df_dss)
-df_filtrado.rename(columns={"Bodega_Origen_x":"Bodega_Origen"}, inplace=True)
-render_sidebar_export(df_filtrado)
-
-
-# =============================================================================
-# 4. Sidebar – Configuración del chat IA
-# =============================================================================
-render_chat_sidebar_config()
-render_report_section(df_filtrado, health_scores, metricas_calidad)
-
-
-# =============================================================================
-# 5. Layout principal: contenido (izq) + chat (der)
-# =============================================================================
-col_main, col_chat = st.columns([3, 1])
-
-with col_main:
-    # ── Encabezado principal
-    render_header(df_filtrado, health_scores)
-
-    # ── Navegación por pestañas
-    render_tabs(df_filtrado, health_scores, metricas_calidad)
-
-with col_chat:
-    render_chat_panel(df_filtrado, health_scores)
-
-
-# =============================================================================
-# Footer
-# =============================================================================
-st.sidebar.markdown("---")
-st.sidebar.caption("© 2026 TechLogistics S.A.S – Dashboard de Auditoría Técnica")
+    # =========================================================================
+    # 2. Carga de archivos (upload con defaults)
+    # =========================================================================
+    ruta_inv, ruta_feed, ruta_trans = render_file_upload_section()
+    rutas_lotes = render_lotes_upload_section()
+
+    try:
+        (df_dss, almacen_exportacion, health_scores, metricas_calidad,
+         traza_pipeline) = cargar_datos_analiticos(ruta_inv, ruta_feed, ruta_trans, rutas_lotes)
+        st.session_state["version_dataset"] = version_dataset(
+            ruta_inv, ruta_feed, ruta_trans, rutas_lotes
+        )
+        activar_motor(df_dss, st.session_state["version_dataset"])
+    except Exception as e:
+        st.error(f"❌ Error al cargar los datos: {e}")
+        st.stop()
+
+    # =========================================================================
+    # 3. Sidebar – Filtros globales y exportación
+    # =========================================================================
+    with medir("render_sidebar_filters"):
+        df_filtrado = render_sidebar_filters(df_dss)
+    with medir("render_sidebar_export"):
+        render_sidebar_export(df_filtrado, almacen_exportacion, metricas_calidad)
+
+    # =========================================================================
+    # 4. Sidebar – Configuración del chat IA
+    # =========================================================================
+    render_chat_sidebar_config()
+    with medir("render_report_section"):
+        render_report_section(df_filtrado, health_scores, metricas_calidad)
+    render_perfilador_sidebar()
+
+    # =========================================================================
+    # 5. Layout principal: contenido (izq) + chat (der)
+    # =========================================================================
+    col_main, col_chat = st.columns([3, 1])
+
+    with col_main:
+        # ── Encabezado principal
+        with medir("render_header"):
+            render_header(df_filtrado, health_scores, columnas_modelo=len(almacen_exportacion.orden))
+
+        # ── Navegación por pestañas
+        with medir("render_tabs"):
+            render_tabs(df_filtrado, health_scores, metricas_calidad, traza=traza_pipeline,
+                        almacen=almacen_exportacion)
+
+    with col_chat:
+        with medir("render_chat_panel"):
+            render_chat_panel(df_filtrado, health_scores)
+
+    # =========================================================================
+    # Footer
+    # =========================================================================
+    st.sidebar.markdown("---")
+    st.sidebar.caption("© 2026 TechLogistics S.A.S – Dashboard de Auditoría Técnica")
+finally:
+    finalizar_rerun()
@@ -0,0 +1,2 @@
+# -*- coding: utf-8 -*-
+"""Benchmarks de rendimiento del DSS (ver ``benchmarks.ejecutar``)."""
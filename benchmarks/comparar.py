@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Compara dos resultados de ``benchmarks.ejecutar`` (p. ej. dos commits).
+
+Para cada (tamaño, etapa) presente en ambos informes muestra la variación
+del tiempo mediano y del pico de memoria asignada, y termina con código 1
+si alguna etapa empeora más que el umbral.
+
+Uso:
+    python -m benchmarks.comparar benchmarks/resultados/abc123.json \\
+        benchmarks/resultados/def456.json --umbral 0.10
+"""
+import argparse
+import json
+import sys
+
+_METRICAS = (("tiempo_mediana_s", "tiempo"), ("asignado_pico_mb", "memoria"))
+
+
+def _indexar(informe: dict) -> dict:
+    return {(r["tamano"], r["etapa"]): r for r in informe["resultados"]
+            if "error" not in r}
+
+
+def comparar(base: dict, nuevo: dict, umbral: float) -> list:
+    """Filas de comparación; ``regresion`` indica si supera el umbral."""
+    filas = []
+    a, b = _indexar(base), _indexar(nuevo)
+    for clave in sorted(set(a) & set(b)):
+        for campo, etiqueta in _METRICAS:
+            antes, despues = a[clave].get(campo), b[clave].get(campo)
+            if not antes or despues is None:
+                continue
+            cambio = (despues - antes) / antes
+            filas.append({
+                "tamano": clave[0], "etapa": clave[1], "metrica": etiqueta,
+                "antes": antes, "despues": despues,
+                "cambio": round(cambio, 4), "regresion": cambio > umbral,
+            })
+    return filas
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compara dos informes de benchmarks.")
+    parser.add_argument("base")
+    parser.add_argument("nuevo")
+    parser.add_argument("--umbral", type=float, default=0.10,
+                        help="Empeoramiento relativo tolerado (0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    with open(args.base, encoding="utf-8") as fh:
+        base = json.load(fh)
+    with open(args.nuevo, encoding="utf-8") as fh:
+        nuevo = json.load(fh)
+
+    filas = comparar(base, nuevo, args.umbral)
+    print(f"{base['commit']} → {nuevo['commit']}  (umbral {args.umbral:.0%})")
+    for f in filas:
+        marca = "  ✗" if f["regresion"] else ""
+        print(f"{f['tamano']:>11,}  {f['etapa']:<30} {f['metrica']:<8}"
+              f" {f['antes']:>10.3f} → {f['despues']:>10.3f}"
+              f"  {f['cambio']:+7.1%}{marca}")
+    regresiones = [f for f in filas if f["regresion"]]
+    if regresiones:
+        print(f"{len(regresiones)} regresiones por encima del umbral", file=sys.stderr)
+    return 1 if regresiones else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
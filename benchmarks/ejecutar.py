@@ -0,0 +1,292 @@
+# -*- coding: utf-8 -*-
+"""
+Suite de benchmarks de extremo a extremo del DSS.
+
+Mide, sin navegador, cada etapa caliente de la app sobre datasets sintéticos
+(``src.sinteticos``) de varios tamaños:
+
+- ``cargar_datos``: pipeline completo de limpieza y consolidación.
+- ``pagina_*``: cada función ``mostrar_*`` de ``src/paginas`` (cálculos y
+  construcción de figuras; Streamlit corre en modo *bare* y no dibuja).
+- ``resumen_chat``: ``_resumen_dataframe`` del asistente IA.
+- ``reporte_pdf``: ``generar_reporte_ejecutivo_pdf``.
+
+Cada (tamaño, etapa) se ejecuta en un proceso nuevo para que el pico de RSS
+sea atribuible a la etapa. Por etapa se registra el tiempo de pared (mínimo
+y mediana de N repeticiones), el pico de RSS del proceso y su incremento
+durante la etapa, y el pico de memoria asignada según ``tracemalloc`` (en
+una pasada aparte, para no contaminar los tiempos).
+
+El resultado es un JSON en ``benchmarks/resultados/<commit>.json`` que se
+compara entre commits con ``python -m benchmarks.comparar``.
+
+Uso:
+    python -m benchmarks.ejecutar --tamanos 10000 100000 1000000
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import pickle
+import platform
+import resource
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DIR_DATOS = os.path.join(RAIZ, "benchmarks", ".datos")
+DIR_RESULTADOS = os.path.join(RAIZ, "benchmarks", "resultados")
+
+ETAPAS = (
+    "cargar_datos",
+    "pagina_resumen_ejecutivo",
+    "pagina_fuga_capital",
+    "pagina_crisis_logistica",
+    "pagina_venta_invisible",
+    "pagina_diagnostico_fidelidad",
+    "pagina_riesgo_operativo",
+    "pagina_salud_datos",
+    "resumen_chat",
+    "reporte_pdf",
+)
+
+
+# =====================================================================
+#  Datos de entrada
+# =====================================================================
+
+def _dir_tamano(tamano: int, semilla: int) -> str:
+    return os.path.join(DIR_DATOS, f"s{semilla}_n{tamano}")
+
+
+def _rutas_csv(directorio: str) -> tuple:
+    from src.sinteticos import (
+        ARCHIVO_FEEDBACK, ARCHIVO_INVENTARIO, ARCHIVO_TRANSACCIONES,
+    )
+    return tuple(os.path.join(directorio, a) for a in
+                 (ARCHIVO_INVENTARIO, ARCHIVO_FEEDBACK, ARCHIVO_TRANSACCIONES))
+
+
+def _ruta_dss(directorio: str) -> str:
+    """Dataset consolidado en caché, por código del pipeline y versión de pandas.
+
+    Así cada commit mide las páginas, el chat y el reporte sobre el frame
+    que produce su propio pipeline, no sobre el del primer commit que corrió.
+    """
+    import pandas
+    from src.dataset_compartido import huella_codigo
+
+    return os.path.join(directorio, f"dss_{huella_codigo()}_pandas{pandas.__version__}.pkl")
+
+
+def preparar_datos(tamano: int, semilla: int) -> str:
+    """Genera los CSV (una sola vez) y el dataset consolidado del código actual."""
+    from src.data_loader import construir_dataset_dss
+    from src.sinteticos import generar_datos_sinteticos
+
+    directorio = _dir_tamano(tamano, semilla)
+    rutas = _rutas_csv(directorio)
+    if not all(os.path.exists(r) for r in rutas):
+        generar_datos_sinteticos(directorio, tamano, semilla=semilla)
+    ruta_dss = _ruta_dss(directorio)
+    if not os.path.exists(ruta_dss):
+        # Los de otros commits o versiones de pandas ya no se leen.
+        for viejo in glob.glob(os.path.join(directorio, "dss*.pkl")):
+            os.remove(viejo)
+        with open(ruta_dss, "wb") as fh:
+            pickle.dump(construir_dataset_dss(*rutas), fh,
+                        protocol=pickle.HIGHEST_PROTOCOL)
+    return directorio
+
+
+# =====================================================================
+#  Etapas (se ejecutan dentro del proceso hijo)
+# =====================================================================
+
+def _etapa(nombre: str, directorio: str):
+    """Devuelve ``(preparar, ejecutar)`` para una etapa.
+
+    ``preparar`` se llama antes de cada repetición (fuera del cronómetro) y
+    entrega los argumentos de ``ejecutar``.
+    """
+    if nombre == "cargar_datos":
+        from src.data_loader import construir_dataset_dss
+        rutas = _rutas_csv(directorio)
+        return (lambda: rutas), (lambda rutas: construir_dataset_dss(*rutas))
+
+    with open(_ruta_dss(directorio), "rb") as fh:
+        df_dss, health_scores, metricas_calidad = pickle.load(fh)
+    from src.columnas import proyectar
+    # El mismo frame analítico (de solo lectura) que reciben las páginas en
+    # app.py; se comparte entre repeticiones porque nadie lo modifica.
+    df_base, _ = proyectar(df_dss)
+
+    def frame():
+        return df_base
+
+    if nombre == "resumen_chat":
+        from src.ui.chat import _resumen_dataframe
+        return frame, _resumen_dataframe
+    if nombre == "reporte_pdf":
+        from src.reportes import generar_reporte_ejecutivo_pdf
+        return frame, lambda df: generar_reporte_ejecutivo_pdf(
+            df, health_scores, metricas_calidad)
+
+    import src.paginas as paginas
+    funciones = {
+        "pagina_resumen_ejecutivo": lambda df: paginas.mostrar_resumen_ejecutivo(
+            df, health_scores, metricas_calidad),
+        "pagina_fuga_capital": paginas.mostrar_fuga_capital,
+        "pagina_crisis_logistica": paginas.mostrar_crisis_logistica,
+        "pagina_venta_invisible": paginas.mostrar_venta_invisible,
+        "pagina_diagnostico_fidelidad": paginas.mostrar_diagnostico_fidelidad,
+        "pagina_riesgo_operativo": paginas.mostrar_riesgo_operativo,
+        "pagina_salud_datos": lambda df: paginas.mostrar_salud_datos(
+            df, metricas_calidad),
+    }
+    return frame, funciones[nombre]
+
+
+def _rss_mb() -> float:
+    """RSS actual del proceso (Linux: /proc; otros: pico como aproximación)."""
+    try:
+        with open("/proc/self/statm") as fh:
+            paginas = int(fh.read().split()[1])
+        return paginas * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return _pico_rss_mb()
+
+
+def _pico_rss_mb() -> float:
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa KiB; macOS, bytes.
+    return pico / 2**20 if sys.platform == "darwin" else pico / 2**10
+
+
+def medir_etapa(nombre: str, directorio: str, repeticiones: int) -> dict:
+    """Mide una etapa en el proceso actual (llamado en el proceso hijo)."""
+    logging.getLogger("streamlit").setLevel(logging.ERROR)
+    preparar, ejecutar = _etapa(nombre, directorio)
+
+    rss_antes = _rss_mb()
+    pico_antes = _pico_rss_mb()
+    tiempos = []
+    for _ in range(repeticiones):
+        args = preparar()
+        inicio = time.perf_counter()
+        ejecutar(args)
+        tiempos.append(time.perf_counter() - inicio)
+        del args
+    pico_despues = _pico_rss_mb()
+
+    args = preparar()
+    tracemalloc.start()
+    ejecutar(args)
+    _, pico_asignado = tracemalloc.get_traced_memory()
+    bloques = len(tracemalloc.take_snapshot().traces)
+    tracemalloc.stop()
+
+    return {
+        "tiempo_min_s": round(min(tiempos), 4),
+        "tiempo_mediana_s": round(statistics.median(tiempos), 4),
+        "repeticiones": repeticiones,
+        "rss_base_mb": round(rss_antes, 1),
+        "rss_pico_mb": round(pico_despues, 1),
+        "rss_incremento_pico_mb": round(max(0.0, pico_despues - pico_antes), 1),
+        "asignado_pico_mb": round(pico_asignado / 2**20, 2),
+        "bloques_vivos": bloques,
+    }
+
+
+# =====================================================================
+#  Orquestación
+# =====================================================================
+
+def _commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=RAIZ,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "desconocido"
+
+
+def _versiones() -> dict:
+    import numpy
+    import pandas
+    return {"python": platform.python_version(), "pandas": pandas.__version__,
+            "numpy": numpy.__version__}
+
+
+def ejecutar_suite(tamanos, etapas=ETAPAS, repeticiones: int = 3,
+                   semilla: int = 42) -> dict:
+    from src.dataset_compartido import huella_codigo
+
+    resultados = []
+    for tamano in tamanos:
+        print(f"· preparando datos n={tamano:,}", file=sys.stderr)
+        directorio = preparar_datos(tamano, semilla)
+        for etapa in etapas:
+            proc = subprocess.run(
+                [sys.executable, "-m", "benchmarks.ejecutar", "--interno",
+                 "--etapa", etapa, "--datos", directorio,
+                 "--repeticiones", str(repeticiones)],
+                cwd=RAIZ, capture_output=True, text=True,
+            )
+            fila = {"tamano": tamano, "etapa": etapa}
+            if proc.returncode == 0:
+                fila.update(json.loads(proc.stdout.strip().splitlines()[-1]))
+                print(f"  {etapa:<30} {fila['tiempo_mediana_s']:>9.3f} s  "
+                      f"pico RSS {fila['rss_pico_mb']:>8.1f} MB", file=sys.stderr)
+            else:
+                fila["error"] = proc.stderr.strip().splitlines()[-1:] or ["?"]
+                print(f"  {etapa:<30} ERROR {fila['error'][0]}", file=sys.stderr)
+            resultados.append(fila)
+
+    return {
+        "commit": _commit(),
+        "fecha": datetime.now().isoformat(timespec="seconds"),
+        "plataforma": platform.platform(),
+        "versiones": _versiones(),
+        "huella_pipeline": huella_codigo(),
+        "semilla": semilla,
+        "repeticiones": repeticiones,
+        "resultados": resultados,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmarks del DSS.")
+    parser.add_argument("--tamanos", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--etapas", nargs="+", choices=ETAPAS, default=list(ETAPAS))
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--salida", default=None)
+    # Uso interno: medir una etapa en este proceso e imprimir JSON.
+    parser.add_argument("--interno", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--etapa", help=argparse.SUPPRESS)
+    parser.add_argument("--datos", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.interno:
+        print(json.dumps(medir_etapa(args.etapa, args.datos, args.repeticiones)))
+        return 0
+
+    informe = ejecutar_suite(args.tamanos, args.etapas, args.repeticiones,
+                             args.semilla)
+    salida = args.salida or os.path.join(DIR_RESULTADOS, f"{informe['commit']}.json")
+    os.makedirs(os.path.dirname(salida) or ".", exist_ok=True)
+    with open(salida, "w", encoding="utf-8") as fh:
+        json.dump(informe, fh, ensure_ascii=False, indent=2)
+    print(f"Resultados en {salida}")
+    return 1 if any("error" in r for r in informe["resultados"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
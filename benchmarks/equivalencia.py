@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+"""
+Arnés de equivalencia diferencial entre motores del pipeline.
+
+Ejecuta el pipeline pandas actual como **referencia** y un **motor
+candidato** sobre los mismos CSV, y compara sus salidas:
+
+- Cada dataframe intermedio y final (inventario, feedback, transacciones y
+  dataset consolidado), columna a columna: presencia, tipo lógico, máscara
+  de nulos y valores, con tolerancia relativa/absoluta para numéricos.
+- Los diccionarios de ``metricas_calidad`` (incluidos los textos con montos
+  formateados, cuyos números se comparan con la misma tolerancia).
+
+También informa el tiempo de cada etapa en ambos motores y el speedup.
+
+Un motor candidato es cualquier módulo importable que defina alguna de
+``procesar_inventario``, ``procesar_feedback``, ``procesar_transacciones`` y
+``crear_dataset_consolidado`` con las mismas firmas que ``src``; las etapas
+que no defina se toman de la referencia.
+
+Uso:
+    python -m benchmarks.equivalencia mi_paquete.motor_rapido
+    python -m benchmarks.equivalencia mi_paquete.motor_rapido --sintetico 1000000
+"""
+import argparse
+import importlib
+import json
+import math
+import os
+import re
+import sys
+import time
+import types
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.ejecutar import DIR_DATOS, _rutas_csv
+
+ETAPAS = ("procesar_inventario", "procesar_feedback",
+          "procesar_transacciones", "crear_dataset_consolidado")
+
+_NUMERO = re.compile(r"-?\d[\d,]*\.?\d*(?:[eE][-+]?\d+)?")
+_MAX_EJEMPLOS = 5
+
+
+# =====================================================================
+#  Motores
+# =====================================================================
+
+def motor_referencia() -> types.SimpleNamespace:
+    from src.data_loader import crear_dataset_consolidado
+    from src.feedback import procesar_feedback
+    from src.inventario import procesar_inventario
+    from src.transacciones import procesar_transacciones
+    return types.SimpleNamespace(
+        nombre="referencia (pandas)",
+        procesar_inventario=procesar_inventario,
+        procesar_feedback=procesar_feedback,
+        procesar_transacciones=procesar_transacciones,
+        crear_dataset_consolidado=crear_dataset_consolidado,
+    )
+
+
+def cargar_motor(nombre_modulo: str) -> types.SimpleNamespace:
+    """Importa un motor candidato, completando con la referencia lo que falte."""
+    modulo = importlib.import_module(nombre_modulo)
+    referencia = motor_referencia()
+    propias = [e for e in ETAPAS if callable(getattr(modulo, e, None))]
+    if not propias:
+        raise ValueError(f"{nombre_modulo} no define ninguna de {', '.join(ETAPAS)}")
+    motor = types.SimpleNamespace(nombre=nombre_modulo, etapas_propias=propias)
+    for etapa in ETAPAS:
+        setattr(motor, etapa, getattr(modulo, etapa, None) or getattr(referencia, etapa))
+    return motor
+
+
+def ejecutar_motor(motor, ruta_inv: str, ruta_feed: str, ruta_trans: str) -> dict:
+    """Corre las cuatro etapas y devuelve salidas y tiempos por etapa."""
+    tiempos = {}
+
+    def medir(etapa, *args):
+        inicio = time.perf_counter()
+        resultado = getattr(motor, etapa)(*args)
+        tiempos[etapa] = time.perf_counter() - inicio
+        return resultado
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        df_inv, met_inv = medir("procesar_inventario", ruta_inv)
+        df_feed, met_feed = medir("procesar_feedback", ruta_feed)
+        df_trans, met_trans = medir("procesar_transacciones", ruta_trans, df_inv, df_feed)
+        df_dss = medir("crear_dataset_consolidado", df_trans, df_inv, df_feed)
+
+    return {
+        "dataframes": {"inventario": df_inv, "feedback": df_feed,
+                       "transacciones": df_trans, "consolidado": df_dss},
+        "metricas": {"inventario": met_inv, "feedback": met_feed,
+                     "transacciones": met_trans},
+        "tiempos": tiempos,
+    }
+
+
+# =====================================================================
+#  Comparación
+# =====================================================================
+
+def _tipo_logico(serie: pd.Series) -> str:
+    if pd.api.types.is_bool_dtype(serie):
+        return "booleano"
+    if pd.api.types.is_numeric_dtype(serie):
+        return "numerico"
+    if pd.api.types.is_datetime64_any_dtype(serie):
+        return "fecha"
+    # Columnas object que solo contienen números (p. ej. enteros y floats
+    # mezclados tras un ``transform``) son numéricas a efectos lógicos; si
+    # solo tienen nulos, su tipo no se puede determinar.
+    inferido = pd.api.types.infer_dtype(serie, skipna=True)
+    if inferido in ("integer", "floating", "mixed-integer-float", "decimal"):
+        return "numerico"
+    if inferido == "empty":
+        return "nulo"
+    return "texto"
+
+
+def _ejemplos(indices, ref: pd.Series, cand: pd.Series) -> list:
+    return [{"fila": int(i), "referencia": _json(ref.iloc[i]),
+             "candidato": _json(cand.iloc[i])} for i in indices[:_MAX_EJEMPLOS]]
+
+
+def _json(valor):
+    if valor is None or (not isinstance(valor, str) and pd.isna(valor)):
+        return None
+    if hasattr(valor, "item"):
+        return valor.item()
+    if isinstance(valor, pd.Timestamp):
+        return valor.isoformat()
+    return valor if isinstance(valor, (int, float, bool, str)) else str(valor)
+
+
+def comparar_columna(ref: pd.Series, cand: pd.Series, rtol: float, atol: float) -> dict:
+    """Diferencias entre dos columnas alineadas por posición."""
+    tipo_ref, tipo_cand = _tipo_logico(ref), _tipo_logico(cand)
+    if "nulo" in (tipo_ref, tipo_cand):
+        # Una columna sin valores solo equivale a otra igual de vacía.
+        tipo_ref = tipo_cand = "nulo"
+    # Booleanos y numéricos son intercambiables si los valores coinciden.
+    numericos = {tipo_ref, tipo_cand} <= {"numerico", "booleano"}
+    if tipo_ref != tipo_cand and not numericos:
+        return {"tipo": f"{tipo_ref} ≠ {tipo_cand}", "diferencias": len(ref)}
+
+    nulos_ref = ref.isna().to_numpy()
+    nulos_cand = cand.isna().to_numpy()
+    distintos = nulos_ref != nulos_cand
+    ambos = ~nulos_ref & ~nulos_cand
+
+    if numericos:
+        a = ref.to_numpy(dtype="float64", na_value=np.nan)
+        b = cand.to_numpy(dtype="float64", na_value=np.nan)
+        distintos |= ambos & ~np.isclose(a, b, rtol=rtol, atol=atol)
+    elif tipo_ref == "fecha":
+        distintos |= ambos & (ref.to_numpy() != cand.to_numpy())
+    else:
+        distintos |= ambos & (ref.astype(str).to_numpy() != cand.astype(str).to_numpy())
+
+    indices = np.flatnonzero(distintos)
+    resultado = {"diferencias": int(len(indices))}
+    if tipo_ref != tipo_cand:
+        resultado["tipo"] = f"{tipo_ref} ≈ {tipo_cand}"
+    if len(indices):
+        resultado["ejemplos"] = _ejemplos(indices, ref, cand)
+    return resultado
+
+
+def comparar_dataframes(ref: pd.DataFrame, cand: pd.DataFrame, rtol: float,
+                        atol: float, clave: str = None) -> dict:
+    """Compara dos dataframes columna a columna.
+
+    Con ``clave`` ambos se ordenan por esa columna antes de comparar (para
+    motores que no preservan el orden de las filas).
+    """
+    informe = {
+        "filas": [len(ref), len(cand)],
+        "solo_referencia": sorted(set(ref.columns) - set(cand.columns)),
+        "solo_candidato": sorted(set(cand.columns) - set(ref.columns)),
+        "columnas": {},
+    }
+    if len(ref) != len(cand):
+        informe["equivalente"] = False
+        return informe
+
+    if clave and clave in ref.columns and clave in cand.columns:
+        ref = ref.sort_values(clave, kind="stable")
+        cand = cand.sort_values(clave, kind="stable")
+    ref = ref.reset_index(drop=True)
+    cand = cand.reset_index(drop=True)
+
+    for columna in ref.columns:
+        if columna in cand.columns:
+            informe["columnas"][columna] = comparar_columna(
+                ref[columna], cand[columna], rtol, atol)
+
+    informe["equivalente"] = (
+        not informe["solo_referencia"] and not informe["solo_candidato"]
+        and all(c["diferencias"] == 0 for c in informe["columnas"].values())
+    )
+    return informe
+
+
+def _valores_iguales(a, b, rtol: float, atol: float) -> bool:
+    if isinstance(a, dict) and isinstance(b, dict):
+        return a.keys() == b.keys() and all(
+            _valores_iguales(a[k], b[k], rtol, atol) for k in a)
+    if isinstance(a, str) and isinstance(b, str):
+        # Montos formateados ("$1,234.56"): mismo texto salvo los números.
+        if _NUMERO.sub("#", a) != _NUMERO.sub("#", b):
+            return False
+        na = [float(x.replace(",", "")) for x in _NUMERO.findall(a)]
+        nb = [float(x.replace(",", "")) for x in _NUMERO.findall(b)]
+        return len(na) == len(nb) and all(
+            math.isclose(x, y, rel_tol=rtol, abs_tol=atol) for x, y in zip(na, nb))
+    try:
+        fa, fb = float(a), float(b)
+    except (TypeError, ValueError):
+        return a == b
+    if math.isnan(fa) or math.isnan(fb):
+        return math.isnan(fa) and math.isnan(fb)
+    return math.isclose(fa, fb, rel_tol=rtol, abs_tol=atol)
+
+
+def comparar_metricas(ref: dict, cand: dict, rtol: float, atol: float) -> dict:
+    """Claves faltantes, sobrantes y distintas entre dos dicts de métricas."""
+    distintas = {
+        k: {"referencia": _json(ref[k]) if not isinstance(ref[k], dict) else ref[k],
+            "candidato": _json(cand[k]) if not isinstance(cand[k], dict) else cand[k]}
+        for k in ref.keys() & cand.keys()
+        if not _valores_iguales(ref[k], cand[k], rtol, atol)
+    }
+    informe = {
+        "solo_referencia": sorted(ref.keys() - cand.keys()),
+        "solo_candidato": sorted(cand.keys() - ref.keys()),
+        "distintas": distintas,
+    }
+    informe["equivalente"] = not any(informe.values())
+    return informe
+
+
+_CLAVES = {"inventario": "SKU_ID", "feedback": "Feedback_ID",
+           "transacciones": "Transaccion_ID", "consolidado": "Transaccion_ID"}
+
+
+def comparar_motores(candidato, rutas: tuple, rtol: float = 1e-9,
+                     atol: float = 1e-9, ignorar_orden: bool = False) -> dict:
+    referencia = motor_referencia()
+    salida_ref = ejecutar_motor(referencia, *rutas)
+    salida_cand = ejecutar_motor(candidato, *rutas)
+
+    dataframes = {
+        nombre: comparar_dataframes(
+            salida_ref["dataframes"][nombre], salida_cand["dataframes"][nombre],
+            rtol, atol, _CLAVES[nombre] if ignorar_orden else None)
+        for nombre in salida_ref["dataframes"]
+    }
+    metricas = {
+        nombre: comparar_metricas(salida_ref["metricas"][nombre],
+                                  salida_cand["metricas"][nombre], rtol, atol)
+        for nombre in salida_ref["metricas"]
+    }
+    tiempos = {
+        etapa: {
+            "referencia_s": round(salida_ref["tiempos"][etapa], 4),
+            "candidato_s": round(salida_cand["tiempos"][etapa], 4),
+            "speedup": round(salida_ref["tiempos"][etapa]
+                             / max(salida_cand["tiempos"][etapa], 1e-9), 2),
+        }
+        for etapa in ETAPAS
+    }
+    total_ref = sum(salida_ref["tiempos"].values())
+    total_cand = sum(salida_cand["tiempos"].values())
+    tiempos["total"] = {"referencia_s": round(total_ref, 4),
+                        "candidato_s": round(total_cand, 4),
+                        "speedup": round(total_ref / max(total_cand, 1e-9), 2)}
+
+    return {
+        "candidato": candidato.nombre,
+        "etapas_propias": getattr(candidato, "etapas_propias", list(ETAPAS)),
+        "entradas": list(rutas),
+        "tolerancia": {"rtol": rtol, "atol": atol},
+        "equivalente": all(d["equivalente"] for d in dataframes.values())
+                       and all(m["equivalente"] for m in metricas.values()),
+        "dataframes": dataframes,
+        "metricas": metricas,
+        "tiempos": tiempos,
+    }
+
+
+# =====================================================================
+#  CLI
+# =====================================================================
+
+def _imprimir(informe: dict) -> None:
+    print(f"Candidato: {informe['candidato']}  "
+          f"(etapas propias: {', '.join(informe['etapas_propias'])})")
+    for nombre, d in informe["dataframes"].items():
+        estado = "✓" if d["equivalente"] else "✗"
+        print(f"  {estado} {nombre:<14} filas {d['filas'][0]:,} / {d['filas'][1]:,}")
+        for col in d["solo_referencia"]:
+            print(f"      falta columna {col}")
+        for col in d["solo_candidato"]:
+            print(f"      columna extra {col}")
+        for col, c in d["columnas"].items():
+            if c["diferencias"] or "tipo" in c:
+                print(f"      {col}: {c['diferencias']:,} diferencias"
+                      + (f" [{c['tipo']}]" if "tipo" in c else ""))
+    for nombre, m in informe["metricas"].items():
+        estado = "✓" if m["equivalente"] else "✗"
+        print(f"  {estado} metricas {nombre}")
+        for clave, v in m["distintas"].items():
+            print(f"      {clave}: {v['referencia']!r} ≠ {v['candidato']!r}")
+        for clave in m["solo_referencia"]:
+            print(f"      falta {clave}")
+    print("  Tiempos (s)           referencia   candidato   speedup")
+    for etapa, t in informe["tiempos"].items():
+        print(f"    {etapa:<26} {t['referencia_s']:>9.3f} {t['candidato_s']:>11.3f}"
+              f" {t['speedup']:>8.2f}x")
+    print("EQUIVALENTE" if informe["equivalente"] else "NO EQUIVALENTE")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Compara un motor candidato contra el pipeline pandas de referencia.")
+    parser.add_argument("candidato", help="Módulo importable del motor candidato")
+    parser.add_argument("--datos", default="data",
+                        help="Directorio con los tres CSV (por defecto data/)")
+    parser.add_argument("--sintetico", type=int, default=None,
+                        help="Usar datos sintéticos de N transacciones")
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--rtol", type=float, default=1e-9)
+    parser.add_argument("--atol", type=float, default=1e-9)
+    parser.add_argument("--ignorar-orden", action="store_true",
+                        help="Ordenar por la clave de cada tabla antes de comparar")
+    parser.add_argument("--salida", default=None, help="Guardar el informe JSON")
+    args = parser.parse_args(argv)
+
+    if args.sintetico:
+        from src.sinteticos import generar_datos_sinteticos
+        directorio = os.path.join(DIR_DATOS, f"s{args.semilla}_n{args.sintetico}")
+        rutas = _rutas_csv(directorio)
+        if not all(os.path.exists(r) for r in rutas):
+            generar_datos_sinteticos(directorio, args.sintetico, semilla=args.semilla)
+    else:
+        rutas = _rutas_csv(args.datos)
+
+    informe = comparar_motores(cargar_motor(args.candidato), rutas,
+                               args.rtol, args.atol, args.ignorar_orden)
+    _imprimir(informe)
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as fh:
+            json.dump(informe, fh, ensure_ascii=False, indent=2, default=str)
+    return 0 if informe["equivalente"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,144 @@
+# -*- coding: utf-8 -*-
+"""
+Perfil de tiempo de importación del arranque de la app.
+
+Ejecuta ``python -X importtime`` sobre los mismos módulos que importa
+``app.py`` (en un intérprete limpio, varias veces) y resume qué paquetes
+dominan el tiempo hasta el primer render. El resultado en Markdown se
+guarda en ``docs/Perfil_Importacion_Arranque.md``.
+
+Uso:
+    python scripts/perfil_importacion.py [--repeticiones 5] [--salida RUTA]
+"""
+import argparse
+import ast
+import os
+import platform
+import re
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from datetime import datetime
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_LINEA = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s+)(\S+)")
+_PESADOS = ("matplotlib", "reportlab", "groq", "openpyxl")
+
+
+def _modulos_de_app(ruta_app: str) -> list:
+    """Módulos importados en el nivel superior de ``app.py``."""
+    with open(ruta_app, encoding="utf-8-sig") as fh:
+        arbol = ast.parse(fh.read())
+    modulos = []
+    for nodo in arbol.body:
+        if isinstance(nodo, ast.ImportFrom) and nodo.module:
+            modulos.append(nodo.module)
+        elif isinstance(nodo, ast.Import):
+            modulos.extend(alias.name for alias in nodo.names)
+    return modulos
+
+
+def _medir(modulos: list) -> tuple:
+    """Una corrida de ``-X importtime``: (propio por paquete, acumulado directo)."""
+    codigo = "; ".join(f"import {m}" for m in modulos)
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", codigo],
+        cwd=RAIZ, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    propio = defaultdict(int)
+    acumulado = {}
+    for linea in proc.stderr.splitlines():
+        m = _LINEA.match(linea)
+        if not m:
+            continue
+        self_us, cum_us, sangria, nombre = m.groups()
+        propio[nombre.split(".")[0]] += int(self_us)
+        if len(sangria) == 1:
+            acumulado[nombre] = int(cum_us)
+    return propio, acumulado
+
+
+def perfilar(repeticiones: int = 5) -> dict:
+    modulos = _modulos_de_app(os.path.join(RAIZ, "app.py"))
+    corridas = [_medir(modulos) for _ in range(repeticiones)]
+
+    def _mediana(dicts):
+        claves = set().union(*dicts)
+        return {k: statistics.median(d.get(k, 0) for d in dicts) for k in claves}
+
+    propio = _mediana([c[0] for c in corridas])
+    acumulado = _mediana([c[1] for c in corridas])
+    return {
+        "modulos_app": modulos,
+        "total_ms": sum(propio.values()) / 1000,
+        "propio": propio,
+        "acumulado": acumulado,
+    }
+
+
+def a_markdown(perfil: dict, repeticiones: int, top: int = 15) -> str:
+    total = perfil["total_ms"]
+    lineas = [
+        "# Perfil de importación del arranque",
+        "",
+        f"Generado con `python scripts/perfil_importacion.py` el "
+        f"{datetime.now().strftime('%Y-%m-%d')} "
+        f"(Python {platform.python_version()}, mediana de {repeticiones} "
+        f"corridas en frío). Mide solo la importación de los módulos que "
+        f"carga `app.py`; no incluye la carga de datos ni el render.",
+        "",
+        f"**Tiempo total de importación:** {total:,.0f} ms",
+        "",
+        "## Paquetes que dominan el arranque (tiempo propio agregado)",
+        "",
+        "| Paquete | ms | % del total |",
+        "|---|---:|---:|",
+    ]
+    for nombre, us in sorted(perfil["propio"].items(), key=lambda kv: -kv[1])[:top]:
+        lineas.append(f"| `{nombre}` | {us / 1000:,.1f} | {us / 1000 / total * 100:.1f}% |")
+
+    lineas += [
+        "",
+        "## Importaciones de primer nivel (tiempo acumulado)",
+        "",
+        "| Módulo | ms |",
+        "|---|---:|",
+    ]
+    for nombre, us in sorted(perfil["acumulado"].items(), key=lambda kv: -kv[1])[:top]:
+        lineas.append(f"| `{nombre}` | {us / 1000:,.1f} |")
+
+    cargados = [p for p in _PESADOS if perfil["propio"].get(p)]
+    lineas += [
+        "",
+        "## Librerías pesadas de uso diferido",
+        "",
+        "matplotlib, ReportLab, groq y openpyxl se importan solo al generar un "
+        "reporte, usar el chat o exportar. "
+        + (f"**Atención:** en este perfil aparecen cargadas en el arranque: "
+           f"{', '.join(cargados)}." if cargados else
+           "Ninguna aparece en el perfil de arranque."),
+        "",
+    ]
+    return "\n".join(lineas)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--salida", default=os.path.join(
+        RAIZ, "docs", "Perfil_Importacion_Arranque.md"))
+    args = parser.parse_args(argv)
+
+    perfil = perfilar(args.repeticiones)
+    with open(args.salida, "w", encoding="utf-8") as fh:
+        fh.write(a_markdown(perfil, args.repeticiones))
+    print(f"Importación total: {perfil['total_ms']:,.0f} ms → {args.salida}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+Servidor local compatible con la API de chat de OpenAI/Groq, para pruebas.
+
+Responde ``/chat/completions`` (con y sin ``stream``) con un texto fijo y
+puede simular limitación de tasa: con ``--limitar-cada N`` una de cada N
+solicitudes recibe ``429`` con ``Retry-After``. Sirve para ejercitar el
+planificador de solicitudes (``src.asistente.cola``) y el pool de clientes
+sin red ni API key real.
+
+Uso:
+    python scripts/servidor_llm_simulado.py --puerto 8765 --limitar-cada 3
+    GROQ_BASE_URL=http://127.0.0.1:8765 streamlit run app.py
+"""
+import argparse
+import itertools
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_FRAGMENTOS = ["Respuesta ", "simulada ", "del ", "asistente."]
+
+
+class _Manejador(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+        pass
+
+    def _json(self, estado: int, cuerpo: dict, headers=None) -> None:
+        datos = json.dumps(cuerpo).encode()
+        self.send_response(estado)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(datos)))
+        for nombre, valor in (headers or {}).items():
+            self.send_header(nombre, valor)
+        self.end_headers()
+        self.wfile.write(datos)
+
+    def _evento(self, datos: str) -> None:
+        bloque = f"data: {datos}\n\n".encode()
+        self.wfile.write(f"{len(bloque):x}\r\n".encode() + bloque + b"\r\n")
+        self.wfile.flush()
+
+    def do_POST(self):
+        largo = int(self.headers.get("Content-Length", 0))
+        cuerpo = json.loads(self.rfile.read(largo) or b"{}")
+        servidor = self.server
+        numero = next(servidor.contador)
+
+        if servidor.limitar_cada and numero % servidor.limitar_cada == 0:
+            self._json(429, {"error": {"message": "rate limit (simulado)"}},
+                       {"Retry-After": str(servidor.retry_after)})
+            return
+
+        modelo = cuerpo.get("model", "simulado")
+        if not cuerpo.get("stream"):
+            self._json(200, {
+                "id": f"sim-{numero}", "object": "chat.completion",
+                "created": int(time.time()), "model": modelo,
+                "choices": [{"index": 0, "finish_reason": "stop",
+                             "message": {"role": "assistant",
+                                         "content": "".join(_FRAGMENTOS)}}],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1,
+                          "total_tokens": 2},
+            })
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        for i, texto in enumerate(_FRAGMENTOS + [None]):
+            time.sleep(servidor.latencia_s)
+            delta = {"content": texto} if texto else {}
+            self._evento(json.dumps({
+                "id": f"sim-{numero}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": modelo,
+                "choices": [{"index": 0, "delta": delta,
+                             "finish_reason": None if texto else "stop"}],
+            }))
+        self._evento("[DONE]")
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+
+def iniciar(puerto: int = 0, limitar_cada: int = 0, retry_after: float = 0.1,
+            latencia_s: float = 0.05) -> ThreadingHTTPServer:
+    """Arranca el servidor en un hilo de fondo y lo devuelve.
+
+    La URL base es ``http://127.0.0.1:<servidor.server_port>``.
+    """
+    servidor = ThreadingHTTPServer(("127.0.0.1", puerto), _Manejador)
+    servidor.contador = itertools.count(1)
+    servidor.limitar_cada = limitar_cada
+    servidor.retry_after = retry_after
+    servidor.latencia_s = latencia_s
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    return servidor
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--puerto", type=int, default=8765)
+    parser.add_argument("--limitar-cada", type=int, default=0,
+                        help="Responder 429 a una de cada N solicitudes (0 = nunca)")
+    parser.add_argument("--retry-after", type=float, default=0.1)
+    parser.add_argument("--latencia", type=float, default=0.05,
+                        help="Segundos entre fragmentos del stream")
+    args = parser.parse_args(argv)
+
+    servidor = iniciar(args.puerto, args.limitar_cada, args.retry_after,
+                       args.latencia)
+    print(f"Servidor simulado en http://127.0.0.1:{servidor.server_port}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        servidor.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+Agregados de las páginas con motor intercambiable (pandas o DuckDB).
+
+Cada función recibe ``df_filtrado`` y devuelve el mismo dataframe que el
+``groupby`` pandas original de la página. Con ``DSS_MOTOR_AGREGACIONES=duckdb``
+y el motor activado para la sesión (``activar_motor(df_dss, version)`` en
+``app.py``) el agregado se calcula en SQL sobre el dataset completo con el
+estado de filtros de la barra lateral (ver ``src.motor_duckdb``); en otro
+caso, o si algo falla, se usa pandas.
+"""
+import logging
+
+import pandas as pd
+import streamlit as st
+
+from src import config
+
+logger = logging.getLogger(__name__)
+
+
+# =====================================================================
+#  Motor de la sesión
+# =====================================================================
+
+def _duckdb_disponible() -> bool:
+    try:
+        import duckdb  # noqa: F401
+        import pyarrow  # noqa: F401
+    except ImportError:
+        logger.warning("DSS_MOTOR_AGREGACIONES=duckdb pero duckdb/pyarrow no están instalados; se usa pandas")
+        return False
+    return True
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _motor_duckdb(version: str, _df_dss: pd.DataFrame):
+    """Motor DuckDB del dataset *version*, compartido por todas las sesiones."""
+    from src.motor_duckdb import MotorDuckDB
+
+    return MotorDuckDB(_df_dss)
+
+
+def activar_motor(df_dss: pd.DataFrame, version: str) -> None:
+    """Deja el motor configurado disponible para las páginas de esta sesión."""
+    motor = None
+    if config.MOTOR_AGREGACIONES == "duckdb" and version and _duckdb_disponible():
+        motor = _motor_duckdb(version, df_dss)
+    st.session_state["motor_agregaciones"] = motor
+
+
+def _consultar(consulta: str, **argumentos):
+    """Resultado DuckDB para la vista actual, o ``None`` para usar pandas."""
+    motor = st.session_state.get("motor_agregaciones")
+    filtros = st.session_state.get("filtros_activos")
+    if motor is None or filtros is None:
+        return None
+    try:
+        return motor.consultar(consulta, filtros, st.session_state.get("hash_filtros"),
+                               **argumentos)
+    except Exception:
+        logger.exception("Consulta DuckDB %s fallida; se usa pandas", consulta)
+        return None
+
+
+# =====================================================================
+#  Agregados (la versión pandas es la referencia)
+# =====================================================================
+
+def riesgo_sku(df_filtrado: pd.DataFrame) -> pd.DataFrame:
+    """Margen, ingreso y unidades por (SKU, categoría): matriz de riesgo."""
+    resultado = _consultar("riesgo_sku")
+    if resultado is not None:
+        return resultado.copy()
+    return df_filtrado.groupby(["SKU_ID", "Categoria"]).agg({
+        "margen_real": "sum",
+        "ingreso_total": "sum",
+        "Cantidad_Vendida": "sum"
+    }).reset_index()
+
+
+def eficiencia_canal(df_filtrado: pd.DataFrame, canal_col: str) -> pd.DataFrame:
+    """Margen e ingreso por canal (o bodega)."""
+    resultado = _consultar("eficiencia_canal", canal_col=canal_col)
+    if resultado is not None:
+        return resultado.copy()
+    return df_filtrado.groupby(canal_col).agg({
+        "margen_real": "sum",
+        "ingreso_total": "sum"
+    }).reset_index()
+
+
+def top_categorias(df_filtrado: pd.DataFrame) -> pd.DataFrame:
+    """Ingreso, margen y transacciones por categoría (índice ``Categoria``)."""
+    resultado = _consultar("top_categorias")
+    if resultado is not None:
+        return resultado.set_index("Categoria")
+    return df_filtrado.groupby("Categoria").agg({
+        "ingreso_total": "sum",
+        "margen_real": "sum",
+        "Transaccion_ID": "count"
+    })
+
+
+def serie_venta_invisible(df_filtrado: pd.DataFrame) -> pd.DataFrame:
+    """Ingreso y transacciones mensuales de las ventas sin inventario."""
+    resultado = _consultar("serie_venta_invisible")
+    if resultado is not None:
+        return resultado.copy()
+    df_sin_inv = df_filtrado[df_filtrado["venta_sin_inventario"]]
+    df_tiempo = (
+        df_sin_inv
+        .groupby(df_sin_inv["Fecha_Venta"].dt.to_period("M"))
+        .agg(
+            ingreso_total=("ingreso_total", "sum"),
+            transacciones=("Transaccion_ID", "count")
+        )
+        .reset_index()
+    )
+    df_tiempo["Fecha_Venta"] = df_tiempo["Fecha_Venta"].astype(str)
+    return df_tiempo
+
+
+def riesgo_bodega(df_filtrado: pd.DataFrame, fecha_referencia) -> pd.DataFrame:
+    """Días sin revisión, tasa de tickets e ingresos expuestos por bodega."""
+    resultado = _consultar("riesgo_bodega", fecha_referencia=fecha_referencia)
+    if resultado is not None:
+        return resultado.copy()
+    revision = pd.to_datetime(df_filtrado["Ultima_Revision"], errors="coerce")
+    # Frame angosto con la derivada: ``df_filtrado`` es de solo lectura.
+    df = pd.DataFrame({
+        "Bodega_Origen": df_filtrado["Bodega_Origen"],
+        "Ticket_Soporte": df_filtrado["Ticket_Soporte"],
+        "ingreso_total": df_filtrado["ingreso_total"],
+        "dias_sin_revision": (fecha_referencia - revision).dt.days,
+    })
+    return (
+        df
+        .dropna(subset=["dias_sin_revision"])
+        .groupby("Bodega_Origen")
+        .agg(
+            Dias_Sin_Revision=("dias_sin_revision", "mean"),
+            Tasa_Tickets_Soporte=("Ticket_Soporte", lambda x: x.mean() * 100),
+            Ingresos_Expuestos=("ingreso_total", "sum")
+        )
+        .reset_index()
+    )
@@ -0,0 +1,3 @@
+# -*- coding: utf-8 -*-
+
+"""Servicios del asistente IA (clientes LLM, contexto, caché) sin dependencia de la UI."""
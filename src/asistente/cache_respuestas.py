@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+"""
+Caché de respuestas del asistente para preguntas repetidas.
+
+La clave es (pregunta normalizada, modelo, hash de filtros, versión del
+dataset): la misma pregunta sobre la misma vista de los mismos datos
+devuelve la respuesta ya generada sin llamar al proveedor. Las entradas
+caducan por TTL y el tamaño está acotado (se expulsa la menos usada).
+
+Solo se cachean preguntas que abren conversación: una respuesta a un
+seguimiento ("¿y en Bogotá?") depende del historial y no es reutilizable.
+"""
+import hashlib
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+from src import config
+
+_PUNTUACION = re.compile(r"[^\w\s]")
+_ESPACIOS = re.compile(r"\s+")
+
+
+def normalizar_pregunta(pregunta: str) -> str:
+    """Minúsculas, sin tildes, sin puntuación y con espacios colapsados."""
+    texto = unicodedata.normalize("NFKD", pregunta or "")
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    texto = _PUNTUACION.sub(" ", texto.lower())
+    return _ESPACIOS.sub(" ", texto).strip()
+
+
+def clave_respuesta(pregunta: str, modelo: str, hash_filtros: str,
+                    version_dataset: str) -> str:
+    base = "\x1f".join(
+        (normalizar_pregunta(pregunta), modelo, hash_filtros, version_dataset))
+    return hashlib.sha1(base.encode("utf-8")).hexdigest()
+
+
+class CacheRespuestas:
+    """Caché LRU con TTL, segura para uso concurrente entre sesiones."""
+
+    def __init__(self, max_entradas: int = None, ttl_s: float = None,
+                 reloj=time.monotonic):
+        self._max = max_entradas or config.CHAT_CACHE_MAX_ENTRADAS
+        self._ttl_s = ttl_s if ttl_s is not None else config.CHAT_CACHE_TTL_S
+        self._reloj = reloj
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.expirados = 0
+        self.expulsados = 0
+
+    def obtener(self, clave: str):
+        """Devuelve la respuesta cacheada o ``None``."""
+        ahora = self._reloj()
+        with self._lock:
+            entrada = self._entradas.get(clave)
+            if entrada is not None and ahora - entrada[0] > self._ttl_s:
+                del self._entradas[clave]
+                self.expirados += 1
+                entrada = None
+            if entrada is None:
+                self.fallos += 1
+                return None
+            self._entradas.move_to_end(clave)
+            self.aciertos += 1
+            return entrada[1]
+
+    def guardar(self, clave: str, respuesta: str) -> None:
+        if not respuesta:
+            return
+        with self._lock:
+            self._entradas[clave] = (self._reloj(), respuesta)
+            self._entradas.move_to_end(clave)
+            while len(self._entradas) > self._max:
+                self._entradas.popitem(last=False)
+                self.expulsados += 1
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "entradas": len(self._entradas),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "tasa_aciertos": round(self.aciertos / consultas, 3) if consultas else None,
+                "expirados": self.expirados,
+                "expulsados": self.expulsados,
+            }
@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+Pool de clientes LLM reutilizables por proceso.
+
+Cada combinación (API key, modelo) obtiene un único cliente con conexiones
+HTTP keep-alive que se comparte entre reruns y sesiones de Streamlit. El
+pool está acotado (se expulsa el cliente usado hace más tiempo) y descarta
+los clientes inactivos. Por cada cliente registra solicitudes, conexiones
+nuevas vs. reutilizadas y latencias.
+
+Los clientes se usan en préstamo (``with pool.prestar(api_key, modelo) as
+cliente``): un cliente expulsado mientras tiene préstamos en curso sale del
+pool de inmediato, pero su ``http_client`` se cierra al devolver el último.
+
+La fábrica de clientes es inyectable: en pruebas basta con apuntar el
+cliente a un servidor HTTP local (``base_url``) en lugar del proveedor.
+"""
+import hashlib
+import logging
+import threading
+import time
+import weakref
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from src import config
+from src.telemetria import percentil
+
+logger = logging.getLogger(__name__)
+
+_MUESTRAS_LATENCIA = 200
+
+
+def _huella_key(api_key: str) -> str:
+    """Identificador no reversible de la API key (nunca se guarda en claro)."""
+    return hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+class _EstadoCliente:
+    """Cliente del pool más sus contadores."""
+
+    def __init__(self, cliente, http_client, ahora: float):
+        self.cliente = cliente
+        self.http_client = http_client
+        self.creado = ahora
+        self.ultimo_uso = ahora
+        self.solicitudes = 0
+        self.conexiones_nuevas = 0
+        self.conexiones_reutilizadas = 0
+        self.latencias_ms = deque(maxlen=_MUESTRAS_LATENCIA)
+        self.ttft_ms = deque(maxlen=_MUESTRAS_LATENCIA)
+        self._conexiones = weakref.WeakSet()
+        self._lock = threading.Lock()
+        # Préstamos en curso y si ya salió del pool (protegidos por el lock del pool)
+        self.prestamos = 0
+        self.expulsado = False
+
+    def observar_respuesta(self, response) -> None:
+        """Hook de httpx: clasifica la conexión usada como nueva o reutilizada."""
+        stream = response.extensions.get("network_stream")
+        with self._lock:
+            self.solicitudes += 1
+            if stream is None:
+                return
+            try:
+                if stream in self._conexiones:
+                    self.conexiones_reutilizadas += 1
+                else:
+                    self._conexiones.add(stream)
+                    self.conexiones_nuevas += 1
+            except TypeError:
+                # Stream sin soporte de weakref: no se puede clasificar.
+                pass
+
+    def resumen(self) -> dict:
+        with self._lock:
+            observadas = self.conexiones_nuevas + self.conexiones_reutilizadas
+            return {
+                "solicitudes": self.solicitudes,
+                "conexiones_nuevas": self.conexiones_nuevas,
+                "conexiones_reutilizadas": self.conexiones_reutilizadas,
+                "tasa_reutilizacion": (
+                    round(self.conexiones_reutilizadas / observadas, 3)
+                    if observadas else None
+                ),
+                "latencia_p50_ms": percentil(self.latencias_ms, 0.5),
+                "latencia_p95_ms": percentil(self.latencias_ms, 0.95),
+                "ttft_p50_ms": percentil(self.ttft_ms, 0.5),
+            }
+
+
+def fabrica_groq(api_key: str, modelo: str, observar_respuesta):
+    """Crea un cliente Groq con un ``httpx.Client`` keep-alive propio.
+
+    Devuelve ``(cliente, http_client)``. El cliente respeta ``GROQ_BASE_URL``.
+    """
+    import httpx
+    from groq import Groq
+
+    http_client = httpx.Client(
+        limits=httpx.Limits(
+            max_connections=config.CHAT_KEEPALIVE_CONEXIONES,
+            max_keepalive_connections=config.CHAT_KEEPALIVE_CONEXIONES,
+            keepalive_expiry=config.CHAT_KEEPALIVE_EXPIRA_S,
+        ),
+        timeout=config.CHAT_TIMEOUT_S,
+        event_hooks={"response": [observar_respuesta]},
+    )
+    # Los reintentos ante 429 los gestiona el planificador (src.asistente.cola).
+    cliente = Groq(api_key=api_key, http_client=http_client, max_retries=0)
+    return cliente, http_client
+
+
+class PoolClientesLLM:
+    """Pool acotado de clientes LLM, seguro para uso concurrente."""
+
+    def __init__(self, fabrica=fabrica_groq,
+                 max_clientes: int = None,
+                 inactividad_s: float = None,
+                 reloj=time.monotonic):
+        self._fabrica = fabrica
+        self._max = max_clientes or config.CHAT_POOL_MAX_CLIENTES
+        self._inactividad_s = (
+            inactividad_s if inactividad_s is not None
+            else config.CHAT_POOL_INACTIVIDAD_S
+        )
+        self._reloj = reloj
+        self._clientes = OrderedDict()
+        self._lock = threading.Lock()
+        self.creados = 0
+        self.expulsados = 0
+
+    # ── Ciclo de vida ─────────────────────────────────────────────
+    @contextmanager
+    def prestar(self, api_key: str, modelo: str):
+        """Presta el cliente para (api_key, modelo), creándolo si hace falta.
+
+        Mientras dure el bloque ``with`` el cliente no se cierra aunque el
+        pool lo expulse (por capacidad, inactividad o ``cerrar``).
+        """
+        clave = (_huella_key(api_key), modelo)
+        ahora = self._reloj()
+        with self._lock:
+            self._expulsar_inactivos(ahora)
+            estado = self._clientes.get(clave)
+            if estado is None:
+                while len(self._clientes) >= self._max:
+                    self._expulsar(next(iter(self._clientes)), "capacidad")
+                estado = self._crear(api_key, modelo, ahora)
+                self._clientes[clave] = estado
+            else:
+                self._clientes.move_to_end(clave)
+            estado.ultimo_uso = ahora
+            estado.prestamos += 1
+        try:
+            yield estado.cliente
+        finally:
+            with self._lock:
+                estado.prestamos -= 1
+                estado.ultimo_uso = self._reloj()
+                cerrar = estado.expulsado and estado.prestamos == 0
+            if cerrar:
+                self._cerrar_http(estado)
+
+    def _crear(self, api_key, modelo, ahora) -> _EstadoCliente:
+        estado = _EstadoCliente(None, None, ahora)
+        estado.cliente, estado.http_client = self._fabrica(
+            api_key, modelo, estado.observar_respuesta)
+        self.creados += 1
+        logger.info("pool_llm cliente creado modelo=%s activos=%d",
+                    modelo, len(self._clientes) + 1)
+        return estado
+
+    def _expulsar_inactivos(self, ahora: float) -> None:
+        vencidos = [
+            clave for clave, estado in self._clientes.items()
+            if ahora - estado.ultimo_uso > self._inactividad_s
+        ]
+        for clave in vencidos:
+            self._expulsar(clave, "inactividad")
+
+    def _expulsar(self, clave, motivo: str) -> None:
+        estado = self._clientes.pop(clave)
+        estado.expulsado = True
+        self.expulsados += 1
+        logger.info("pool_llm cliente expulsado modelo=%s motivo=%s prestamos=%d",
+                    clave[1], motivo, estado.prestamos)
+        # Con préstamos en curso lo cierra quien devuelva el último.
+        if estado.prestamos == 0:
+            self._cerrar_http(estado)
+
+    @staticmethod
+    def _cerrar_http(estado: _EstadoCliente) -> None:
+        if estado.http_client is not None:
+            try:
+                estado.http_client.close()
+            except Exception:
+                logger.debug("pool_llm error al cerrar cliente", exc_info=True)
+
+    def cerrar(self) -> None:
+        with self._lock:
+            for clave in list(self._clientes):
+                self._expulsar(clave, "cierre")
+
+    # ── Métricas ──────────────────────────────────────────────────
+    def registrar_latencia(self, api_key: str, modelo: str,
+                           total_ms: float, ttft_ms: float = None) -> None:
+        """Registra la latencia de una solicitud completada."""
+        with self._lock:
+            estado = self._clientes.get((_huella_key(api_key), modelo))
+        if estado is None or total_ms is None:
+            return
+        with estado._lock:
+            estado.latencias_ms.append(total_ms)
+            if ttft_ms is not None:
+                estado.ttft_ms.append(ttft_ms)
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            items = list(self._clientes.items())
+        return {
+            "activos": len(items),
+            "creados": self.creados,
+            "expulsados": self.expulsados,
+            "clientes": {
+                f"{huella}/{modelo}": estado.resumen()
+                for (huella, modelo), estado in items
+            },
+        }
@@ -0,0 +1,199 @@
+# -*- coding: utf-8 -*-
+"""
+Planificador de solicitudes al proveedor LLM compartido por el proceso.
+
+Todas las sesiones de Streamlit pasan por aquí antes de llamar al modelo:
+
+- **Concurrencia acotada**: como máximo ``max_concurrencia`` solicitudes en
+  curso a la vez; el resto espera en cola.
+- **Cola justa por sesión**: cada sesión tiene su propia cola y los turnos se
+  reparten por round-robin entre sesiones, así una sesión con muchas
+  preguntas seguidas no deja sin servicio a las demás.
+- **Reintentos ante 429**: backoff exponencial con jitter, respetando
+  ``Retry-After`` cuando el proveedor lo envía.
+- **Plazo total**: la espera en cola y los reintentos comparten un mismo
+  presupuesto de tiempo; si se agota se lanza ``PlazoAgotado``.
+
+Los scripts de Streamlit son síncronos (un hilo por rerun), por lo que el
+planificador se implementa con hilos y una ``threading.Condition`` en lugar
+de un event loop. No depende de Streamlit ni del SDK del proveedor.
+"""
+import logging
+import random
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+
+from src import config
+from src.telemetria import contador, histograma, percentil
+
+logger = logging.getLogger(__name__)
+
+_MUESTRAS = 500
+
+_ESPERA_COLA = histograma("dss_chat_espera_cola_segundos",
+                          "Espera en la cola del planificador LLM")
+_REINTENTOS_429 = contador("dss_chat_reintentos_429_total",
+                           "Reintentos por respuestas 429 del proveedor")
+
+
+class PlazoAgotado(TimeoutError):
+    """La solicitud no pudo completarse dentro de su presupuesto de tiempo."""
+
+
+def _es_rate_limit(exc: Exception) -> bool:
+    return getattr(exc, "status_code", None) == 429
+
+
+def _retry_after(exc: Exception):
+    """Segundos indicados por el header ``Retry-After``, si existe."""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return max(0.0, float(headers.get("retry-after")))
+    except (TypeError, ValueError):
+        return None
+
+
+class PlanificadorLLM:
+    """Cola justa con límite de concurrencia, reintentos y métricas."""
+
+    def __init__(self, max_concurrencia: int = None, reintentos: int = None,
+                 backoff_base_s: float = None, backoff_max_s: float = None,
+                 plazo_s: float = None, reloj=time.monotonic, dormir=time.sleep):
+        self.max_concurrencia = max_concurrencia or config.CHAT_MAX_CONCURRENCIA
+        self.reintentos = reintentos if reintentos is not None else config.CHAT_REINTENTOS_429
+        self.backoff_base_s = backoff_base_s or config.CHAT_BACKOFF_BASE_S
+        self.backoff_max_s = backoff_max_s or config.CHAT_BACKOFF_MAX_S
+        self.plazo_s = plazo_s or config.CHAT_PLAZO_S
+        self._reloj = reloj
+        self._dormir = dormir
+
+        self._cond = threading.Condition()
+        self._colas = OrderedDict()     # sesion -> deque de solicitudes
+        self._activos = 0
+
+        self.completadas = 0
+        self.fallidas = 0
+        self.plazos_agotados = 0
+        self.reintentos_429 = 0
+        self.profundidad_max = 0
+        self._esperas_ms = deque(maxlen=_MUESTRAS)
+        self._duraciones_ms = deque(maxlen=_MUESTRAS)
+
+    # ── Admisión ──────────────────────────────────────────────────
+    def _en_cola(self) -> int:
+        return sum(len(c) for c in self._colas.values())
+
+    def _es_su_turno(self, sesion, solicitud) -> bool:
+        if self._activos >= self.max_concurrencia:
+            return False
+        primera = next(iter(self._colas))
+        return primera == sesion and self._colas[sesion][0] is solicitud
+
+    def _retirar(self, sesion, solicitud, rotar: bool) -> None:
+        cola = self._colas[sesion]
+        cola.remove(solicitud)
+        if not cola:
+            del self._colas[sesion]
+        elif rotar:
+            # Round-robin: la sesión atendida pasa al final de la rotación.
+            self._colas.move_to_end(sesion)
+
+    @contextmanager
+    def turno(self, sesion: str, plazo_s: float = None):
+        """Bloquea hasta obtener un turno de ejecución para *sesion*.
+
+        Produce el instante límite (reloj monotónico) de la solicitud, que
+        debe usarse para los reintentos dentro del turno. Lanza
+        ``PlazoAgotado`` si el turno no llega a tiempo.
+        """
+        inicio = self._reloj()
+        limite = inicio + (plazo_s or self.plazo_s)
+        solicitud = object()
+        with self._cond:
+            self._colas.setdefault(sesion, deque()).append(solicitud)
+            self.profundidad_max = max(self.profundidad_max, self._en_cola())
+            while not self._es_su_turno(sesion, solicitud):
+                restante = limite - self._reloj()
+                if restante <= 0:
+                    self._retirar(sesion, solicitud, rotar=False)
+                    self.plazos_agotados += 1
+                    self._cond.notify_all()
+                    raise PlazoAgotado(
+                        "El asistente está atendiendo muchas consultas; "
+                        "se agotó el tiempo de espera en la cola."
+                    )
+                self._cond.wait(restante)
+            self._retirar(sesion, solicitud, rotar=True)
+            self._activos += 1
+            espera_ms = (self._reloj() - inicio) * 1000
+            self._esperas_ms.append(espera_ms)
+            self._cond.notify_all()
+
+        _ESPERA_COLA.observar(espera_ms / 1000)
+        if espera_ms >= 1:
+            logger.info("cola_llm sesion=%s espera_ms=%.1f", sesion[:8], espera_ms)
+        t0 = self._reloj()
+        exito = False
+        try:
+            yield limite
+            exito = True
+        finally:
+            with self._cond:
+                self._activos -= 1
+                self._duraciones_ms.append((self._reloj() - t0) * 1000)
+                if exito:
+                    self.completadas += 1
+                else:
+                    self.fallidas += 1
+                self._cond.notify_all()
+
+    # ── Reintentos ────────────────────────────────────────────────
+    def con_reintentos(self, funcion, limite: float):
+        """Ejecuta *funcion* reintentando los 429 hasta el instante *limite*."""
+        intento = 0
+        while True:
+            try:
+                return funcion()
+            except Exception as exc:
+                if not _es_rate_limit(exc) or intento >= self.reintentos:
+                    raise
+                espera = _retry_after(exc)
+                if espera is None:
+                    espera = min(self.backoff_max_s,
+                                 self.backoff_base_s * (2 ** intento))
+                    espera *= 0.5 + random.random() / 2
+                if self._reloj() + espera > limite:
+                    with self._cond:
+                        self.plazos_agotados += 1
+                    raise PlazoAgotado(
+                        "El proveedor limitó las solicitudes (429) y no queda "
+                        "tiempo para reintentar."
+                    ) from exc
+                intento += 1
+                with self._cond:
+                    self.reintentos_429 += 1
+                _REINTENTOS_429.inc()
+                logger.info("cola_llm 429 reintento=%d espera_s=%.2f", intento, espera)
+                self._dormir(espera)
+
+    # ── Métricas ──────────────────────────────────────────────────
+    def estadisticas(self) -> dict:
+        with self._cond:
+            return {
+                "max_concurrencia": self.max_concurrencia,
+                "activos": self._activos,
+                "en_cola": self._en_cola(),
+                "sesiones_en_cola": len(self._colas),
+                "profundidad_max": self.profundidad_max,
+                "completadas": self.completadas,
+                "fallidas": self.fallidas,
+                "plazos_agotados": self.plazos_agotados,
+                "reintentos_429": self.reintentos_429,
+                "espera_p50_ms": percentil(self._esperas_ms, 0.5),
+                "espera_p95_ms": percentil(self._esperas_ms, 0.95),
+                "duracion_p50_ms": percentil(self._duraciones_ms, 0.5),
+                "duracion_p95_ms": percentil(self._duraciones_ms, 0.95),
+            }
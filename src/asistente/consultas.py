@@ -0,0 +1,369 @@
+# -*- coding: utf-8 -*-
+"""
+Motor local de consultas agregadas para el asistente IA.
+
+El modelo no recibe filas del dataset: pide agregados mediante la
+herramienta ``consultar_agregado`` y el motor los calcula localmente sobre
+el dataframe de la vista actual. El motor es un sandbox: solo acepta
+columnas de una lista blanca, un conjunto cerrado de agregaciones y
+operadores de filtro, y limita el tamaño de la respuesta. Nunca evalúa
+expresiones arbitrarias.
+
+Los resultados se cachean por (vista, consulta normalizada), de modo que
+dos formulaciones equivalentes de la misma pregunta comparten resultado.
+"""
+import json
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# Columnas categóricas por las que se puede agrupar o filtrar
+DIMENSIONES = (
+    "Categoria",
+    "Ciudad_Destino",
+    "Bodega_Origen",
+    "Canal_Venta",
+    "Estado_Envio",
+    "NPS_Categoria",
+)
+
+# Columnas numéricas que se pueden agregar
+METRICAS = (
+    "ingreso_total",
+    "costo_total",
+    "margen_real",
+    "Cantidad_Vendida",
+    "Precio_Venta_Final",
+    "Costo_Envio",
+    "Tiempo_Entrega",
+    "brecha_entrega",
+    "NPS_Numerico",
+    "Rating_Producto",
+    "Ticket_Soporte",
+    "Stock_Actual",
+    "venta_sin_inventario",
+    "paradoja_fidelidad",
+)
+
+AGREGACIONES = ("sum", "mean", "median", "min", "max", "count")
+OPERADORES = ("==", "!=", "in", ">", ">=", "<", "<=")
+
+COLUMNA_FECHA = "Fecha_Venta"
+PERIODOS = {"dia": "D", "semana": "W", "mes": "M", "trimestre": "Q", "anio": "Y"}
+
+MAX_AGRUPACIONES = 2
+MAX_FILTROS = 5
+MAX_FILAS = 50
+
+
+class ConsultaInvalida(ValueError):
+    """La consulta pedida por el modelo no respeta el esquema permitido."""
+
+
+# =====================================================================
+#  Esquema expuesto al modelo
+# =====================================================================
+
+HERRAMIENTA_CONSULTA = {
+    "type": "function",
+    "function": {
+        "name": "consultar_agregado",
+        "description": (
+            "Calcula un agregado sobre el dataset filtrado que ve el usuario. "
+            "Permite agrupar por hasta dos dimensiones, filtrar, agrupar por "
+            "periodo de Fecha_Venta y devolver el top-k. Úsala para obtener "
+            "cifras que no estén en el resumen del contexto."
+        ),
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "metrica": {"type": "string", "enum": list(METRICAS)},
+                "agregacion": {"type": "string", "enum": list(AGREGACIONES)},
+                "agrupar_por": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": list(DIMENSIONES)},
+                    "maxItems": MAX_AGRUPACIONES,
+                },
+                "periodo": {"type": "string", "enum": list(PERIODOS)},
+                "filtros": {
+                    "type": "array",
+                    "maxItems": MAX_FILTROS,
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "columna": {
+                                "type": "string",
+                                "enum": list(DIMENSIONES + METRICAS),
+                            },
+                            "operador": {"type": "string", "enum": list(OPERADORES)},
+                            "valor": {
+                                "description": "Número, texto o lista (para 'in').",
+                            },
+                        },
+                        "required": ["columna", "operador", "valor"],
+                    },
+                },
+                "orden": {"type": "string", "enum": ["desc", "asc"]},
+                "limite": {"type": "integer", "minimum": 1, "maximum": MAX_FILAS},
+            },
+            "required": ["metrica", "agregacion"],
+        },
+    },
+}
+
+HERRAMIENTAS = [HERRAMIENTA_CONSULTA]
+
+
+# =====================================================================
+#  Normalización y ejecución
+# =====================================================================
+
+def _normalizar_valor(columna: str, operador: str, valor):
+    if operador == "in":
+        if not isinstance(valor, (list, tuple)):
+            valor = [valor]
+        return sorted(_normalizar_valor(columna, "==", v) for v in valor)
+    if columna in DIMENSIONES:
+        if not isinstance(valor, (str, int, float)):
+            raise ConsultaInvalida(f"Valor no válido para {columna}: {valor!r}")
+        return str(valor).strip().lower()
+    try:
+        return float(valor)
+    except (TypeError, ValueError):
+        raise ConsultaInvalida(f"{columna} requiere un valor numérico")
+
+
+def normalizar_consulta(argumentos) -> dict:
+    """Valida los argumentos de la herramienta y los lleva a forma canónica.
+
+    Acepta un dict o el JSON que envía el modelo. Lanza ``ConsultaInvalida``
+    si alguna columna, agregación u operador está fuera de la lista blanca.
+    """
+    if isinstance(argumentos, str):
+        try:
+            argumentos = json.loads(argumentos or "{}")
+        except json.JSONDecodeError as exc:
+            raise ConsultaInvalida(f"Argumentos no son JSON válido: {exc}")
+    if not isinstance(argumentos, dict):
+        raise ConsultaInvalida("Los argumentos deben ser un objeto")
+
+    metrica = argumentos.get("metrica")
+    if not isinstance(metrica, str) or metrica not in METRICAS:
+        raise ConsultaInvalida(f"Métrica no permitida: {metrica!r}")
+    agregacion = str(argumentos.get("agregacion", "sum")).lower()
+    if agregacion not in AGREGACIONES:
+        raise ConsultaInvalida(f"Agregación no permitida: {agregacion!r}")
+
+    agrupar_por = argumentos.get("agrupar_por") or []
+    if isinstance(agrupar_por, str):
+        agrupar_por = [agrupar_por]
+    if not isinstance(agrupar_por, (list, tuple)):
+        raise ConsultaInvalida("agrupar_por debe ser una lista de dimensiones")
+    # Se valida antes de deduplicar: dict.fromkeys falla con elementos no hashables.
+    for dim in agrupar_por:
+        if not isinstance(dim, str) or dim not in DIMENSIONES:
+            raise ConsultaInvalida(f"Dimensión no permitida: {dim!r}")
+    agrupar_por = list(dict.fromkeys(agrupar_por))
+    if len(agrupar_por) > MAX_AGRUPACIONES:
+        raise ConsultaInvalida(f"Máximo {MAX_AGRUPACIONES} dimensiones de agrupación")
+
+    periodo = argumentos.get("periodo")
+    if periodo is not None and (not isinstance(periodo, str) or periodo not in PERIODOS):
+        raise ConsultaInvalida(f"Periodo no permitido: {periodo!r}")
+
+    filtros = argumentos.get("filtros") or []
+    if not isinstance(filtros, (list, tuple)):
+        raise ConsultaInvalida("filtros debe ser una lista de objetos")
+    if len(filtros) > MAX_FILTROS:
+        raise ConsultaInvalida(f"Máximo {MAX_FILTROS} filtros")
+    filtros_norm = []
+    for f in filtros:
+        if not isinstance(f, dict):
+            raise ConsultaInvalida("Cada filtro debe ser un objeto")
+        columna, operador = f.get("columna"), f.get("operador")
+        if not isinstance(columna, str) or columna not in DIMENSIONES + METRICAS:
+            raise ConsultaInvalida(f"Columna de filtro no permitida: {columna!r}")
+        if not isinstance(operador, str) or operador not in OPERADORES:
+            raise ConsultaInvalida(f"Operador no permitido: {operador!r}")
+        if columna in DIMENSIONES and operador not in ("==", "!=", "in"):
+            raise ConsultaInvalida(f"{columna} solo admite ==, != o in")
+        filtros_norm.append([columna, operador,
+                             _normalizar_valor(columna, operador, f.get("valor"))])
+    filtros_norm.sort(key=lambda f: json.dumps(f, sort_keys=True))
+
+    orden = str(argumentos.get("orden", "desc")).lower()
+    if orden not in ("desc", "asc"):
+        raise ConsultaInvalida(f"Orden no permitido: {orden!r}")
+    try:
+        limite = int(argumentos.get("limite", 10))
+    except (TypeError, ValueError):
+        raise ConsultaInvalida("limite debe ser un entero")
+    limite = max(1, min(limite, MAX_FILAS))
+
+    return {
+        "metrica": metrica,
+        "agregacion": agregacion,
+        "agrupar_por": agrupar_por,
+        "periodo": periodo,
+        "filtros": filtros_norm,
+        "orden": orden,
+        "limite": limite,
+    }
+
+
+def _mascara(df: pd.DataFrame, filtros: list) -> pd.Series:
+    mascara = pd.Series(True, index=df.index)
+    for columna, operador, valor in filtros:
+        if columna not in df.columns:
+            raise ConsultaInvalida(f"La columna {columna} no está en el dataset")
+        serie = df[columna]
+        if columna in DIMENSIONES:
+            serie = serie.astype("string").str.strip().str.lower()
+        else:
+            serie = pd.to_numeric(serie, errors="coerce")
+        if operador == "in":
+            cond = serie.isin(valor)
+        elif operador == "==":
+            cond = serie == valor
+        elif operador == "!=":
+            cond = serie != valor
+        elif operador == ">":
+            cond = serie > valor
+        elif operador == ">=":
+            cond = serie >= valor
+        elif operador == "<":
+            cond = serie < valor
+        else:
+            cond = serie <= valor
+        mascara &= cond.fillna(False).astype(bool)
+    return mascara
+
+
+def _json_valor(valor):
+    if pd.isna(valor):
+        return None
+    if isinstance(valor, pd.Period):
+        return str(valor)
+    if hasattr(valor, "item"):
+        valor = valor.item()
+    if isinstance(valor, float):
+        return round(valor, 4)
+    return valor
+
+
+def ejecutar_consulta(df: pd.DataFrame, consulta: dict) -> dict:
+    """Ejecuta una consulta ya normalizada y devuelve un resultado serializable."""
+    metrica = consulta["metrica"]
+    if metrica not in df.columns:
+        raise ConsultaInvalida(f"La métrica {metrica} no está en el dataset")
+
+    mascara = _mascara(df, consulta["filtros"])
+    valores = pd.to_numeric(df[metrica], errors="coerce")[mascara]
+
+    claves = []
+    for dim in consulta["agrupar_por"]:
+        if dim not in df.columns:
+            raise ConsultaInvalida(f"La dimensión {dim} no está en el dataset")
+        claves.append(df[dim][mascara].rename(dim))
+    if consulta["periodo"]:
+        if COLUMNA_FECHA not in df.columns:
+            raise ConsultaInvalida(f"La columna {COLUMNA_FECHA} no está en el dataset")
+        fechas = pd.to_datetime(df[COLUMNA_FECHA][mascara], errors="coerce")
+        claves.append(
+            fechas.dt.to_period(PERIODOS[consulta["periodo"]]).rename("periodo"))
+
+    agregacion = consulta["agregacion"]
+    resultado = {
+        "consulta": consulta,
+        "registros_filtrados": int(mascara.sum()),
+    }
+    if not claves:
+        resultado["valor"] = _json_valor(valores.agg(agregacion))
+        return resultado
+
+    serie = valores.groupby(claves, dropna=True).agg(agregacion)
+    if consulta["periodo"] and len(claves) == 1:
+        # Series temporales: orden cronológico, el límite toma los más recientes.
+        serie = serie.sort_index().tail(consulta["limite"])
+    else:
+        serie = serie.sort_values(ascending=consulta["orden"] == "asc")
+        serie = serie.head(consulta["limite"])
+
+    nombres = [c.name for c in claves]
+    filas = []
+    for indice, valor in serie.items():
+        indice = indice if isinstance(indice, tuple) else (indice,)
+        fila = {n: _json_valor(v) for n, v in zip(nombres, indice)}
+        fila[f"{agregacion}_{metrica}"] = _json_valor(valor)
+        filas.append(fila)
+    resultado["grupos_totales"] = int(valores.groupby(claves, dropna=True).ngroups)
+    resultado["filas"] = filas
+    return resultado
+
+
+# =====================================================================
+#  Motor con caché
+# =====================================================================
+
+class MotorConsultas:
+    """Ejecuta consultas de herramienta con caché LRU por vista y consulta."""
+
+    def __init__(self, max_entradas: int = 512):
+        self._max = max_entradas
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def ejecutar(self, df: pd.DataFrame, argumentos, clave_vista: str = None) -> dict:
+        """Normaliza, ejecuta (o recupera de caché) y devuelve el resultado.
+
+        ``clave_vista`` identifica el dataframe (versión del dataset + filtros);
+        sin ella la consulta se ejecuta sin caché. Los errores de validación
+        se devuelven como ``{"error": ...}`` para que el modelo pueda corregir
+        su llamada.
+        """
+        try:
+            consulta = normalizar_consulta(argumentos)
+        except ConsultaInvalida as exc:
+            return {"error": str(exc)}
+
+        clave = None
+        if clave_vista:
+            clave = (clave_vista, json.dumps(consulta, sort_keys=True))
+            with self._lock:
+                if clave in self._cache:
+                    self._cache.move_to_end(clave)
+                    self.aciertos += 1
+                    return self._cache[clave]
+                self.fallos += 1
+
+        try:
+            resultado = ejecutar_consulta(df, consulta)
+        except ConsultaInvalida as exc:
+            return {"error": str(exc)}
+
+        if clave is not None:
+            with self._lock:
+                self._cache[clave] = resultado
+                while len(self._cache) > self._max:
+                    self._cache.popitem(last=False)
+        return resultado
+
+    def ejecutar_herramienta(self, df, nombre: str, argumentos,
+                             clave_vista: str = None) -> str:
+        """Punto de entrada para una tool call: devuelve el contenido JSON."""
+        if nombre != HERRAMIENTA_CONSULTA["function"]["name"]:
+            resultado = {"error": f"Herramienta desconocida: {nombre}"}
+        else:
+            resultado = self.ejecutar(df, argumentos, clave_vista)
+        return json.dumps(resultado, ensure_ascii=False, default=str)
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "entradas": len(self._cache),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+            }
@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+Ensamblado del contexto del chat con presupuesto de tokens.
+
+El prompt que se envía al modelo es: system prompt + los turnos más recientes
+de la conversación que quepan en el presupuesto. Los turnos se recorren del
+más nuevo al más viejo; cuando un turno no cabe completo se intenta incluir
+una versión recortada y, si tampoco cabe, se descartan él y todos los
+anteriores. Los mensajes de error guardados en el historial nunca se envían.
+
+El conteo de tokens es una aproximación local (sin descargar tokenizadores):
+cada palabra cuenta ``ceil(len / 4)`` tokens y cada signo de puntuación uno,
+más un costo fijo por mensaje. Sobreestima ligeramente a los tokenizadores
+BPE habituales, lo cual es el sesgo seguro para un presupuesto.
+"""
+import re
+
+from src import config
+
+_PATRON_TOKENS = re.compile(r"\w+|[^\w\s]")
+_TOKENS_POR_MENSAJE = 4
+_MARCA_RECORTE = " […respuesta anterior recortada]"
+
+
+# =====================================================================
+#  Conteo de tokens
+# =====================================================================
+
+def contar_tokens(texto: str) -> int:
+    """Número aproximado de tokens de un texto."""
+    if not texto:
+        return 0
+    total = 0
+    for pieza in _PATRON_TOKENS.findall(texto):
+        total += (len(pieza) + 3) // 4
+    return total
+
+
+def tokens_mensaje(mensaje: dict) -> int:
+    """Tokens de un mensaje de chat, incluido el costo fijo del rol."""
+    return _TOKENS_POR_MENSAJE + contar_tokens(mensaje.get("content", ""))
+
+
+def _recortar(texto: str, max_tokens: int) -> str:
+    """Conserva el inicio de ``texto`` hasta ~``max_tokens`` tokens."""
+    usados = 0
+    for m in _PATRON_TOKENS.finditer(texto):
+        usados += (len(m.group()) + 3) // 4
+        if usados > max_tokens:
+            return texto[:m.start()].rstrip() + _MARCA_RECORTE
+    return texto
+
+
+# =====================================================================
+#  Ensamblado
+# =====================================================================
+
+def es_error(mensaje: dict) -> bool:
+    """Los errores se guardan en el historial para mostrarlos, no para enviarlos."""
+    return bool(mensaje.get("error"))
+
+
+def ensamblar_contexto(system_prompt: str, historial: list,
+                       presupuesto_tokens: int = None,
+                       max_turnos: int = None,
+                       tokens_recorte: int = None) -> tuple:
+    """Arma la lista de mensajes a enviar respetando el presupuesto.
+
+    Devuelve ``(messages, info)``. ``messages`` contiene solo ``role`` y
+    ``content``; ``info`` describe el tamaño del prompt y qué se omitió.
+    El system prompt y el último mensaje del usuario se envían siempre,
+    aunque por sí solos superen el presupuesto (``info["excedido"]``).
+    """
+    presupuesto = presupuesto_tokens or config.CHAT_PRESUPUESTO_TOKENS
+    max_turnos = max_turnos or config.CHAT_MAX_TURNOS
+    tokens_recorte = tokens_recorte or config.CHAT_TOKENS_RECORTE
+
+    validos = [
+        {"role": m["role"], "content": m["content"]}
+        for m in historial if not es_error(m)
+    ]
+    errores_omitidos = len(historial) - len(validos)
+
+    sistema = {"role": "system", "content": system_prompt}
+    tokens_sistema = tokens_mensaje(sistema)
+    usados = tokens_sistema
+
+    seleccion = []
+    recortados = 0
+    candidatos = validos[-max_turnos:]
+    for i, mensaje in enumerate(reversed(candidatos)):
+        costo = tokens_mensaje(mensaje)
+        if i == 0 or usados + costo <= presupuesto:
+            seleccion.append(mensaje)
+            usados += costo
+            continue
+        # No cabe completo: intentar una versión recortada del turno.
+        restante = presupuesto - usados - _TOKENS_POR_MENSAJE
+        if restante <= 0:
+            break
+        recorte = {
+            "role": mensaje["role"],
+            "content": _recortar(mensaje["content"],
+                                 min(tokens_recorte, restante)),
+        }
+        costo = tokens_mensaje(recorte)
+        if usados + costo > presupuesto:
+            break
+        seleccion.append(recorte)
+        usados += costo
+        recortados += 1
+
+    seleccion.reverse()
+    info = {
+        "tokens_prompt": usados,
+        "tokens_system": tokens_sistema,
+        "presupuesto": presupuesto,
+        "turnos_enviados": len(seleccion),
+        "turnos_recortados": recortados,
+        "turnos_descartados": len(validos) - len(seleccion),
+        "errores_omitidos": errores_omitidos,
+        "excedido": usados > presupuesto,
+    }
+    return [sistema] + seleccion, info
@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+Catálogo de uso de columnas del dataset consolidado.
+
+``df_dss`` arrastra columnas crudas e intermedias del pipeline (``margen``,
+``margen %``, ``id_tiempos_entrega``, ``Fecha_Calculada``, la bodega del
+inventario, ``Punto_Reorden``...) que ningún componente del dashboard lee y
+que solo interesan al exportar la tabla maestra. Cada consumidor declara
+aquí las columnas que usa; el frame analítico que recorre el render (filtros,
+páginas, chat, reporte) contiene solo su unión::
+
+    df_analitico, almacen = proyectar(df_dss)
+    ...
+    df_completo = almacen.completar(df_filtrado)   # solo al exportar
+
+Las columnas exclusivas de la exportación quedan en un ``AlmacenExportacion``
+que no se materializa hasta que alguien exporta. Al agregar una columna a
+una página hay que declararla en su consumidor.
+
+El frame analítico trae además las columnas derivadas de ``DERIVADAS``
+(calculadas al cargar, no en cada rerun) y es de solo lectura (``congelar``).
+"""
+import threading
+
+import numpy as np
+import pandas as pd
+
+from src.asistente.consultas import COLUMNA_FECHA, DIMENSIONES, METRICAS
+from src.dataset_compartido import a_pandas
+from src.motor_duckdb import COLUMNAS as COLUMNAS_DUCKDB
+
+# Nombres finales de columnas que el merge dejó con sufijo
+RENOMBRES = {"Bodega_Origen_x": "Bodega_Origen"}
+
+USO_COLUMNAS = {
+    "filtros": ("Categoria", "Ciudad_Destino", "Estado_Envio", "Fecha_Venta",
+                "margen_real"),
+    "resumen_ejecutivo": ("ingreso_total", "margen_real", "venta_sin_inventario",
+                          "Categoria", "Transaccion_ID"),
+    "fuga_capital": ("margen_real", "ingreso_total", "SKU_ID", "Categoria",
+                     "Cantidad_Vendida", "Canal_Venta", "Bodega_Origen",
+                     "Precio_Venta_Final"),
+    "crisis_logistica": ("Tiempo_Entrega", "NPS_Numerico", "brecha_entrega",
+                         "Bodega_Origen", "Transaccion_ID", "ciudad_normalizada",
+                         "canal_digital"),
+    "venta_invisible": ("venta_sin_inventario", "Ciudad_Destino", "ingreso_total",
+                        "SKU_ID", "Fecha_Venta", "Transaccion_ID", "Canal_Venta",
+                        "Bodega_Origen"),
+    "diagnostico_fidelidad": ("NPS_Numerico", "NPS_Categoria", "paradoja_fidelidad",
+                              "Rating_Producto", "Categoria", "Precio_Venta_Final",
+                              "Stock_Actual", "Transaccion_ID", "ingreso_total"),
+    "riesgo_operativo": ("Ultima_Revision", "Bodega_Origen", "Ticket_Soporte",
+                         "ingreso_total", "NPS_Numerico"),
+    "agregaciones_duckdb": COLUMNAS_DUCKDB,
+    "chat": DIMENSIONES + METRICAS + (COLUMNA_FECHA, "Ultima_Revision"),
+    "reporte": ("ingreso_total", "margen_real", "Ticket_Soporte", "NPS_Numerico",
+                "Tiempo_Entrega", "Ultima_Revision", "Ciudad_Destino",
+                "venta_sin_inventario", "SKU_ID", "Rating_Producto",
+                "paradoja_fidelidad", "Bodega_Origen"),
+}
+
+
+def columnas_de(*consumidores) -> frozenset:
+    """Unión de las columnas declaradas por *consumidores* (por defecto, todos)."""
+    consumidores = consumidores or tuple(USO_COLUMNAS)
+    return frozenset(c for nombre in consumidores for c in USO_COLUMNAS[nombre])
+
+
+# La exportación (tabla maestra y CSV filtrado) usa además todas las demás.
+COLUMNAS_ANALITICAS = columnas_de()
+
+
+# =====================================================================
+#  Columnas derivadas (calculadas una vez, al cargar)
+# =====================================================================
+
+def _ciudad_normalizada(df: pd.DataFrame) -> pd.Series:
+    return df["Ciudad_Destino"].astype(str).str.strip().str.upper()
+
+
+def _canal_digital(df: pd.DataFrame) -> pd.Series:
+    return df["ciudad_normalizada"].str.contains("CANAL DIGITAL|DIGITAL", na=False)
+
+
+# En orden de cálculo (una derivada puede usar las anteriores)
+DERIVADAS = {
+    "ciudad_normalizada": _ciudad_normalizada,
+    "canal_digital": _canal_digital,
+}
+
+# Columnas que las páginas usan como fechas
+COLUMNAS_FECHA = ("Fecha_Venta", "Ultima_Revision")
+
+
+def _preparar(df: pd.DataFrame) -> pd.DataFrame:
+    """Tipos y derivadas del frame analítico; lo deja de solo lectura."""
+    for columna in COLUMNAS_FECHA:
+        if columna in df.columns and not pd.api.types.is_datetime64_any_dtype(df[columna]):
+            df[columna] = pd.to_datetime(df[columna], errors="coerce")
+    for columna, calcular in DERIVADAS.items():
+        df[columna] = calcular(df)
+    return congelar(df)
+
+
+# =====================================================================
+#  Contrato de solo lectura
+# =====================================================================
+
+def congelar(df: pd.DataFrame) -> pd.DataFrame:
+    """Frame de solo lectura con las columnas de *df*, sin copiar los datos.
+
+    Los frames que reciben las páginas comparten memoria con el dataset en
+    caché de todas las sesiones: una escritura en su lugar (``df.loc[...] =``,
+    ``fillna(inplace=True)``...) lanza ``ValueError: assignment destination
+    is read-only`` en vez de modificar los datos de los demás. Para trabajar
+    sobre columnas derivadas se usan series o frames nuevos.
+
+    Cada columna numpy se toma con ``to_numpy()`` (una vista, sin copia), la
+    vista se marca de solo lectura y el frame se arma de nuevo sobre esas
+    vistas; *df* no cambia. Las columnas de tipo extensión (categorías,
+    fechas con zona horaria...) pasan tal cual.
+
+    (pandas 2.x no admite ``memory_usage(deep=True)`` sobre columnas object
+    de solo lectura; para medir, usar una copia.)
+    """
+    columnas = {}
+    for nombre, serie in df.items():
+        if isinstance(serie.dtype, np.dtype):
+            valores = serie.to_numpy()
+            valores.flags.writeable = False
+        else:
+            valores = serie.array
+        columnas[nombre] = valores
+    # copy=False: cada columna queda en su propio bloque, sobre la vista.
+    return pd.DataFrame(columnas, index=df.index, copy=False)
+
+
+# =====================================================================
+#  Almacén de columnas de exportación
+# =====================================================================
+
+class AlmacenExportacion:
+    """Columnas que solo usa la exportación, materializadas bajo demanda.
+
+    *fuente* es una tabla Arrow (p. ej. el archivo mapeado de
+    ``src.dataset_compartido``) o un dataframe con esas columnas, alineado
+    por posición con el frame analítico. *orden* es el orden de columnas
+    de la tabla maestra.
+    """
+
+    def __init__(self, fuente, orden):
+        self._fuente = fuente
+        self.orden = list(orden)
+        if isinstance(fuente, pd.DataFrame):
+            self.columnas = list(fuente.columns)
+        else:
+            self.columnas = list(fuente.column_names)
+        self._df = None
+        self._lock = threading.Lock()
+
+    def _frame(self) -> pd.DataFrame:
+        with self._lock:
+            if self._df is None:
+                if isinstance(self._fuente, pd.DataFrame):
+                    self._df = self._fuente
+                else:
+                    self._df = a_pandas(self._fuente)
+                self._fuente = None
+            return self._df
+
+    @property
+    def cargado(self) -> bool:
+        return self._df is not None
+
+    def columna(self, nombre: str, indice) -> pd.Series:
+        """Columna de exportación *nombre* en las filas *indice*."""
+        serie = self._frame()[nombre].take(indice)
+        serie.index = indice
+        return serie
+
+    def completar(self, df_filtrado: pd.DataFrame) -> pd.DataFrame:
+        """*df_filtrado* con las columnas de exportación, en el orden maestro."""
+        if not self.columnas:
+            return df_filtrado[[c for c in self.orden if c in df_filtrado.columns]]
+        extra = self._frame().take(df_filtrado.index)
+        extra.index = df_filtrado.index
+        completo = pd.concat([df_filtrado, extra], axis=1)
+        # Las derivadas no forman parte de la tabla maestra.
+        return completo[[c for c in self.orden if c in completo.columns]]
+
+
+# =====================================================================
+#  Proyección
+# =====================================================================
+
+def _repartir(columnas) -> tuple:
+    renombradas = [RENOMBRES.get(c, c) for c in columnas]
+    analiticas = [c for c in renombradas if c in COLUMNAS_ANALITICAS]
+    exportacion = [c for c in renombradas if c not in COLUMNAS_ANALITICAS]
+    return renombradas, analiticas, exportacion
+
+
+def proyectar(df_dss: pd.DataFrame) -> tuple:
+    """(frame analítico, ``AlmacenExportacion``) a partir del dataset completo."""
+    df = df_dss.rename(columns=RENOMBRES).reset_index(drop=True)
+    orden, analiticas, exportacion = _repartir(df_dss.columns)
+    # df[analiticas] ya es una copia; la copia superficial la desliga de df
+    # para que _preparar agregue columnas sin SettingWithCopyWarning.
+    analitico = df[analiticas].copy(deep=False)
+    return _preparar(analitico), AlmacenExportacion(df[exportacion], orden)
+
+
+def proyectar_tabla(tabla) -> tuple:
+    """Como ``proyectar`` para una tabla Arrow: solo convierte las analíticas."""
+    tabla = tabla.rename_columns([RENOMBRES.get(c, c) for c in tabla.column_names])
+    orden, analiticas, exportacion = _repartir(tabla.column_names)
+    df = a_pandas(tabla.select(analiticas))
+    return _preparar(df), AlmacenExportacion(tabla.select(exportacion), orden)
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+"""
+Configuración del DSS leída desde variables de entorno.
+
+Todas las opciones tienen un valor por defecto razonable para ejecutar la
+app localmente; en producción se ajustan sin tocar el código.
+"""
+import os
+
+
+def _env_int(nombre: str, defecto: int) -> int:
+    try:
+        return int(os.environ.get(nombre, defecto))
+    except ValueError:
+        return defecto
+
+
+def _env_float(nombre: str, defecto: float) -> float:
+    try:
+        return float(os.environ.get(nombre, defecto))
+    except ValueError:
+        return defecto
+
+
+# -----------------------------
+# Asistente IA (chat)
+# -----------------------------
+
+# Clientes LLM compartidos por proceso (uno por API key + modelo)
+CHAT_POOL_MAX_CLIENTES = _env_int("DSS_CHAT_POOL_MAX_CLIENTES", 16)
+CHAT_POOL_INACTIVIDAD_S = _env_float("DSS_CHAT_POOL_INACTIVIDAD_S", 300.0)
+CHAT_KEEPALIVE_CONEXIONES = _env_int("DSS_CHAT_KEEPALIVE_CONEXIONES", 8)
+CHAT_KEEPALIVE_EXPIRA_S = _env_float("DSS_CHAT_KEEPALIVE_EXPIRA_S", 60.0)
+CHAT_TIMEOUT_S = _env_float("DSS_CHAT_TIMEOUT_S", 60.0)
+
+# Presupuesto de contexto por solicitud (tokens aproximados)
+CHAT_PRESUPUESTO_TOKENS = _env_int("DSS_CHAT_PRESUPUESTO_TOKENS", 6000)
+CHAT_MAX_TURNOS = _env_int("DSS_CHAT_MAX_TURNOS", 20)
+CHAT_TOKENS_RECORTE = _env_int("DSS_CHAT_TOKENS_RECORTE", 200)
+
+# Herramienta de consultas agregadas locales (1 = activada, 0 = resumen completo)
+CHAT_HERRAMIENTAS = bool(_env_int("DSS_CHAT_HERRAMIENTAS", 1))
+
+# Caché de respuestas compartida entre sesiones
+CHAT_CACHE_MAX_ENTRADAS = _env_int("DSS_CHAT_CACHE_MAX_ENTRADAS", 512)
+CHAT_CACHE_TTL_S = _env_float("DSS_CHAT_CACHE_TTL_S", 3600.0)
+
+# -----------------------------
+# Administración
+# -----------------------------
+
+# Muestra paneles de métricas internas (cachés, pool de clientes)
+MODO_ADMIN = bool(_env_int("DSS_ADMIN", 0))
+
+# Planificador de solicitudes al proveedor (compartido por todas las sesiones)
+CHAT_MAX_CONCURRENCIA = _env_int("DSS_CHAT_MAX_CONCURRENCIA", 4)
+CHAT_PLAZO_S = _env_float("DSS_CHAT_PLAZO_S", 90.0)
+CHAT_REINTENTOS_429 = _env_int("DSS_CHAT_REINTENTOS_429", 4)
+CHAT_BACKOFF_BASE_S = _env_float("DSS_CHAT_BACKOFF_BASE_S", 0.5)
+CHAT_BACKOFF_MAX_S = _env_float("DSS_CHAT_BACKOFF_MAX_S", 8.0)
+
+# -----------------------------
+# Perfilador de renders
+# -----------------------------
+
+# Activa el perfilador para todas las sesiones (también se activa desde la
+# barra lateral en modo administrador)
+PERFIL_RENDER = bool(_env_int("DSS_PERFIL_RENDER", 0))
+# Muestreo de pilas para flame graphs (más detalle, algo más de costo)
+PERFIL_MUESTREO = bool(_env_int("DSS_PERFIL_MUESTREO", 0))
+PERFIL_INTERVALO_MS = _env_float("DSS_PERFIL_INTERVALO_MS", 5.0)
+PERFIL_HISTORIAL = _env_int("DSS_PERFIL_HISTORIAL", 200)
+
+# -----------------------------
+# Métricas (formato Prometheus)
+# -----------------------------
+
+# Puerto del endpoint /metrics (0 = desactivado)
+METRICAS_PUERTO = _env_int("DSS_METRICAS_PUERTO", 0)
+METRICAS_HOST = os.environ.get("DSS_METRICAS_HOST", "127.0.0.1")
+# Archivo de métricas reescrito periódicamente ("" = desactivado; admite {pid})
+METRICAS_ARCHIVO = os.environ.get("DSS_METRICAS_ARCHIVO", "")
+METRICAS_INTERVALO_S = _env_float("DSS_METRICAS_INTERVALO_S", 15.0)
+
+# -----------------------------
+# Pipeline de datos
+# -----------------------------
+
+# Motor de limpieza y consolidación: "pandas" (referencia) o "polars"
+MOTOR_PIPELINE = os.environ.get("DSS_MOTOR_PIPELINE", "pandas").strip().lower()
+
+# Motor de los agregados de las páginas: "pandas" (referencia) o "duckdb"
+MOTOR_AGREGACIONES = os.environ.get("DSS_MOTOR_AGREGACIONES", "pandas").strip().lower()
+# Hilos de DuckDB (0 = los que decida DuckDB, normalmente todos los núcleos)
+DUCKDB_HILOS = _env_int("DSS_DUCKDB_HILOS", 0)
+# Resultados cacheados por (estado de filtros, consulta)
+DUCKDB_CACHE_ENTRADAS = _env_int("DSS_DUCKDB_CACHE_ENTRADAS", 256)
+
+# Dataset consolidado publicado como Arrow IPC mapeado en memoria y
+# compartido por sesiones y workers (0 = cada worker construye su copia)
+DATASET_COMPARTIDO = bool(_env_int("DSS_DATASET_COMPARTIDO", 1))
+# Directorio de publicación ("" = <tmp>/dss_dataset-<uid>); debe ser del usuario
+# del proceso y no escribible por otros
+DATASET_DIR = os.environ.get("DSS_DATASET_DIR", "")
+# Versiones publicadas que se conservan en disco
+DATASET_VERSIONES = _env_int("DSS_DATASET_VERSIONES", 3)
+
+# -----------------------------
+# Exportación
+# -----------------------------
+
+# Filas por bloque al serializar la tabla maestra (CSV, Parquet, XLSX)
+EXPORTACION_FILAS_BLOQUE = _env_int("DSS_EXPORTACION_FILAS_BLOQUE", 50000)
+# Archivos exportados en caché (por versión, estado de filtros y formato)
+EXPORTACION_CACHE_ENTRADAS = _env_int("DSS_EXPORTACION_CACHE_ENTRADAS", 8)
+
+# -----------------------------
+# Ingesta incremental
+# -----------------------------
+
+# Directorio con lotes diarios de transacciones (*.csv, aplicados por nombre)
+# que se agregan de forma incremental ("" = solo los subidos en la app)
+LOTES_DIR = os.environ.get("DSS_LOTES_DIR", "")
+# Valores distintos por ruta en los sketches de imputación (exactos hasta
+# este tamaño; por encima se compactan y la mediana es aproximada)
+RUTAS_VALORES_SKETCH = _env_int("DSS_RUTAS_VALORES_SKETCH", 16384)
@@ -1,19 +1,34 @@
 ﻿# -*- coding: utf-8 -*-
+import glob
+import hashlib
+import logging
 import os
 import tempfile
+from functools import lru_cache
+
 import pandas as pd
 import streamlit as st
+from src import config, dataset_compartido, ingesta
+from src.columnas import proyectar, proyectar_tabla
+from src.instrumentacion import TrazaPipeline, iniciar_etapa, trazar
+from src.telemetria import histograma, marcar_fallo_cache, observar_cache
 from src.inventario import procesar_inventario
 from src.transacciones import procesar_transacciones
 from src.feedback import procesar_feedback
 
 pd.set_option('future.no_silent_downcasting', True)
 
+logger = logging.getLogger(__name__)
+
 # Rutas por defecto dentro del repositorio
 _DEFAULT_INVENTARIO = "data/inventario_central_v2.csv"
 _DEFAULT_FEEDBACK = "data/feedback_clientes_v2.csv"
 _DEFAULT_TRANSACCIONES = "data/transacciones_logistica_v2.csv"
 
+_DURACION_PIPELINE = histograma(
+    "dss_pipeline_segundos", "Duración del pipeline de carga por etapa", ("etapa",)
+)
+
 
 def render_file_upload_section() -> tuple:
     """Muestra uploaders en el sidebar y devuelve las rutas a utilizar."""
@@ -52,15 +67,229 @@ def render_file_upload_section() -> tuple:
     return ruta_inv, ruta_feed, ruta_trans
 
 
-@st.cache_data
-def cargar_datos(ruta_inventario: str, ruta_feedback: str, ruta_transacciones: str):
-    # 1. Carga de archivos individuales con sus respectivas métricas de salud
-    df_inv, met_inv = procesar_inventario(ruta_inventario)
-    df_feed, met_feed = procesar_feedback(ruta_feedback)
-    df_trans, met_trans = procesar_transacciones(ruta_transacciones, df_inv, df_feed)
-    
-    # 2. Consolidación en un único Dataset Maestro para el DSS
-    df_dss = crear_dataset_consolidado(df_trans, df_inv, df_feed)
+def render_lotes_upload_section() -> tuple:
+    """Lotes de transacciones nuevas a agregar (en orden) sobre el histórico.
+
+    Primero los CSV de ``DSS_LOTES_DIR`` (por nombre) y luego los subidos.
+    """
+    rutas = []
+    if config.LOTES_DIR:
+        rutas.extend(sorted(glob.glob(os.path.join(config.LOTES_DIR, "*.csv"))))
+
+    subidos = st.sidebar.file_uploader(
+        "Lotes de transacciones nuevas (incremental)", type=["csv"],
+        accept_multiple_files=True, key="upload_lotes",
+        help="Mismas columnas que transacciones_logistica_v2.csv; se agregan "
+             "al dataset sin reprocesar el histórico.",
+    )
+    for subido in subidos or []:
+        tmp = tempfile.NamedTemporaryFile(delete=False, suffix=".csv")
+        tmp.write(subido.getvalue())
+        tmp.close()
+        rutas.append(tmp.name)
+    return tuple(rutas)
+
+
+@lru_cache(maxsize=32)
+def _hash_archivo(ruta: str, tamano: int, modificado: float) -> str:
+    h = hashlib.sha1()
+    with open(ruta, "rb") as fh:
+        for bloque in iter(lambda: fh.read(1 << 20), b""):
+            h.update(bloque)
+    return h.hexdigest()
+
+
+def huella_archivo(ruta: str) -> str:
+    st_archivo = os.stat(ruta)
+    return _hash_archivo(ruta, st_archivo.st_size, st_archivo.st_mtime)
+
+
+def version_dataset(ruta_inventario: str, ruta_feedback: str, ruta_transacciones: str,
+                    rutas_lotes: tuple = ()) -> str:
+    """Versión del dataset: huella del contenido de los archivos fuente.
+
+    Dos cargas con los mismos bytes (aunque lleguen por rutas temporales
+    distintas) comparten versión. El hash de cada archivo se memoiza por
+    (ruta, tamaño, fecha de modificación). Los lotes incrementales entran
+    en orden: cada prefijo de ``rutas_lotes`` es una versión intermedia.
+    """
+    h = hashlib.sha1()
+    for ruta in (ruta_inventario, ruta_feedback, ruta_transacciones):
+        h.update(huella_archivo(ruta).encode())
+    for ruta in rutas_lotes:
+        h.update(b"lote:" + huella_archivo(ruta).encode())
+    return h.hexdigest()[:16]
+
+
+def cargar_datos_analiticos(ruta_inventario: str, ruta_feedback: str, ruta_transacciones: str,
+                            rutas_lotes: tuple = ()):
+    """Datos para el dashboard: frame analítico y almacén de exportación.
+
+    Devuelve ``(df_analitico, almacen_exportacion, health_scores,
+    metricas_calidad, traza)``. El frame solo tiene las columnas declaradas
+    en ``src.columnas``; el resto se obtiene con
+    ``almacen_exportacion.completar(df)`` al exportar. Ambos se comparten
+    entre las sesiones del proceso y no se deben modificar en su lugar.
+
+    ``rutas_lotes`` son lotes de transacciones nuevas que se agregan de
+    forma incremental (``src.ingesta``) sobre la versión anterior.
+    """
+    rutas_lotes = tuple(rutas_lotes)
+    version = version_dataset(ruta_inventario, ruta_feedback, ruta_transacciones, rutas_lotes)
+    with observar_cache("cargar_datos"):
+        return _cargar_vista_analitica(
+            version, (ruta_inventario, ruta_feedback, ruta_transacciones), rutas_lotes
+        )
+
+
+def _construir_publicable(rutas: tuple, estado_ingesta: dict = None):
+    df_dss, health_scores, metricas_calidad, resumen = _construir_con_traza(
+        *rutas, estado_ingesta=estado_ingesta
+    )
+    return df_dss, {"health_scores": health_scores,
+                    "metricas_calidad": metricas_calidad, "traza": resumen}
+
+
+def _publicar_base(rutas: tuple, version: str):
+    """Construye la versión sin lotes y publica su estado de ingesta como anexo."""
+    estado = {}
+    df_dss, metadatos = _construir_publicable(rutas, estado)
+    if estado:
+        dataset_compartido.publicar_anexos(version, *ingesta.a_anexos(estado))
+    return df_dss, metadatos
+
+
+def _obtener_publicado(rutas: tuple, lotes: tuple = ()):
+    """(tabla, metadatos) publicados de rutas + lotes, construyendo lo que falte.
+
+    Una versión con lotes parte de la versión con un lote menos (publicada
+    o construida a su vez) y de su estado de ingesta, y solo procesa el
+    último.
+    """
+    version = version_dataset(*rutas, lotes)
+    if not lotes:
+        return dataset_compartido.obtener(version, lambda: _publicar_base(rutas, version))
+
+    def ingerir():
+        tabla, metadatos = _obtener_publicado(rutas, lotes[:-1])
+        anexos = dataset_compartido.abrir_anexos(version_dataset(*rutas, lotes[:-1]))
+        estado = ingesta.de_anexos(*anexos) if anexos else None
+        tabla, metadatos, estado = _ingerir_lote(tabla, metadatos, estado, rutas, lotes[-1])
+        dataset_compartido.publicar_anexos(version, *ingesta.a_anexos(estado))
+        return tabla, metadatos
+
+    return dataset_compartido.obtener(version, ingerir)
+
+
+def _ingerir_lote(datos, metadatos: dict, estado: dict, rutas: tuple, ruta_lote: str):
+    """Agrega el lote a *datos* (tabla Arrow o dataframe): ``(datos, metadatos, estado)``."""
+    if not estado:
+        if isinstance(datos, pd.DataFrame):
+            base = datos[["Stock_Actual", "Fecha_Venta"]]
+        else:
+            base = datos.select(["Stock_Actual", "Fecha_Venta"]).to_pandas()
+        estado = ingesta.estado_inicial(*rutas, base)
+
+    df_lote, metricas_lote, estado, stock_q3, traza = ingesta.procesar_lote(
+        ruta_lote, huella_archivo(ruta_lote), estado
+    )
+    if df_lote is None:
+        return datos, metadatos, estado
+    if isinstance(datos, pd.DataFrame):
+        datos = ingesta.agregar_a_frame(datos, df_lote, stock_q3)
+    else:
+        datos = ingesta.agregar_a_tabla(datos, df_lote, stock_q3)
+    return datos, ingesta.actualizar_metadatos(metadatos, metricas_lote, traza), estado
+
+
+@st.cache_resource(show_spinner=False, max_entries=4)
+def _cargar_vista_analitica(version: str, _rutas: tuple, _lotes: tuple = ()):
+    """Proyección analítica de *version*, compartida por las sesiones del proceso.
+
+    La clave es la versión (contenido de los CSV y lotes); las rutas solo se
+    usan si hay que construirlo y no entran en la clave (las subidas llegan
+    en temporales con nombre distinto por sesión). Desde el archivo mapeado solo se convierten a pandas las columnas
+    analíticas; sin él, el dataset se construye en el proceso. *version*
+    incluye los lotes incrementales.
+    """
+    marcar_fallo_cache()
+    if dataset_compartido.disponible():
+        tabla, metadatos = _obtener_publicado(_rutas, _lotes)
+        df, almacen = proyectar_tabla(tabla)
+        return (df, almacen, metadatos["health_scores"], metadatos["metricas_calidad"],
+                metadatos["traza"])
+    # El estado de ingesta solo se arma si hay lotes que agregar.
+    estado = {} if _lotes else None
+    df_dss, metadatos = _construir_publicable(_rutas, estado)
+    for ruta_lote in _lotes:
+        df_dss, metadatos, estado = _ingerir_lote(df_dss, metadatos, estado, _rutas, ruta_lote)
+    df, almacen = proyectar(df_dss)
+    return (df, almacen, metadatos["health_scores"], metadatos["metricas_calidad"],
+            metadatos["traza"])
+
+
+def _construir_con_traza(ruta_inventario: str, ruta_feedback: str, ruta_transacciones: str,
+                         estado_ingesta: dict = None):
+    traza = TrazaPipeline()
+    df_dss, health_scores, metricas_calidad = construir_dataset_dss(
+        ruta_inventario, ruta_feedback, ruta_transacciones, traza=traza,
+        estado_ingesta=estado_ingesta,
+    )
+    resumen = traza.resumen()
+    por_etapa = {}
+    for paso in resumen["pasos"]:
+        por_etapa[paso["etapa"]] = por_etapa.get(paso["etapa"], 0.0) + paso["duracion_ms"]
+    for etapa, ms in por_etapa.items():
+        _DURACION_PIPELINE.observar(ms / 1000, etapa=etapa)
+    _DURACION_PIPELINE.observar(resumen["total_ms"] / 1000, etapa="total")
+    return df_dss, health_scores, metricas_calidad, resumen
+
+
+def _motor_disponible(motor: str) -> str:
+    if motor == "polars":
+        try:
+            import polars  # noqa: F401
+        except ImportError:
+            logger.warning("DSS_MOTOR_PIPELINE=polars pero polars no está instalado; se usa pandas")
+            return "pandas"
+    return motor
+
+
+def construir_dataset_dss(ruta_inventario: str, ruta_feedback: str, ruta_transacciones: str,
+                          traza: TrazaPipeline = None, motor: str = None,
+                          estado_ingesta: dict = None):
+    """Pipeline completo sin caché de Streamlit (usado por la app y los procesos en lote).
+
+    Con ``traza`` se registra la duración, filas y memoria de cada paso.
+    ``motor`` (por defecto ``config.MOTOR_PIPELINE``) elige entre el
+    pipeline pandas de referencia y ``src.motor_polars``. Con
+    ``estado_ingesta`` (un dict) el pipeline pandas deja ahí el estado de la
+    ingesta incremental (``src.ingesta``); el motor Polars lo deja vacío.
+    """
+    if traza is not None:
+        with trazar(traza):
+            return construir_dataset_dss(ruta_inventario, ruta_feedback, ruta_transacciones,
+                                         motor=motor, estado_ingesta=estado_ingesta)
+
+    motor = _motor_disponible(motor or config.MOTOR_PIPELINE)
+    if motor == "polars":
+        from src.motor_polars import ejecutar_pipeline
+
+        df_dss, met_inv, met_feed, met_trans = ejecutar_pipeline(
+            ruta_inventario, ruta_feedback, ruta_transacciones
+        )
+    else:
+        # 1. Carga de archivos individuales con sus respectivas métricas de salud
+        df_inv, met_inv = procesar_inventario(ruta_inventario)
+        df_feed, met_feed = procesar_feedback(ruta_feedback)
+        estado_rutas = {} if estado_ingesta is not None else None
+        df_trans, met_trans = procesar_transacciones(ruta_transacciones, df_inv, df_feed,
+                                                     estado_rutas)
+
+        # 2. Consolidación en un único Dataset Maestro para el DSS
+        df_dss = crear_dataset_consolidado(df_trans, df_inv, df_feed)
+        if estado_rutas:
+            estado_ingesta.update(ingesta.nuevo_estado(df_inv, df_feed, estado_rutas, df_dss))
     
     # 3. Diccionarios de salud para las pestañas de Resumen y Salud del Dato
     health_scores = {
@@ -78,6 +307,8 @@ def cargar_datos(ruta_inventario: str, ruta_feedback: str, ruta_transacciones: s
     return df_dss, health_scores, metricas_calidad
 
 def crear_dataset_consolidado(df_trans, df_inv, df_feed):
+    pasos = iniciar_etapa("consolidado")
+    pasos.paso("1. Rescate de Tiempo_Entrega", df_trans)
     df_trabajo = df_trans.copy()
 
     # --- 1. Rescate de Tiempo_Entrega ---
@@ -89,12 +320,14 @@ def crear_dataset_consolidado(df_trans, df_inv, df_feed):
             df_trabajo['Tiempo_Entrega'] = 0
 
     # --- 2. Cruce con Inventario ---
+    pasos.paso("2. Cruce con inventario", df_trabajo)
     df_merged = df_trabajo.merge(
         df_inv[['SKU_ID', 'Categoria', 'Costo_Unitario_USD', 'Punto_Reorden', 'Stock_Actual', 'Bodega_Origen', 'Lead_Time_Dias', 'Ultima_Revision']],
         on="SKU_ID", how="left"
     )
     
     # --- 3. Cruce con Feedback ---
+    pasos.paso("3. Cruce con feedback", df_merged)
     columnas_deseadas = [
         'Transaccion_ID', 'NPS_Numerico', 'NPS_Categoria', 
         'Rating_Producto', 'Edad_Cliente', 'Ticket_Soporte'
@@ -106,6 +339,7 @@ def crear_dataset_consolidado(df_trans, df_inv, df_feed):
     df_final = df_merged.merge(df_feed_clean, on="Transaccion_ID", how="left")
     
     # --- 4. Rellenos de seguridad ---
+    pasos.paso("4. Rellenos de seguridad", df_final)
     df_final["Categoria"] = df_final["Categoria"].fillna("no catalogado")
     df_final["venta_sin_inventario"] = df_final["Categoria"] == "no catalogado"
     df_final["NPS_Numerico"] = pd.to_numeric(df_final["NPS_Numerico"], errors='coerce').fillna(5.0)
@@ -116,19 +350,23 @@ def crear_dataset_consolidado(df_trans, df_inv, df_feed):
     df_final["Ticket_Soporte"] = pd.to_numeric(df_final["Ticket_Soporte"], errors='coerce').fillna(0).astype(int)
     
     # --- 5. Cálculos Financieros Operativos ---
+    pasos.paso("5. Cálculos financieros", df_final)
     df_final["ingreso_total"] = df_final["Precio_Venta_Final"] * df_final["Cantidad_Vendida"]
     costo_u = df_final["Costo_Unitario_USD"].fillna(0)
     df_final["costo_total"] = (costo_u * df_final["Cantidad_Vendida"]) + df_final["Costo_Envio"]
     df_final["margen_real"] = df_final["ingreso_total"] - df_final["costo_total"]
     
     # --- 6. Análisis de Brecha Logística ---
+    pasos.paso("6. Brecha logística", df_final)
     if "Lead_Time_Dias" in df_final.columns:
         df_final["brecha_entrega"] = df_final["Tiempo_Entrega"] - df_final["Lead_Time_Dias"].fillna(0)
     else:
         df_final["brecha_entrega"] = 0
 
     # --- 7. Lógica de la Paradoja de Fidelidad ---
+    pasos.paso("7. Paradoja de fidelidad", df_final)
     stock_q3 = df_final["Stock_Actual"].quantile(0.75) if len(df_final) > 0 else 0
     df_final["paradoja_fidelidad"] = (df_final["Stock_Actual"] > stock_q3) & (df_final["NPS_Numerico"] < 7)
 
+    pasos.cerrar(df_final)
     return df_final
\ No newline at end of file
@@ -0,0 +1,299 @@
+# -*- coding: utf-8 -*-
+"""
+Dataset consolidado publicado como archivo Arrow IPC mapeado en memoria.
+
+``st.cache_data`` entrega a cada llamada una copia (deserializada) del
+dataframe, así que cada sesión y cada worker tenía su propio ``df_dss``.
+Con este módulo el dataset se construye una vez por versión y se publica en
+``DSS_DATASET_DIR`` como archivo Arrow IPC (Feather v2) sin comprimir::
+
+    dss_<version>_<codigo>.arrow    # huellas de los CSV y del código del pipeline
+
+Cada proceso lo abre con ``pyarrow.memory_map`` en solo lectura y lo
+comparte entre sus sesiones (``st.cache_resource``). Las columnas numéricas
+y de fecha sin nulos quedan respaldadas por el mapeo, sin copia: sus páginas
+viven en la caché del sistema operativo y son las mismas para todos los
+workers. Las columnas de texto se materializan una vez por proceso.
+
+Los health scores, métricas de calidad y la traza del pipeline viajan en los
+metadatos del esquema (como JSON), de modo que la publicación (escritura en
+temporal + ``os.replace``) es atómica y varios workers pueden competir sin
+riesgo.
+Los datos auxiliares más pesados de una versión (p. ej. el estado de la
+ingesta incremental) van aparte, como anexos que solo se abren si se piden::
+
+    dss_<version>_<codigo>.anexos/    # <nombre>.arrow + metadatos.json
+
+El directorio de publicación (por defecto ``<tmp>/dss_dataset-<uid>``) se
+crea con permisos 0700 y solo se usa si es del usuario del proceso y nadie
+más puede escribir en él; un archivo publicado que no sea del usuario no se
+abre. Los workers de un despliegue corren con el mismo usuario.
+
+El dataframe devuelto es compartido: no se debe modificar en su lugar.
+"""
+import getpass
+import glob
+import hashlib
+import json
+import logging
+import os
+import shutil
+import stat
+import tempfile
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+from src import config
+
+logger = logging.getLogger(__name__)
+
+# Cambia cuando cambia el formato del archivo publicado
+FORMATO = "2"
+_CLAVE_METADATOS = b"dss.metadatos"
+
+# Módulos cuyo código determina el contenido del dataset
+_MODULOS_PIPELINE = ("data_loader.py", "inventario.py", "feedback.py",
+                     "transacciones.py", "rutas.py", "motor_polars.py", "ingesta.py")
+
+
+def disponible() -> bool:
+    if not config.DATASET_COMPARTIDO:
+        return False
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        logger.warning("DSS_DATASET_COMPARTIDO=1 pero pyarrow no está instalado; "
+                       "cada proceso construye su copia")
+        return False
+    try:
+        preparar_directorio()
+    except OSError as e:
+        logger.warning("Directorio del dataset compartido no utilizable (%s); "
+                       "cada proceso construye su copia", e)
+        return False
+    return True
+
+
+def directorio() -> str:
+    if config.DATASET_DIR:
+        return config.DATASET_DIR
+    usuario = os.getuid() if hasattr(os, "getuid") else getpass.getuser()
+    return os.path.join(tempfile.gettempdir(), f"dss_dataset-{usuario}")
+
+
+def es_propio(ruta: str) -> bool:
+    """*ruta* es del usuario del proceso, no es un enlace y nadie más la puede escribir."""
+    info = os.lstat(ruta)
+    if stat.S_ISLNK(info.st_mode):
+        return False
+    if hasattr(os, "getuid") and info.st_uid != os.getuid():
+        return False
+    return not info.st_mode & (stat.S_IWGRP | stat.S_IWOTH)
+
+
+def preparar_directorio() -> str:
+    """Crea el directorio de publicación (0700) y comprueba que es del usuario."""
+    ruta = directorio()
+    os.makedirs(ruta, mode=0o700, exist_ok=True)
+    if not es_propio(ruta):
+        raise PermissionError(f"{ruta} no es del usuario del proceso o otros pueden escribir en él")
+    return ruta
+
+
+def _verificar(ruta: str) -> None:
+    if not es_propio(ruta):
+        raise PermissionError(f"{ruta} no es del usuario del proceso; no se abre")
+
+
+@lru_cache(maxsize=1)
+def huella_codigo() -> str:
+    """Huella del código del pipeline: un cambio en la limpieza invalida el archivo."""
+    h = hashlib.sha1(FORMATO.encode())
+    base = os.path.dirname(os.path.abspath(__file__))
+    for nombre in _MODULOS_PIPELINE:
+        ruta = os.path.join(base, nombre)
+        if os.path.exists(ruta):
+            with open(ruta, "rb") as fh:
+                h.update(fh.read())
+    return h.hexdigest()[:12]
+
+
+def ruta_dataset(version: str) -> str:
+    return os.path.join(directorio(), f"dss_{version}_{huella_codigo()}.arrow")
+
+
+def ruta_anexos(version: str) -> str:
+    return _ruta_anexos(ruta_dataset(version))
+
+
+def _ruta_anexos(ruta: str) -> str:
+    return os.path.splitext(ruta)[0] + ".anexos"
+
+
+# =====================================================================
+#  Publicación y apertura
+# =====================================================================
+
+def publicar(ruta: str, df_dss, metadatos: dict) -> None:
+    """Escribe *df_dss* (dataframe o tabla Arrow) y *metadatos* en *ruta* de forma atómica."""
+    import pyarrow as pa
+
+    if isinstance(df_dss, pa.Table):
+        tabla = df_dss
+    else:
+        tabla = pa.Table.from_pandas(df_dss, preserve_index=False)
+    esquema = tabla.schema.with_metadata({
+        **(tabla.schema.metadata or {}),
+        _CLAVE_METADATOS: json.dumps(metadatos, default=_a_json).encode("utf-8"),
+    })
+    tabla = tabla.replace_schema_metadata(esquema.metadata)
+    preparar_directorio()
+    _escribir_tabla(ruta, tabla)
+    _limpiar_versiones(ruta)
+
+
+def _a_json(valor):
+    """Escalares numpy y fechas en los metadatos (``json.dumps(default=...)``)."""
+    if isinstance(valor, np.generic):
+        return valor.item()
+    if isinstance(valor, (pd.Timestamp, pd.Timedelta)):
+        return str(valor)
+    raise TypeError(f"Metadato no serializable: {type(valor).__name__}")
+
+
+def _escribir_tabla(ruta: str, tabla) -> None:
+    """Escribe *tabla* como Arrow IPC sin comprimir en *ruta* de forma atómica."""
+    import pyarrow as pa
+
+    # mkstemp crea el archivo con permisos 0600 (solo el usuario del proceso).
+    fd, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix=".tmp")
+    os.close(fd)
+    try:
+        # Sin compresión: el mapeo en memoria solo evita copias así.
+        with pa.OSFile(temporal, "wb") as fh:
+            with pa.ipc.new_file(fh, tabla.schema) as escritor:
+                escritor.write_table(tabla)
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+def abrir(ruta: str) -> tuple:
+    """Abre el archivo publicado: (tabla Arrow mapeada, metadatos)."""
+    tabla = _abrir_tabla(ruta)
+    metadatos = json.loads(tabla.schema.metadata[_CLAVE_METADATOS])
+    return tabla, metadatos
+
+
+def _abrir_tabla(ruta: str):
+    import pyarrow as pa
+
+    _verificar(ruta)
+    return pa.ipc.open_file(pa.memory_map(ruta, "r")).read_all()
+
+
+def publicar_anexos(version: str, tablas: dict, metadatos: dict) -> None:
+    """Publica los anexos de *version*: tablas Arrow (nombre -> tabla) y metadatos JSON.
+
+    Se escriben en un directorio temporal que se renombra al final; si otro
+    proceso los publicó antes, se conservan los suyos.
+    """
+    destino = ruta_anexos(version)
+    if os.path.isdir(destino):
+        return
+    temporal = tempfile.mkdtemp(dir=preparar_directorio(), suffix=".tmp")
+    try:
+        for nombre, tabla in tablas.items():
+            _escribir_tabla(os.path.join(temporal, f"{nombre}.arrow"), tabla)
+        with open(os.path.join(temporal, "metadatos.json"), "w", encoding="utf-8") as fh:
+            json.dump(metadatos, fh)
+        os.rename(temporal, destino)
+    except OSError:
+        shutil.rmtree(temporal, ignore_errors=True)
+        if not os.path.isdir(destino):
+            raise
+    except BaseException:
+        shutil.rmtree(temporal, ignore_errors=True)
+        raise
+
+
+def abrir_anexos(version: str):
+    """``(tablas, metadatos)`` de los anexos de *version*; ``None`` si no hay.
+
+    Tampoco se usan si el directorio o algún archivo no es del usuario.
+    """
+    origen = ruta_anexos(version)
+    archivo_metadatos = os.path.join(origen, "metadatos.json")
+    if not os.path.exists(archivo_metadatos):
+        return None
+    try:
+        _verificar(origen)
+        _verificar(archivo_metadatos)
+        with open(archivo_metadatos, encoding="utf-8") as fh:
+            metadatos = json.load(fh)
+        tablas = {
+            os.path.splitext(os.path.basename(ruta))[0]: _abrir_tabla(ruta)
+            for ruta in glob.glob(os.path.join(origen, "*.arrow"))
+        }
+    except PermissionError:
+        logger.warning("Anexos ajenos en %s; se ignoran", origen)
+        return None
+    return tablas, metadatos
+
+
+def a_pandas(tabla) -> pd.DataFrame:
+    """Dataframe de solo lectura respaldado (donde se puede) por el mapeo.
+
+    Reproduce los tipos del pipeline: los enteros con nulos vuelven como
+    columnas object y los nulos de texto como NaN (Arrow los entrega como
+    ``None``, que ``astype(str)`` convertiría en "None").
+    """
+    # ``split_blocks`` deja cada columna en su propio bloque para que las
+    # numéricas sin nulos apunten al mapeo en lugar de consolidarse en copia.
+    df = tabla.to_pandas(split_blocks=True, integer_object_nulls=True)
+    for columna in df.columns[df.dtypes == object]:
+        serie = df[columna]
+        if serie.hasnans:
+            df[columna] = serie.where(serie.notna(), np.nan)
+    return df
+
+
+def _limpiar_versiones(ruta_actual: str) -> None:
+    """Conserva las ``DSS_DATASET_VERSIONES`` publicaciones más recientes."""
+    archivos = sorted(glob.glob(os.path.join(os.path.dirname(ruta_actual), "dss_*.arrow")),
+                      key=os.path.getmtime, reverse=True)
+    for ruta in archivos[max(1, config.DATASET_VERSIONES):]:
+        if ruta == ruta_actual:
+            continue
+        try:
+            os.remove(ruta)
+        except OSError:
+            # En Windows un archivo mapeado por otro proceso no se puede borrar.
+            logger.debug("No se pudo borrar la versión antigua %s", ruta)
+        shutil.rmtree(_ruta_anexos(ruta), ignore_errors=True)
+
+
+def obtener(version: str, construir) -> tuple:
+    """Abre la versión publicada o la construye con ``construir()`` y la publica.
+
+    ``construir`` devuelve ``(df_dss, metadatos)`` (``df_dss`` puede ser una
+    tabla Arrow, p. ej. la ingesta incremental); solo se llama si ningún
+    proceso publicó antes esta versión. Devuelve ``(tabla, metadatos)``: la
+    conversión a pandas (completa o proyectada) queda a cargo de quien llama.
+    """
+    ruta = ruta_dataset(version)
+    if os.path.exists(ruta):
+        try:
+            return abrir(ruta)
+        except PermissionError as e:
+            logger.warning("%s; se reconstruye", e)
+        except Exception:
+            logger.exception("Archivo de dataset ilegible, se reconstruye: %s", ruta)
+    df_dss, metadatos = construir()
+    publicar(ruta, df_dss, metadatos)
+    logger.info("Dataset publicado en %s", ruta)
+    return abrir(ruta)
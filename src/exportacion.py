@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+Exportación de la vista filtrada: CSV (opcionalmente gzip), Parquet y XLSX.
+
+Los archivos se construyen solo cuando alguien los pide (``src.ui.exportacion``)
+y por bloques de ``DSS_EXPORTACION_FILAS_BLOQUE`` filas: cada bloque se
+completa con las columnas de exportación (``AlmacenExportacion``) y se escribe
+antes de pasar al siguiente, así que la tabla maestra filtrada nunca se
+materializa entera::
+
+    datos = construir("csv.gz", df_filtrado, almacen)
+
+Este módulo no usa Streamlit; la caché por estado de filtros vive en la UI.
+"""
+import codecs
+import gzip
+import importlib.util
+import io
+import logging
+import time
+from functools import lru_cache
+
+import pandas as pd
+
+from src import config
+from src.columnas import DERIVADAS
+from src.telemetria import histograma
+
+logger = logging.getLogger(__name__)
+
+_DURACION_EXPORTACION = histograma(
+    "dss_exportacion_segundos", "Construcción de archivos de exportación", ("formato",)
+)
+
+FORMATOS = {
+    "csv": {"etiqueta": "CSV", "extension": "csv", "mime": "text/csv"},
+    "csv.gz": {"etiqueta": "CSV comprimido (gzip)", "extension": "csv.gz",
+               "mime": "application/gzip"},
+    "parquet": {"etiqueta": "Parquet", "extension": "parquet",
+                "mime": "application/vnd.apache.parquet"},
+    "xlsx": {"etiqueta": "Excel (XLSX)", "extension": "xlsx",
+             "mime": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"},
+}
+
+# Filas de datos por hoja de Excel (el límite del formato, menos el encabezado)
+_FILAS_HOJA_XLSX = 1_048_575
+
+
+@lru_cache(maxsize=None)
+def formatos_disponibles() -> tuple:
+    """Formatos de ``FORMATOS`` cuyas dependencias están instaladas.
+
+    Solo se buscan los paquetes (``find_spec``), sin importarlos: la UI lo
+    llama en cada rerun y pyarrow/openpyxl se cargan al exportar.
+    """
+    formatos = ["csv", "csv.gz"]
+    if importlib.util.find_spec("pyarrow") is not None:
+        formatos.append("parquet")
+    if importlib.util.find_spec("openpyxl") is not None:
+        formatos.append("xlsx")
+    return tuple(formatos)
+
+
+def bloques(df_filtrado: pd.DataFrame, almacen=None, filas: int = None):
+    """Tabla maestra filtrada en bloques de *filas* filas (al menos un bloque)."""
+    filas = max(1, filas or config.EXPORTACION_FILAS_BLOQUE)
+    for inicio in range(0, max(len(df_filtrado), 1), filas):
+        bloque = df_filtrado.iloc[inicio:inicio + filas]
+        if almacen is not None:
+            yield almacen.completar(bloque)
+        else:
+            yield bloque.drop(columns=[c for c in DERIVADAS if c in bloque.columns])
+
+
+# =====================================================================
+#  CSV
+# =====================================================================
+
+def _formato_fechas(df_filtrado: pd.DataFrame, almacen) -> tuple:
+    """(``date_format``, columnas de solo fecha) comunes a todos los bloques.
+
+    ``to_csv`` omite la hora de una columna si *todas* sus filas caen a
+    medianoche; por bloques esa decisión se tomaría bloque a bloque, así que
+    se toma antes sobre las columnas completas.
+    """
+    muestra = next(bloques(df_filtrado.iloc[:0], almacen))
+    solo_fecha, con_hora = [], False
+    for columna in muestra.columns:
+        if not pd.api.types.is_datetime64_any_dtype(muestra[columna]):
+            continue
+        if columna in df_filtrado.columns:
+            serie = df_filtrado[columna].dropna()
+        else:
+            serie = almacen.columna(columna, df_filtrado.index).dropna()
+        if (serie == serie.dt.normalize()).all():
+            solo_fecha.append(columna)
+        else:
+            con_hora = True
+    if not con_hora:
+        return "%Y-%m-%d", []
+    return "%Y-%m-%d %H:%M:%S", solo_fecha
+
+
+def _escribir_csv(destino, df_filtrado, almacen, codificacion: str, filas: int) -> None:
+    formato_fecha, solo_fecha = _formato_fechas(df_filtrado, almacen)
+    if codificacion.lower().replace("_", "-") == "utf-8-sig":
+        # El BOM va una sola vez, no al inicio de cada bloque.
+        destino.write(codecs.BOM_UTF8)
+        codificacion = "utf-8"
+    for numero, bloque in enumerate(bloques(df_filtrado, almacen, filas)):
+        if solo_fecha:
+            bloque = bloque.assign(**{c: bloque[c].dt.strftime("%Y-%m-%d") for c in solo_fecha})
+        bloque.to_csv(destino, index=False, header=numero == 0, encoding=codificacion,
+                      date_format=formato_fecha, mode="wb")
+
+
+# =====================================================================
+#  Parquet
+# =====================================================================
+
+def _escribir_parquet_bloques(destino, iterador) -> None:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    escritor = esquema = None
+    try:
+        for bloque in iterador:
+            if escritor is None:
+                tabla = pa.Table.from_pandas(bloque, preserve_index=False)
+                # Columnas object con enteros y NaN (p. ej. Lead_Time_Dias):
+                # un bloque sin decimales no debe fijar el tipo entero.
+                campos = [
+                    campo.with_type(pa.float64())
+                    if pa.types.is_integer(campo.type) and bloque[campo.name].dtype == object
+                    else campo
+                    for campo in tabla.schema
+                ]
+                esquema = pa.schema(campos, metadata=tabla.schema.metadata)
+                tabla = tabla.cast(esquema)
+                escritor = pq.ParquetWriter(destino, esquema)
+            else:
+                tabla = pa.Table.from_pandas(bloque, schema=esquema, preserve_index=False)
+            escritor.write_table(tabla)
+    finally:
+        if escritor is not None:
+            escritor.close()
+
+
+def _escribir_parquet(destino, df_filtrado, almacen, filas: int) -> None:
+    import pyarrow as pa
+
+    try:
+        _escribir_parquet_bloques(destino, bloques(df_filtrado, almacen, filas))
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Un bloque no encaja en el esquema del primero (columna object con
+        # tipos distintos): se reescribe con el esquema de la vista completa.
+        logger.info("Esquema Parquet inestable entre bloques; se escribe en un solo bloque")
+        destino.seek(0)
+        destino.truncate()
+        _escribir_parquet_bloques(destino, bloques(df_filtrado, almacen, len(df_filtrado)))
+
+
+# =====================================================================
+#  XLSX (openpyxl en modo write-only)
+# =====================================================================
+
+def _filas_excel(df: pd.DataFrame):
+    """Filas de *df* con tipos que openpyxl acepta (nulos como celdas vacías)."""
+    valores = df.astype(object).where(df.notna(), None)
+    return valores.itertuples(index=False, name=None)
+
+
+def _escribir_xlsx(destino, df_filtrado, almacen, filas: int, hojas_extra: dict) -> None:
+    from openpyxl import Workbook
+
+    libro = Workbook(write_only=True)
+    hoja, numero_hoja, filas_hoja = None, 0, 0
+    encabezado = None
+    for bloque in bloques(df_filtrado, almacen, filas):
+        encabezado = list(bloque.columns)
+        for fila in _filas_excel(bloque):
+            if hoja is None or filas_hoja == _FILAS_HOJA_XLSX:
+                numero_hoja += 1
+                hoja = libro.create_sheet("Datos" if numero_hoja == 1 else f"Datos_{numero_hoja}")
+                hoja.append(encabezado)
+                filas_hoja = 0
+            hoja.append(fila)
+            filas_hoja += 1
+    if hoja is None:
+        libro.create_sheet("Datos").append(encabezado)
+
+    for nombre, tabla in (hojas_extra or {}).items():
+        hoja = libro.create_sheet(nombre[:31])
+        hoja.append([str(c) for c in tabla.columns])
+        for fila in _filas_excel(tabla):
+            hoja.append(fila)
+    libro.save(destino)
+
+
+# =====================================================================
+#  Punto de entrada
+# =====================================================================
+
+def construir(formato: str, df_filtrado: pd.DataFrame, almacen=None,
+              codificacion: str = "utf-8-sig", hojas_extra: dict = None,
+              filas: int = None) -> bytes:
+    """Archivo *formato* (clave de ``FORMATOS``) con la tabla maestra filtrada.
+
+    *codificacion* aplica a los CSV; *hojas_extra* (nombre -> dataframe) son
+    hojas adicionales del XLSX, después de los datos.
+    """
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato de exportación desconocido: {formato}")
+    filas = filas or config.EXPORTACION_FILAS_BLOQUE
+    inicio = time.perf_counter()
+    destino = io.BytesIO()
+    if formato == "csv":
+        _escribir_csv(destino, df_filtrado, almacen, codificacion, filas)
+    elif formato == "csv.gz":
+        # mtime=0: el mismo contenido produce los mismos bytes.
+        with gzip.GzipFile(fileobj=destino, mode="wb", mtime=0) as comprimido:
+            _escribir_csv(comprimido, df_filtrado, almacen, codificacion, filas)
+    elif formato == "parquet":
+        _escribir_parquet(destino, df_filtrado, almacen, filas)
+    else:
+        _escribir_xlsx(destino, df_filtrado, almacen, filas, hojas_extra)
+    _DURACION_EXPORTACION.observar(time.perf_counter() - inicio, formato=formato)
+    return destino.getvalue()
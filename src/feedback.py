@@ -2,6 +2,8 @@
 import numpy as np
 import pandas as pd
 
+from src.instrumentacion import iniciar_etapa
+
 pd.set_option('future.no_silent_downcasting', True)
 
 def normalizar_nps_dinamico(valor):
@@ -28,26 +30,33 @@ def normalizar_nps_dinamico(valor):
         return 5.0
 
 def procesar_feedback(ruta_csv):
+    pasos = iniciar_etapa("feedback")
+    pasos.paso("1. Lectura y nombres de columnas")
     try:
         df_feedback = pd.read_csv(ruta_csv)
     except Exception as e:
+        pasos.cerrar()
         return pd.DataFrame(), {"error": str(e)}
 
     # 1. Limpieza de nombres de columnas
     df_feedback.columns = [c.strip() for c in df_feedback.columns]
     
     # 2. Cálculo de Calidad Inicial
+    pasos.paso("2. Calidad inicial", df_feedback)
     salud_antes = calcular_health_score(df_feedback)
 
     # 3. Transformación y Normalización de NPS
+    pasos.paso("3. Normalización de NPS", df_feedback)
     df_feedback["NPS_Numerico"] = df_feedback["Satisfaccion_NPS"].apply(normalizar_nps_dinamico)
 
     # 4. Categorización NPS
+    pasos.paso("4. Categorización NPS", df_feedback)
     df_feedback["NPS_Categoria"] = df_feedback["NPS_Numerico"].apply(
         lambda x: "Promotor" if x >= 9 else ("Pasivo" if x >= 7 else "Detractor")
     )
 
     # 5. Limpieza de Rating_Producto
+    pasos.paso("5. Limpieza de Rating_Producto", df_feedback)
     rating_raw = pd.to_numeric(df_feedback["Rating_Producto"], errors='coerce')
     mask_rating_outlier = rating_raw > 5
     mask_rating_nulo = rating_raw.isna()
@@ -64,6 +73,7 @@ def procesar_feedback(ruta_csv):
     df_feedback["Rating_Producto"] = df_feedback["Rating_Producto"].fillna(valor_relleno_rating)
 
     # 6. Limpieza de Edad y Soporte
+    pasos.paso("6. Limpieza de edad y soporte", df_feedback)
     edad_raw = pd.to_numeric(df_feedback["Edad_Cliente"], errors='coerce')
     edades_corregidas = int(edad_raw.isna().sum())
     df_feedback["Edad_Cliente"] = edad_raw.fillna(35)
@@ -78,6 +88,7 @@ def procesar_feedback(ruta_csv):
     df_feedback["Ticket_Soporte"] = soporte_raw.map(mapeo_soporte).fillna(0).astype(int)
 
     # 7. Cálculo de Calidad Final
+    pasos.paso("7. Calidad final", df_feedback)
     salud_despues = calcular_health_score(df_feedback)
 
     metricas = {
@@ -88,6 +99,7 @@ def procesar_feedback(ruta_csv):
         "edades_corregidas": edades_corregidas,
         "ratings_corregidos": ratings_corregidos
     }
+    pasos.cerrar(df_feedback)
 
     return df_feedback, metricas
 
@@ -1,7 +1,29 @@
 ﻿# -*- coding: utf-8 -*-
+import hashlib
+import json
+
 import streamlit as st
 import pandas as pd
 
+from src.columnas import congelar
+from src.telemetria import histograma
+
+_DURACION_FILTROS = histograma(
+    "dss_filtros_segundos", "Construcción del panel y aplicación de filtros"
+)
+
+
+def hash_estado_filtros(filtros: dict) -> str:
+    """Huella estable del estado de filtros (independiente del orden de selección)."""
+    normalizado = {
+        clave: sorted(map(str, valor)) if isinstance(valor, (list, tuple, set)) else str(valor)
+        for clave, valor in sorted(filtros.items())
+    }
+    texto = json.dumps(normalizado, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha1(texto.encode("utf-8")).hexdigest()[:16]
+
+
+@_DURACION_FILTROS.cronometrar()
 def crear_sidebar_filtros(df_dss):
 
     st.sidebar.title("🎛️ Panel de Control")
@@ -10,7 +32,11 @@ def crear_sidebar_filtros(df_dss):
     # Filtros principales
     st.sidebar.subheader("🔍 Filtros de Negocio")
     
-    df_filtrado = df_dss.copy()
+    # Los filtros se acumulan en una sola máscara y se aplican al final:
+    # una selección de filas en vez de una copia por filtro. ``df_dss`` es
+    # de solo lectura (``Fecha_Venta`` ya llega como fecha desde la carga).
+    mascara = pd.Series(True, index=df_dss.index)
+    filtros_activos = {}
     
     # 1. Filtro por Categoría (Incluye 'no Catalogado' de la Venta Invisible)
     if "Categoria" in df_dss.columns:
@@ -21,8 +47,9 @@ def crear_sidebar_filtros(df_dss):
             options=categorias,
             default=categorias
         )
+        filtros_activos["Categoria"] = cat_sel
         if cat_sel:
-            df_filtrado = df_filtrado[df_filtrado["Categoria"].isin(cat_sel)]
+            mascara &= df_dss["Categoria"].isin(cat_sel)
     
     # 2. Filtro por Ciudad Destino
     if "Ciudad_Destino" in df_dss.columns:
@@ -32,8 +59,9 @@ def crear_sidebar_filtros(df_dss):
             options=ciudades,
             default=ciudades 
         )
+        filtros_activos["Ciudad_Destino"] = city_sel
         if city_sel:
-            df_filtrado = df_filtrado[df_filtrado["Ciudad_Destino"].isin(city_sel)]
+            mascara &= df_dss["Ciudad_Destino"].isin(city_sel)
 
     # 3. Filtro por Estado de Envío
     if "Estado_Envio" in df_dss.columns:
@@ -43,13 +71,13 @@ def crear_sidebar_filtros(df_dss):
             options=estados,
             default=estados
         )
+        filtros_activos["Estado_Envio"] = estado_sel
         if estado_sel:
-            df_filtrado = df_filtrado[df_filtrado["Estado_Envio"].isin(estado_sel)]
+            mascara &= df_dss["Estado_Envio"].isin(estado_sel)
     
     # 4. Filtro por Rango de Fechas
     if "Fecha_Venta" in df_dss.columns:
         st.sidebar.subheader("📅 Período de Análisis")
-        df_dss["Fecha_Venta"] = pd.to_datetime(df_dss["Fecha_Venta"])
         fecha_min = df_dss["Fecha_Venta"].min().date()
         fecha_max = df_dss["Fecha_Venta"].max().date()
         
@@ -61,17 +89,26 @@ def crear_sidebar_filtros(df_dss):
         )
         
         if isinstance(rango_fechas, tuple) and len(rango_fechas) == 2:
-            df_filtrado = df_filtrado[
-                (df_filtrado["Fecha_Venta"].dt.date >= rango_fechas[0]) &
-                (df_filtrado["Fecha_Venta"].dt.date <= rango_fechas[1])
-            ]
+            filtros_activos["Fecha_Venta"] = [d.isoformat() for d in rango_fechas]
+            fechas = df_dss["Fecha_Venta"].dt.date
+            mascara &= (fechas >= rango_fechas[0]) & (fechas <= rango_fechas[1])
     
     # 5. Segmentación por Rentabilidad
     st.sidebar.markdown("---")
     st.sidebar.subheader("💸 Filtros de Margen")
     solo_negativos = st.sidebar.checkbox("Mostrar solo Margen Negativo")
+    filtros_activos["solo_margen_negativo"] = solo_negativos
     if solo_negativos:
-        df_filtrado = df_filtrado[df_filtrado["margen_real"] < 0]
+        mascara &= df_dss["margen_real"] < 0
+
+    # Sin filtros efectivos las páginas reciben una vista del dataset (sin
+    # copia); en ambos casos el frame es de solo lectura.
+    df_filtrado = congelar(df_dss if mascara.all() else df_dss[mascara])
+
+    # Estado de filtros de la vista actual: permite a otros componentes
+    # (p. ej. el chat) reutilizar cálculos mientras la vista no cambie.
+    st.session_state["filtros_activos"] = filtros_activos
+    st.session_state["hash_filtros"] = hash_estado_filtros(filtros_activos)
 
     st.sidebar.markdown("---")
     st.sidebar.caption(f"Visualizando {len(df_filtrado):,} de {len(df_dss):,} registros")
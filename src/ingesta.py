@@ -0,0 +1,281 @@
+# -*- coding: utf-8 -*-
+"""
+Ingesta incremental de lotes de transacciones nuevas.
+
+En lugar de volver a procesar el histórico completo, un lote (CSV con las
+columnas de ``transacciones_logistica_v2.csv``) se limpia solo, se cruza
+con las dimensiones de inventario y feedback en caché y se agrega al
+dataset consolidado publicado::
+
+    df_lote, metricas_lote, estado, stock_q3, traza = procesar_lote(ruta_lote, huella, estado)
+
+El ``estado`` de ingesta sale del pipeline completo
+(``construir_dataset_dss(..., estado_ingesta={})``), así que el primer lote
+no vuelve a procesar el histórico. Con el dataset publicado
+(``src.dataset_compartido``) se guarda como anexos de la versión
+(``a_anexos`` / ``de_anexos``: tablas Arrow y metadatos JSON), no dentro
+del archivo del dataset. Contiene:
+
+- ``inventario`` / ``feedback``: dimensiones limpias usadas en los cruces.
+- ``rutas`` y ``sketches_ruta``: la dimensión de rutas (bodega × ciudad,
+  con códigos estables) y, por columna imputada, el sketch de valores
+  observados por código (``src.rutas``). Las medianas de imputación salen de
+  ahí y son las del histórico más el lote (exactas mientras el sketch no se
+  compacte).
+- ``conteos_stock``: conteo de ``Stock_Actual``; de ahí sale ``stock_q3``,
+  el umbral de la paradoja de fidelidad.
+- ``formato_fechas``: formato de ``Fecha_Venta`` inferido del histórico (un
+  lote corto podría inferir otro, p. ej. mes/día en vez de día/mes).
+- ``fecha_max`` y las huellas de los ``lotes`` ya ingeridos (un lote
+  repetido no se vuelve a agregar).
+
+Las filas del lote quedan iguales a las de un reproceso completo del
+histórico con el lote. Las filas anteriores conservan su imputación (no se
+reimputan con las medianas nuevas); solo ``paradoja_fidelidad`` se
+recalcula en todo el dataset si cambia ``stock_q3``.
+"""
+import logging
+
+import numpy as np
+import pandas as pd
+
+from src import rutas
+from src.feedback import procesar_feedback
+from src.instrumentacion import TrazaPipeline, iniciar_etapa, trazar
+from src.inventario import procesar_inventario
+from src.telemetria import histograma
+from src.transacciones import (
+    completar_transacciones,
+    formato_fecha,
+    imputar_por_ruta,
+    limpiar_transacciones,
+    sketches_ruta,
+)
+
+logger = logging.getLogger(__name__)
+
+_DURACION_LOTE = histograma("dss_ingesta_lote_segundos", "Ingesta incremental de un lote")
+
+
+# =====================================================================
+#  Estadísticas mantenidas
+# =====================================================================
+
+def sumar_conteos(previos: pd.Series, nuevos: pd.Series) -> pd.Series:
+    if previos is None or previos.empty:
+        return nuevos.sort_index()
+    return previos.add(nuevos, fill_value=0).astype("int64").sort_index()
+
+
+def cuantil_conteos(conteos: pd.Series, q: float) -> float:
+    """Cuantil *q* de un conteo de valores (interpolación lineal, como ``Series.quantile``)."""
+    if conteos.empty:
+        return 0
+    # Un sketch de una sola ruta (código 0): misma reconstrucción que las medianas.
+    sketch = pd.Series(
+        conteos.to_numpy(),
+        index=pd.MultiIndex.from_arrays(
+            [np.zeros(len(conteos), dtype="int64"), conteos.index.to_numpy(dtype=float)],
+            names=["codigo", "valor"],
+        ),
+    ).sort_index()
+    return float(rutas.cuantiles(sketch, 1, q)[0])
+
+
+# =====================================================================
+#  Estado de ingesta
+# =====================================================================
+
+def nuevo_estado(df_inv: pd.DataFrame, df_feed: pd.DataFrame, estado_rutas: dict,
+                 df_dss: pd.DataFrame) -> dict:
+    """Estado de ingesta de un dataset recién construido por el pipeline.
+
+    *estado_rutas* es el que deja ``procesar_transacciones``; *df_dss* el
+    dataset consolidado (basta con ``Stock_Actual`` y ``Fecha_Venta``).
+    """
+    return {
+        "inventario": df_inv,
+        "feedback": df_feed,
+        **estado_rutas,
+        "conteos_stock": df_dss["Stock_Actual"].value_counts().sort_index(),
+        "fecha_max": df_dss["Fecha_Venta"].max(),
+        "lotes": [],
+    }
+
+
+def estado_inicial(ruta_inventario: str, ruta_feedback: str, ruta_transacciones: str,
+                   df_base: pd.DataFrame) -> dict:
+    """Estado de ingesta reconstruido desde los CSV del histórico.
+
+    Solo para datasets sin estado guardado (construidos con el motor Polars,
+    que no expone los pasos intermedios, o con los anexos ya borrados):
+    limpia de nuevo las dimensiones y las transacciones hasta la ruta.
+    """
+    logger.info("Dataset sin estado de ingesta; se reconstruye desde el histórico")
+    pasos = iniciar_etapa("ingesta")
+    df_inv, _ = procesar_inventario(ruta_inventario)
+    df_feed, _ = procesar_feedback(ruta_feedback)
+    df_raw = pd.read_csv(ruta_transacciones)
+    df_trans, dimension_rutas = limpiar_transacciones(df_raw, df_inv, df_feed, pasos)
+    pasos.cerrar()
+    estado_rutas = {
+        "formato_fechas": formato_fecha(df_raw),
+        "rutas": dimension_rutas,
+        "sketches_ruta": sketches_ruta(df_trans),
+    }
+    return nuevo_estado(df_inv, df_feed, estado_rutas, df_base)
+
+
+# =====================================================================
+#  Persistencia (anexos de la versión publicada)
+# =====================================================================
+
+def a_anexos(estado: dict) -> tuple:
+    """``(tablas, metadatos)`` del estado: tablas Arrow y un dict serializable en JSON."""
+    import pyarrow as pa
+
+    sketches = pd.concat(
+        {columna: sketch.rename("conteo") for columna, sketch in estado["sketches_ruta"].items()},
+        names=["columna"],
+    ).reset_index()
+    tablas = {
+        "inventario": estado["inventario"],
+        "feedback": estado["feedback"],
+        "rutas": estado["rutas"],
+        "sketches_ruta": sketches,
+        "conteos_stock": estado["conteos_stock"].rename_axis("valor").rename("conteo").reset_index(),
+    }
+    tablas = {nombre: pa.Table.from_pandas(df, preserve_index=False)
+              for nombre, df in tablas.items()}
+    metadatos = {
+        "formato_fechas": estado["formato_fechas"],
+        "fecha_max": pd.Timestamp(estado["fecha_max"]).isoformat(),
+        "lotes": list(estado["lotes"]),
+    }
+    return tablas, metadatos
+
+
+def de_anexos(tablas: dict, metadatos: dict) -> dict:
+    """Estado de ingesta a partir de ``a_anexos`` (tablas ya abiertas)."""
+    from src.dataset_compartido import a_pandas
+
+    sketches = a_pandas(tablas["sketches_ruta"])
+    stock = a_pandas(tablas["conteos_stock"])
+    return {
+        "inventario": a_pandas(tablas["inventario"]),
+        "feedback": a_pandas(tablas["feedback"]),
+        "formato_fechas": metadatos["formato_fechas"],
+        "rutas": a_pandas(tablas["rutas"]),
+        "sketches_ruta": {
+            columna: grupo.set_index(["codigo", "valor"])["conteo"]
+            for columna, grupo in sketches.groupby("columna", sort=False)
+        },
+        "conteos_stock": stock.set_index("valor")["conteo"],
+        "fecha_max": pd.Timestamp(metadatos["fecha_max"]),
+        "lotes": list(metadatos["lotes"]),
+    }
+
+
+def procesar_lote(ruta_lote: str, huella: str, estado: dict) -> tuple:
+    """Limpia y consolida un lote: ``(df_lote, metricas_lote, estado, stock_q3, traza)``.
+
+    ``df_lote`` tiene las columnas del dataset consolidado; ``None`` si el
+    lote (por su *huella*) ya estaba ingerido. ``metricas_lote`` son las de
+    ``completar_transacciones`` sobre las transacciones del lote.
+    """
+    from src.data_loader import crear_dataset_consolidado
+
+    if huella in estado["lotes"]:
+        logger.info("Lote %s ya ingerido; se omite", huella)
+        return None, None, estado, None, None
+
+    traza = TrazaPipeline()
+    with trazar(traza), _DURACION_LOTE.cronometrar():
+        df_inv, df_feed = estado["inventario"], estado["feedback"]
+        pasos = iniciar_etapa("ingesta")
+        pasos.paso("Lectura del lote")
+        df_raw = pd.read_csv(ruta_lote)
+        df_trans, dimension_rutas = limpiar_transacciones(
+            df_raw, df_inv, df_feed, pasos,
+            formato_fechas=estado["formato_fechas"], dimension_rutas=estado["rutas"],
+        )
+
+        pasos.paso("Medianas por ruta (histórico + lote)", df_trans)
+        sketches = sketches_ruta(df_trans, estado["sketches_ruta"])
+        medianas = {columna: rutas.medianas(sketch, len(dimension_rutas))
+                    for columna, sketch in sketches.items()}
+        df_trans = imputar_por_ruta(df_trans, dimension_rutas, pasos, medianas=medianas)
+        fecha_max = max(estado["fecha_max"], df_trans["Fecha_Venta"].max())
+        df_trans, metricas_lote = completar_transacciones(df_trans, df_inv, fecha_max, pasos)
+
+        df_lote = crear_dataset_consolidado(df_trans, df_inv, df_feed)
+        # El umbral de la paradoja es el del dataset completo, no el del lote.
+        conteos_stock = sumar_conteos(estado["conteos_stock"],
+                                      df_lote["Stock_Actual"].value_counts().sort_index())
+        stock_q3 = cuantil_conteos(conteos_stock, 0.75)
+        df_lote["paradoja_fidelidad"] = paradoja_fidelidad(
+            df_lote["Stock_Actual"], df_lote["NPS_Numerico"], stock_q3
+        )
+
+    estado = {
+        **estado,
+        "rutas": dimension_rutas,
+        "sketches_ruta": sketches,
+        "conteos_stock": conteos_stock,
+        "fecha_max": fecha_max,
+        "lotes": estado["lotes"] + [huella],
+    }
+    return df_lote, metricas_lote, estado, stock_q3, traza.resumen()
+
+
+def actualizar_metadatos(metadatos: dict, metricas_lote: dict, traza: dict) -> dict:
+    """Metadatos del dataset con el lote: métricas de calidad y traza."""
+    metricas = {k: dict(v) for k, v in metadatos["metricas_calidad"].items()}
+    transacciones = metricas.get("transacciones", {})
+    for clave in ("total_transacciones", "skus_sin_inventario"):
+        transacciones[clave] = transacciones.get(clave, 0) + metricas_lote[clave]
+    metricas["transacciones"] = transacciones
+    return {**metadatos, "metricas_calidad": metricas, "traza": traza}
+
+
+# =====================================================================
+#  Agregar el lote al dataset
+# =====================================================================
+
+def paradoja_fidelidad(stock, nps, stock_q3: float):
+    """Regla de ``crear_dataset_consolidado`` (series pandas o arreglos Arrow)."""
+    if isinstance(stock, pd.Series):
+        return (stock > stock_q3) & (nps < 7)
+    import pyarrow.compute as pc
+
+    return pc.and_(pc.greater(stock, stock_q3), pc.less(nps, 7))
+
+
+def agregar_a_frame(df_dss: pd.DataFrame, df_lote: pd.DataFrame, stock_q3: float) -> pd.DataFrame:
+    """Dataset en memoria con el lote al final."""
+    df = pd.concat([df_dss, df_lote[df_dss.columns]], ignore_index=True)
+    df["paradoja_fidelidad"] = paradoja_fidelidad(df["Stock_Actual"], df["NPS_Numerico"], stock_q3)
+    return df
+
+
+def agregar_a_tabla(tabla, df_lote: pd.DataFrame, stock_q3: float):
+    """Tabla Arrow con el lote al final (las filas previas no se copian).
+
+    Solo ``paradoja_fidelidad`` se recalcula sobre todas las filas, con
+    ``pyarrow.compute`` y sin pasar por pandas.
+    """
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    metadatos = tabla.schema.metadata
+    nueva = pa.Table.from_pandas(df_lote[tabla.column_names], preserve_index=False)
+    tabla = pa.concat_tables(
+        [tabla.replace_schema_metadata(None), nueva.replace_schema_metadata(None)],
+        promote_options="permissive",
+    )
+    paradoja = paradoja_fidelidad(
+        pc.cast(tabla["Stock_Actual"], pa.float64()), tabla["NPS_Numerico"], stock_q3
+    )
+    indice = tabla.schema.get_field_index("paradoja_fidelidad")
+    tabla = tabla.set_column(indice, "paradoja_fidelidad", paradoja)
+    return tabla.replace_schema_metadata(metadatos)
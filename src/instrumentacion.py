@@ -0,0 +1,128 @@
+# -*- coding: utf-8 -*-
+"""
+Instrumentación ligera del pipeline de limpieza por pasos.
+
+Cada función ``procesar_*`` (y ``crear_dataset_consolidado``) marca el
+inicio de sus pasos con una sola línea::
+
+    pasos = iniciar_etapa("transacciones")
+    pasos.paso("PASO 2: Conversión de tipos", df_trans)
+    ...
+    pasos.cerrar(df_trans)
+
+Marcar un paso cierra el anterior. Por cada paso se registra la duración,
+las filas al entrar y al salir y la variación de memoria residente (RSS) del
+proceso. Los pasos solo se registran dentro de ``trazar()``; fuera de él
+``iniciar_etapa`` devuelve un objeto nulo y el costo es despreciable, por
+lo que las funciones se pueden llamar igual desde la app, los lotes o los
+benchmarks.
+"""
+import contextvars
+import json
+import os
+import time
+from contextlib import contextmanager
+
+_traza_activa = contextvars.ContextVar("traza_pipeline", default=None)
+
+
+def _rss_bytes():
+    """RSS actual del proceso, o ``None`` si el sistema no lo expone."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+class TrazaPipeline:
+    """Pasos registrados durante una ejecución del pipeline."""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.rss_inicial = _rss_bytes()
+        self.pasos = []
+
+    def resumen(self) -> dict:
+        """Representación serializable (JSON) de la traza."""
+        total_ms = sum(p["duracion_ms"] for p in self.pasos)
+        rss_final = _rss_bytes()
+        return {
+            "total_ms": round(total_ms, 1),
+            "memoria_delta_mb": (
+                round((rss_final - self.rss_inicial) / 2**20, 1)
+                if rss_final is not None and self.rss_inicial is not None else None
+            ),
+            "pasos": list(self.pasos),
+        }
+
+    def a_json(self) -> str:
+        return json.dumps(self.resumen(), ensure_ascii=False, indent=2)
+
+
+class _Etapa:
+    def __init__(self, traza: TrazaPipeline, nombre: str):
+        self._traza = traza
+        self._nombre = nombre
+        self._actual = None
+
+    def paso(self, nombre: str, df=None) -> None:
+        """Cierra el paso en curso (si hay) y abre *nombre*."""
+        ahora = time.perf_counter()
+        self._cerrar_actual(ahora, df)
+        self._actual = {
+            "nombre": nombre,
+            "t0": ahora,
+            "rss0": _rss_bytes(),
+            "filas_entrada": None if df is None else len(df),
+        }
+
+    def cerrar(self, df=None) -> None:
+        """Cierra el último paso de la etapa."""
+        self._cerrar_actual(time.perf_counter(), df)
+
+    def _cerrar_actual(self, ahora: float, df) -> None:
+        actual, self._actual = self._actual, None
+        if actual is None:
+            return
+        rss = _rss_bytes()
+        self._traza.pasos.append({
+            "etapa": self._nombre,
+            "paso": actual["nombre"],
+            "inicio_ms": round((actual["t0"] - self._traza.inicio) * 1000, 1),
+            "duracion_ms": round((ahora - actual["t0"]) * 1000, 2),
+            "filas_entrada": actual["filas_entrada"],
+            "filas_salida": None if df is None else len(df),
+            "memoria_delta_mb": (
+                round((rss - actual["rss0"]) / 2**20, 2)
+                if rss is not None and actual["rss0"] is not None else None
+            ),
+        })
+
+
+class _EtapaNula:
+    def paso(self, nombre, df=None) -> None:
+        pass
+
+    def cerrar(self, df=None) -> None:
+        pass
+
+
+_ETAPA_NULA = _EtapaNula()
+
+
+def iniciar_etapa(nombre: str):
+    """Etapa instrumentada si hay una traza activa; si no, un objeto nulo."""
+    traza = _traza_activa.get()
+    return _Etapa(traza, nombre) if traza is not None else _ETAPA_NULA
+
+
+@contextmanager
+def trazar(traza: TrazaPipeline = None):
+    """Activa *traza* (o una nueva) para el código del bloque y la devuelve."""
+    traza = traza if traza is not None else TrazaPipeline()
+    token = _traza_activa.set(traza)
+    try:
+        yield traza
+    finally:
+        _traza_activa.reset(token)
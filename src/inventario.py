@@ -3,6 +3,8 @@ import pandas as pd
 import numpy as np
 import re
 
+from src.instrumentacion import iniciar_etapa
+
 # -----------------------------
 # Constantes y configuraciones
 # -----------------------------
@@ -82,9 +84,12 @@ def calcular_health_score(df):
 def procesar_inventario(inventario_path: str) -> tuple:
     
     # 1. Carga y auditoría inicial
+    pasos = iniciar_etapa("inventario")
+    pasos.paso("1. Carga y auditoría inicial")
     try:
         inventario_raw = pd.read_csv(inventario_path)
     except Exception as e:
+        pasos.cerrar()
         return pd.DataFrame(), {"error": str(e)}
 
     # Limpieza de nombres de columnas
@@ -99,6 +104,7 @@ def procesar_inventario(inventario_path: str) -> tuple:
             inventario_raw = inventario_raw.rename(columns={bodega_cols[0]: "Bodega_Origen"})
     
     # 2. Limpieza de Strings, Fechas y NORMALIZACIÓN
+    pasos.paso("2. Normalización de bodega y categoría", inventario_raw)
     df_inventario = inventario_raw.copy()
     
     if "Bodega_Origen" in df_inventario.columns:
@@ -117,16 +123,19 @@ def procesar_inventario(inventario_path: str) -> tuple:
     df_inventario["Categoria"] = df_inventario["Categoria"].replace(CATEGORIAS_NORMALIZADAS)
     
     # Procesamiento de Lead Time
+    pasos.paso("2b. Parseo de Lead_Time y fechas", df_inventario)
     df_inventario["Lead_Time_Dias"] = df_inventario["Lead_Time_Dias"].map(select_max_lead_time)
     
     # Conversión de fecha robusta
     df_inventario["Ultima_Revision"] = pd.to_datetime(df_inventario["Ultima_Revision"], errors="coerce")
     
     # 3. Corrección de Stock Negativo
+    pasos.paso("3. Corrección de stock negativo", df_inventario)
     stock_negativos = (df_inventario["Stock_Actual"] < 0).sum()
     df_inventario["Stock_Actual"] = pd.to_numeric(df_inventario["Stock_Actual"], errors="coerce").fillna(0).abs()
     
     # 4. Auditoría y Corrección de Costos (IQR por Categoría)
+    pasos.paso("4. Costos atípicos (IQR) e imputación", df_inventario)
     df_inventario["Costo_Unitario_USD"] = pd.to_numeric(df_inventario["Costo_Unitario_USD"], errors="coerce")
     
     # Lógica para evitar errores si no hay suficientes datos para IQR
@@ -145,10 +154,12 @@ def procesar_inventario(inventario_path: str) -> tuple:
     df_inventario["Costo_Unitario_USD"] = df_inventario["Costo_Unitario_USD"].fillna(df_inventario["Costo_Unitario_USD"].median())
     
     # 5. Imputación de Lead Time (Mediana por categoría)
+    pasos.paso("5. Imputación de Lead_Time", df_inventario)
     df_inventario["Lead_Time_Dias"] = df_inventario.groupby("Categoria")["Lead_Time_Dias"].transform(lambda x: x.fillna(x.median()))
     df_inventario["Lead_Time_Dias"] = df_inventario["Lead_Time_Dias"].fillna(df_inventario["Lead_Time_Dias"].median())
     
     # 6. Métricas de Calidad y Negocio Finales
+    pasos.paso("6. Métricas finales", df_inventario)
     health_despues, pct_nulos_despues, pct_dups_despues = calcular_health_score(df_inventario)
     
     metricas = {
@@ -165,4 +176,5 @@ def procesar_inventario(inventario_path: str) -> tuple:
         "rango_costos_final": f"${df_inventario['Costo_Unitario_USD'].min():.2f} - ${df_inventario['Costo_Unitario_USD'].max():.2f}"
     }
     
+    pasos.cerrar(df_inventario)
     return df_inventario, metricas
\ No newline at end of file
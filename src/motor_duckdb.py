@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Motor analítico DuckDB (embebido) para las agregaciones de las páginas.
+
+El dataset consolidado se registra una vez por versión como tabla Arrow:
+las columnas numéricas y de fecha se comparten sin copia con el dataframe
+de pandas, y DuckDB las escanea en paralelo. En lugar de agrupar
+``df_filtrado`` en pandas, cada página pide su agregado con el estado de
+filtros de la barra lateral (``st.session_state["filtros_activos"]``), que
+se traduce a un ``WHERE`` que DuckDB empuja hasta el escaneo::
+
+    motor = MotorDuckDB(df_dss)
+    motor.consultar("top_categorias", filtros_activos, hash_filtros)
+
+Los resultados (pequeños) se cachean por (estado de filtros, consulta); el
+motor no usa servicios externos ni archivos. Las consultas reproducen los
+agregados pandas de ``src.agregaciones``, que siguen siendo la referencia.
+"""
+import datetime
+import json
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from src import config
+from src.telemetria import contador, histograma
+
+_DURACION_CONSULTA = histograma(
+    "dss_duckdb_consulta_segundos", "Consultas del motor DuckDB por agregado", ("consulta",)
+)
+_CONSULTAS_CACHE = contador(
+    "dss_duckdb_cache_total", "Consultas del motor DuckDB por resultado de caché",
+    ("resultado",),
+)
+
+# Columnas que usan las consultas y los filtros (el resto no se registra)
+COLUMNAS = (
+    "Transaccion_ID", "SKU_ID", "Fecha_Venta", "Cantidad_Vendida",
+    "Precio_Venta_Final", "Estado_Envio", "Ciudad_Destino", "Canal_Venta",
+    "Bodega_Origen", "Categoria", "Ultima_Revision", "Ticket_Soporte",
+    "NPS_Numerico", "venta_sin_inventario", "ingreso_total", "margen_real",
+)
+FILTROS_LISTA = ("Categoria", "Ciudad_Destino", "Estado_Envio")
+COLUMNAS_CANAL = ("Canal_Venta", "Bodega_Origen")
+
+
+def _ident(columna: str) -> str:
+    return '"' + columna.replace('"', '""') + '"'
+
+
+def clausula_filtros(filtros: dict) -> tuple:
+    """Traduce ``filtros_activos`` a (``WHERE ...``, parámetros).
+
+    Reproduce ``crear_sidebar_filtros``: una selección vacía no filtra, los
+    nulos quedan fuera de un ``IN`` y el rango de fechas es inclusivo.
+    """
+    condiciones, parametros = [], []
+    for columna in FILTROS_LISTA:
+        valores = filtros.get(columna)
+        if valores:
+            marcas = ", ".join("?" * len(valores))
+            condiciones.append(f"{_ident(columna)} IN ({marcas})")
+            parametros.extend(valores)
+    rango = filtros.get("Fecha_Venta")
+    if rango and len(rango) == 2:
+        condiciones.append('CAST("Fecha_Venta" AS DATE) BETWEEN ? AND ?')
+        parametros.extend(datetime.date.fromisoformat(str(d)) for d in rango)
+    if filtros.get("solo_margen_negativo") in (True, "True"):
+        condiciones.append('"margen_real" < 0')
+    where = ("WHERE " + " AND ".join(condiciones)) if condiciones else ""
+    return where, parametros
+
+
+def _y(where: str, condicion: str) -> str:
+    return f"{where} AND {condicion}" if where else f"WHERE {condicion}"
+
+
+# =====================================================================
+#  Consultas (una por agregado de página)
+# =====================================================================
+
+def _sql_riesgo_sku(where: str) -> str:
+    where = _y(where, '"SKU_ID" IS NOT NULL AND "Categoria" IS NOT NULL')
+    return f"""
+        SELECT "SKU_ID", "Categoria",
+               COALESCE(SUM("margen_real"), 0) AS margen_real,
+               COALESCE(SUM("ingreso_total"), 0) AS ingreso_total,
+               CAST(COALESCE(SUM("Cantidad_Vendida"), 0) AS BIGINT) AS Cantidad_Vendida
+        FROM dss {where}
+        GROUP BY ALL ORDER BY "SKU_ID", "Categoria"
+    """
+
+
+def _sql_eficiencia_canal(where: str, canal_col: str) -> str:
+    canal = _ident(canal_col)
+    where = _y(where, f"{canal} IS NOT NULL")
+    return f"""
+        SELECT {canal},
+               COALESCE(SUM("margen_real"), 0) AS margen_real,
+               COALESCE(SUM("ingreso_total"), 0) AS ingreso_total
+        FROM dss {where}
+        GROUP BY ALL ORDER BY {canal}
+    """
+
+
+def _sql_top_categorias(where: str) -> str:
+    where = _y(where, '"Categoria" IS NOT NULL')
+    return f"""
+        SELECT "Categoria",
+               COALESCE(SUM("ingreso_total"), 0) AS ingreso_total,
+               COALESCE(SUM("margen_real"), 0) AS margen_real,
+               COUNT("Transaccion_ID") AS Transaccion_ID
+        FROM dss {where}
+        GROUP BY ALL ORDER BY "Categoria"
+    """
+
+
+def _sql_serie_venta_invisible(where: str) -> str:
+    where = _y(where, '"venta_sin_inventario" AND "Fecha_Venta" IS NOT NULL')
+    return f"""
+        SELECT strftime("Fecha_Venta", '%Y-%m') AS Fecha_Venta,
+               COALESCE(SUM("ingreso_total"), 0) AS ingreso_total,
+               COUNT("Transaccion_ID") AS transacciones
+        FROM dss {where}
+        GROUP BY ALL ORDER BY 1
+    """
+
+
+def _sql_riesgo_bodega(where: str) -> str:
+    # Días completos entre la revisión y la fecha de referencia (como
+    # ``Timedelta.days`` en pandas, que redondea hacia abajo).
+    dias = 'floor((epoch(?::TIMESTAMP) - epoch("Ultima_Revision")) / 86400)'
+    where = _y(where, '"Ultima_Revision" IS NOT NULL AND "Bodega_Origen" IS NOT NULL')
+    return f"""
+        SELECT "Bodega_Origen",
+               AVG({dias}) AS Dias_Sin_Revision,
+               AVG("Ticket_Soporte") * 100 AS Tasa_Tickets_Soporte,
+               COALESCE(SUM("ingreso_total"), 0) AS Ingresos_Expuestos
+        FROM dss {where}
+        GROUP BY ALL ORDER BY "Bodega_Origen"
+    """
+
+
+# =====================================================================
+#  Motor
+# =====================================================================
+
+class MotorDuckDB:
+    """Agregados de página en SQL sobre el dataset consolidado (en proceso)."""
+
+    CONSULTAS = ("riesgo_sku", "eficiencia_canal", "top_categorias",
+                 "serie_venta_invisible", "riesgo_bodega")
+
+    def __init__(self, df_dss: pd.DataFrame, hilos: int = None, max_entradas: int = None):
+        import duckdb
+        import pyarrow as pa
+
+        columnas = [c for c in COLUMNAS if c in df_dss.columns]
+        self.columnas = frozenset(columnas)
+        # ``columns=`` convierte solo esas columnas sin copiar antes el frame.
+        self._tabla = pa.Table.from_pandas(df_dss, columns=columnas, preserve_index=False)
+        self._conexion = duckdb.connect(":memory:")
+        hilos = config.DUCKDB_HILOS if hilos is None else hilos
+        if hilos > 0:
+            self._conexion.execute(f"SET threads TO {int(hilos)}")
+        self._max = max_entradas or config.DUCKDB_CACHE_ENTRADAS
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def _cursor(self):
+        # Cada consulta usa su propio cursor (las sesiones consultan en
+        # paralelo); el registro Arrow es local al cursor y no copia datos.
+        cursor = self._conexion.cursor()
+        cursor.register("dss", self._tabla)
+        return cursor
+
+    def _sql(self, consulta: str, where: str, parametros: list, argumentos: dict) -> tuple:
+        if consulta == "riesgo_sku":
+            return _sql_riesgo_sku(where), parametros
+        if consulta == "eficiencia_canal":
+            canal_col = argumentos["canal_col"]
+            if canal_col not in COLUMNAS_CANAL or canal_col not in self.columnas:
+                raise ValueError(f"Columna de canal no soportada: {canal_col}")
+            return _sql_eficiencia_canal(where, canal_col), parametros
+        if consulta == "top_categorias":
+            return _sql_top_categorias(where), parametros
+        if consulta == "serie_venta_invisible":
+            return _sql_serie_venta_invisible(where), parametros
+        if consulta == "riesgo_bodega":
+            referencia = pd.Timestamp(argumentos["fecha_referencia"]).to_pydatetime()
+            # El parámetro de la fecha va antes que los del WHERE.
+            return _sql_riesgo_bodega(where), [referencia] + parametros
+        raise ValueError(f"Consulta desconocida: {consulta}")
+
+    def consultar(self, consulta: str, filtros: dict, clave_filtros: str = None,
+                  **argumentos) -> pd.DataFrame:
+        """Ejecuta (o recupera de caché) *consulta* para el estado *filtros*.
+
+        Sin ``clave_filtros`` la consulta se ejecuta sin caché. El resultado
+        es compartido: quien lo modifique debe copiarlo antes.
+        """
+        clave = None
+        if clave_filtros:
+            clave = (clave_filtros, consulta, json.dumps(argumentos, sort_keys=True, default=str))
+            with self._lock:
+                if clave in self._cache:
+                    self._cache.move_to_end(clave)
+                    self.aciertos += 1
+                    _CONSULTAS_CACHE.inc(resultado="acierto")
+                    return self._cache[clave]
+                self.fallos += 1
+            _CONSULTAS_CACHE.inc(resultado="fallo")
+
+        where, parametros = clausula_filtros(filtros or {})
+        sql, parametros = self._sql(consulta, where, parametros, argumentos)
+        inicio = time.perf_counter()
+        cursor = self._cursor()
+        try:
+            resultado = cursor.execute(sql, parametros).df()
+        finally:
+            cursor.close()
+        _DURACION_CONSULTA.observar(time.perf_counter() - inicio, consulta=consulta)
+
+        if clave is not None:
+            with self._lock:
+                self._cache[clave] = resultado
+                while len(self._cache) > self._max:
+                    self._cache.popitem(last=False)
+        return resultado
+
+    def estadisticas(self) -> dict:
+        with self._lock:
+            return {
+                "filas": self._tabla.num_rows,
+                "entradas": len(self._cache),
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+            }
@@ -0,0 +1,444 @@
+# -*- coding: utf-8 -*-
+"""
+Motor Polars del pipeline de limpieza y consolidación.
+
+Reescribe las reglas de ``src.inventario``, ``src.feedback``,
+``src.transacciones`` y ``crear_dataset_consolidado`` como planes *lazy* de
+Polars: cada CSV se lee una sola vez, las reglas se expresan como columnas
+del plan (sin copias intermedias) y el motor las ejecuta en paralelo con
+todos los núcleos. El resultado final se entrega como ``pandas.DataFrame``
+para que las páginas no cambien.
+
+El pipeline pandas sigue siendo la **referencia**; este motor reproduce sus
+resultados, incluidas sus particularidades (p. ej. ``astype(str)`` convierte
+los nulos en ``"nan"``, y los ``groupby`` descartan las claves nulas). La
+equivalencia se verifica con::
+
+    python -m benchmarks.equivalencia src.motor_polars --sintetico 1000000
+
+Se activa con ``DSS_MOTOR_PIPELINE=polars`` (ver ``construir_dataset_dss``).
+Las funciones ``procesar_*`` y ``crear_dataset_consolidado`` tienen las
+mismas firmas que las de pandas (entran y salen dataframes de pandas); la app
+usa ``ejecutar_pipeline``, que encadena las etapas sin pasar por pandas.
+"""
+import warnings
+
+import polars as pl
+from pandas.tseries.api import guess_datetime_format
+
+from src.instrumentacion import iniciar_etapa
+from src.inventario import CATEGORIAS_NORMALIZADAS
+
+# Cadenas que ``pandas.read_csv`` interpreta como nulo por defecto.
+_NULOS_PANDAS = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a",
+    "nan", "null",
+]
+
+_MAPEO_BODEGAS = {"NORTE": "Norte", "SUR": "Sur", "CENTRO": "Centro"}
+
+_MAPEO_SOPORTE = {
+    "SÍ": 1, "SI": 1, "1": 1, "1.0": 1, "TRUE": 1,
+    "NO": 0, "0": 0, "0.0": 0, "FALSE": 0, "NAN": 0,
+}
+
+_DIC_CIUDADES = {
+    "bog": "bogotá", "bogota": "bogotá",
+    "med": "medellín", "medellin": "medellín",
+    "baq": "barranquilla", "barranquilla": "barranquilla",
+    "ventas_web": "canal digital",
+}
+
+_COLUMNAS_INVENTARIO = ["SKU_ID", "Categoria", "Costo_Unitario_USD", "Punto_Reorden",
+                        "Stock_Actual", "Bodega_Origen", "Lead_Time_Dias", "Ultima_Revision"]
+_COLUMNAS_FEEDBACK = ["Transaccion_ID", "NPS_Numerico", "NPS_Categoria",
+                      "Rating_Producto", "Edad_Cliente", "Ticket_Soporte"]
+
+
+# =====================================================================
+#  Utilidades
+# =====================================================================
+
+def _leer_csv(ruta: str) -> pl.LazyFrame:
+    """Lectura lazy con la misma inferencia de nulos y tipos que pandas."""
+    return pl.scan_csv(
+        ruta, null_values=_NULOS_PANDAS, infer_schema_length=None,
+        with_column_names=lambda nombres: [n.strip() for n in nombres],
+    )
+
+
+def _como_texto(lf: pl.LazyFrame, columna: str) -> pl.Expr:
+    """Equivalente a ``serie.astype(str)``: los nulos pasan a ``"nan"``."""
+    expr = pl.col(columna)
+    if lf.collect_schema()[columna] != pl.String:
+        expr = expr.cast(pl.String)
+    return expr.fill_null("nan")
+
+
+def _numerico(columna: str) -> pl.Expr:
+    """Equivalente a ``pd.to_numeric(errors="coerce")``."""
+    return pl.col(columna).cast(pl.Float64, strict=False)
+
+
+def _mediana_por_grupo(columna: str, grupo: str) -> pl.Expr:
+    """``groupby(grupo)[columna].transform("median")``: nulo si la clave es nula."""
+    return (pl.when(pl.col(grupo).is_not_null())
+            .then(pl.col(columna).median().over(grupo)))
+
+
+def _a_fecha(lf: pl.LazyFrame, columna: str, estricto: bool) -> pl.Expr:
+    """``pd.to_datetime`` con el formato inferido del primer valor no nulo."""
+    if lf.collect_schema()[columna] in (pl.Datetime, pl.Date):
+        return pl.col(columna).cast(pl.Datetime("ns"))
+    primero = lf.select(pl.col(columna).drop_nulls().first()).collect().item()
+    with warnings.catch_warnings():
+        # Mismo aviso de "dayfirst" que emite pandas al inferir el formato
+        warnings.simplefilter("ignore")
+        formato = guess_datetime_format(str(primero)) if primero is not None else None
+    return (pl.col(columna).cast(pl.String)
+            .str.to_datetime(formato, time_unit="ns", strict=estricto))
+
+
+def _health_score(df: pl.DataFrame) -> tuple:
+    """``calcular_health_score`` de pandas sobre un dataframe de Polars."""
+    if df.height == 0 or df.width == 0:
+        return 0, 0, 0
+    nulos = sum(df.null_count().row(0))
+    flotantes = df.select(pl.col(pl.Float32, pl.Float64).is_nan().sum())
+    if flotantes.width:
+        nulos += sum(flotantes.row(0))
+    porcentaje_nulos = nulos / (df.height * df.width)
+    duplicados = df.height - df.unique().height
+    porcentaje_duplicados = duplicados / df.height
+    score = 100 * (1 - (0.7 * porcentaje_nulos + 0.3 * porcentaje_duplicados))
+    return round(score, 2), round(porcentaje_nulos * 100, 2), round(porcentaje_duplicados * 100, 2)
+
+
+def _a_pandas(df: pl.DataFrame):
+    return df.to_pandas()
+
+
+# =====================================================================
+#  Planes por etapa
+# =====================================================================
+
+def _plan_inventario(lf: pl.LazyFrame) -> pl.LazyFrame:
+    columnas = lf.collect_schema().names()
+    if "Bodega_Origen" not in columnas:
+        bodega_cols = [c for c in columnas if "bodega" in c.lower()]
+        if bodega_cols:
+            lf = lf.rename({bodega_cols[0]: "Bodega_Origen"})
+            columnas = lf.collect_schema().names()
+
+    normalizadas = {}
+    if "Bodega_Origen" in columnas:
+        normalizadas["Bodega_Origen"] = (
+            _como_texto(lf, "Bodega_Origen").str.strip_chars().str.to_uppercase()
+            .replace(_MAPEO_BODEGAS)
+        )
+    categorias = {k: (None if v != v else v) for k, v in CATEGORIAS_NORMALIZADAS.items()}
+    normalizadas["Categoria"] = (
+        _como_texto(lf, "Categoria").str.to_lowercase().str.strip_chars()
+        .replace(categorias)
+    )
+
+    # select_max_lead_time: "inmediato" → 1; si no, el mayor entero del texto.
+    texto_lead = pl.col("Lead_Time_Dias").cast(pl.String).str.strip_chars().str.to_lowercase()
+    normalizadas["Lead_Time_Dias"] = (
+        pl.when(texto_lead.is_null() | texto_lead.is_in(["", "nan", "none", "null"]))
+        .then(None)
+        .when(texto_lead.str.contains("inmediato", literal=True))
+        .then(1)
+        .otherwise(texto_lead.str.extract_all(r"\d+").list.eval(
+            pl.element().cast(pl.Int64)).list.max())
+    )
+    normalizadas["Ultima_Revision"] = _a_fecha(lf, "Ultima_Revision", estricto=False)
+    normalizadas["Stock_Actual"] = _numerico("Stock_Actual").fill_null(0).abs()
+    normalizadas["Costo_Unitario_USD"] = _numerico("Costo_Unitario_USD")
+    lf = lf.with_columns(**normalizadas)
+
+    # Costos atípicos (IQR global) → mediana de su categoría → mediana global
+    costo = pl.col("Costo_Unitario_USD")
+    q1, q3 = costo.quantile(0.25, "linear"), costo.quantile(0.75, "linear")
+    atipico = ((costo < q1 - 1.5 * (q3 - q1)) | (costo > q3 + 1.5 * (q3 - q1))).fill_null(False)
+    lf = lf.with_columns(
+        pl.when(atipico).then(_mediana_por_grupo("Costo_Unitario_USD", "Categoria"))
+        .otherwise(costo).alias("Costo_Unitario_USD"),
+        atipico.alias("_costo_atipico"),
+    ).with_columns(costo.fill_null(costo.median()))
+
+    # Lead time: mediana de la categoría (nulo si la categoría es nula) → global
+    lead = pl.col("Lead_Time_Dias")
+    lf = lf.with_columns(
+        pl.when(pl.col("Categoria").is_not_null())
+        .then(lead.fill_null(lead.median().over("Categoria")))
+        .alias("Lead_Time_Dias")
+    ).with_columns(lead.fill_null(lead.median()))
+    return lf
+
+
+def _metricas_inventario(df_raw: pl.DataFrame, df: pl.DataFrame) -> tuple:
+    health_antes = _health_score(df_raw)
+    costos_outliers = int(df["_costo_atipico"].sum())
+    df = df.drop("_costo_atipico")
+    health_despues = _health_score(df)
+    stock_negativos = int((df_raw["Stock_Actual"].cast(pl.Float64, strict=False) < 0).sum())
+    costo = df["Costo_Unitario_USD"]
+    valor_total = (df["Stock_Actual"] * costo).sum()
+    return df, {
+        "dataset": "Inventario",
+        "health_score_antes": health_antes[0],
+        "health_score_despues": health_despues[0],
+        "mejora_health_score": round(health_despues[0] - health_antes[0], 2),
+        "costos_outliers_detectados": costos_outliers,
+        "stock_negativos_corregidos": stock_negativos,
+        "costos_outliers": costos_outliers,
+        "stock_negativos": stock_negativos,
+        "duplicados_sku_id": df.height - df["SKU_ID"].n_unique(),
+        "valor_inventario_total": f"${valor_total:,.2f}",
+        "rango_costos_final": f"${costo.min():.2f} - ${costo.max():.2f}",
+    }
+
+
+def _plan_feedback(lf: pl.LazyFrame) -> pl.LazyFrame:
+    nps = _numerico("Satisfaccion_NPS")
+    nps = (pl.when(nps.is_null() | nps.is_nan()).then(5.0)
+           .when(nps > 10).then(5 + nps / 20)
+           .when(nps < 0).then(5 + nps / 25)
+           .otherwise(nps))
+    rating = _numerico("Rating_Producto")
+    rating_valido = pl.when(rating <= 5).then(rating)
+    return lf.with_columns(
+        nps.alias("NPS_Numerico"),
+        (rating.is_null() | (rating > 5)).alias("_rating_corregido"),
+        rating_valido.fill_null(rating_valido.median().fill_null(3.0)).alias("Rating_Producto"),
+        _numerico("Edad_Cliente").is_null().alias("_edad_corregida"),
+        _numerico("Edad_Cliente").fill_null(35).alias("Edad_Cliente"),
+        _como_texto(lf, "Ticket_Soporte_Abierto").str.strip_chars().str.to_uppercase()
+        .replace_strict(_MAPEO_SOPORTE, default=0, return_dtype=pl.Int64)
+        .alias("Ticket_Soporte"),
+    ).with_columns(
+        pl.when(pl.col("NPS_Numerico") >= 9).then(pl.lit("Promotor"))
+        .when(pl.col("NPS_Numerico") >= 7).then(pl.lit("Pasivo"))
+        .otherwise(pl.lit("Detractor")).alias("NPS_Categoria"),
+    ).select(
+        # Mismo orden de columnas que la referencia
+        *lf.collect_schema().names(), "NPS_Numerico", "NPS_Categoria",
+        "Ticket_Soporte", "_rating_corregido", "_edad_corregida",
+    )
+
+
+def _metricas_feedback(df_raw: pl.DataFrame, df: pl.DataFrame) -> tuple:
+    ratings_corregidos = int(df["_rating_corregido"].sum())
+    edades_corregidas = int(df["_edad_corregida"].sum())
+    df = df.drop("_rating_corregido", "_edad_corregida")
+    mediana = _numerico("Rating_Producto")
+    mediana_rating = df_raw.select(pl.when(mediana <= 5).then(mediana).median()).item()
+    relleno = mediana_rating if mediana_rating is not None else 3.0
+    return df, {
+        "health_score_antes": _health_score(df_raw)[0],
+        "health_score_despues": _health_score(df)[0],
+        "nps_promedio": round(df["NPS_Numerico"].mean(), 2),
+        "rating_mediana": round(relleno, 2),
+        "edades_corregidas": edades_corregidas,
+        "ratings_corregidos": ratings_corregidos,
+    }
+
+
+def _plan_transacciones(lf: pl.LazyFrame, lf_inv: pl.LazyFrame,
+                        lf_feed: pl.LazyFrame) -> pl.LazyFrame:
+    esquema = lf.collect_schema()
+    lf = lf.with_columns(_a_fecha(lf, "Fecha_Venta", estricto=True).alias("Fecha_Venta"))
+    texto = [c for c, t in esquema.items() if t == pl.String and c != "Fecha_Venta"]
+    lf = lf.with_columns(pl.col(texto).str.to_lowercase(),
+                         pl.col("Cantidad_Vendida").abs())
+
+    # Estado_Envio según el ticket de soporte del feedback
+    ticket = pl.col("Ticket_Soporte_Abierto").cast(pl.String)
+    sin_ticket = lf_feed.filter(ticket == "no").select("Transaccion_ID")
+    con_ticket = lf_feed.filter(ticket == "si").select("Transaccion_ID")
+    estado = pl.col("Estado_Envio")
+    lf = lf.with_columns(
+        pl.when(estado.is_null() & pl.col("Transaccion_ID").is_in(
+            sin_ticket.collect().to_series().implode()))
+        .then(pl.lit("entregado")).otherwise(estado).alias("Estado_Envio")
+    ).with_columns(
+        pl.when(estado.is_null() & pl.col("Transaccion_ID").is_in(
+            con_ticket.collect().to_series().implode()))
+        .then(pl.lit("devuelto")).otherwise(estado).alias("Estado_Envio")
+    )
+
+    lf = lf.with_columns(
+        pl.col("Ciudad_Destino").replace(_DIC_CIUDADES),
+        pl.when(pl.col("Canal_Venta") == "físico").then(0.0)
+        .otherwise(pl.col("Costo_Envio")).alias("Costo_Envio"),
+    ).with_columns(
+        (pl.col("Precio_Venta_Final") - pl.col("Costo_Envio")).alias("margen"),
+    ).with_columns(
+        (pl.col("margen") / pl.col("Precio_Venta_Final")).alias("margen %"),
+    )
+
+    lf = lf.join(lf_inv.select("SKU_ID", "Bodega_Origen"), on="SKU_ID",
+                 how="left", maintain_order="left_right")
+    lf = lf.with_columns(
+        (pl.col("Bodega_Origen") + "-" + pl.col("Ciudad_Destino")).alias("id_tiempos_entrega"),
+    )
+
+    tiempo = pl.col("Tiempo_Entrega_Real")
+    lf = lf.with_columns(
+        pl.when(tiempo == 999).then(None).otherwise(tiempo).cast(pl.Float64)
+        .alias("Tiempo_Entrega_Real"),
+    ).with_columns(
+        tiempo.fill_null(_mediana_por_grupo("Tiempo_Entrega_Real", "id_tiempos_entrega")
+                         .fill_null(0)),
+        pl.col("Costo_Envio").fill_null(
+            _mediana_por_grupo("Costo_Envio", "id_tiempos_entrega")),
+    ).with_columns(
+        (pl.col("Fecha_Venta") + pl.duration(days=tiempo.cast(pl.Int64)))
+        .cast(pl.Datetime("ns")).alias("Fecha_Calculada"),
+    )
+
+    fecha_max = pl.col("Fecha_Venta").max()
+    calculada = pl.col("Fecha_Calculada")
+    return lf.with_columns(
+        pl.when(estado.is_null() & (calculada < fecha_max)).then(pl.lit("entregado"))
+        .when(estado.is_null() & (calculada >= fecha_max)).then(pl.lit("en camino"))
+        .otherwise(estado).alias("Estado_Envio"),
+    ).rename({"Tiempo_Entrega_Real": "Tiempo_Entrega"})
+
+
+def _plan_metricas_transacciones(lf_trans: pl.LazyFrame, lf_inv: pl.LazyFrame) -> pl.LazyFrame:
+    skus = lf_inv.select("SKU_ID").collect().to_series().implode()
+    return lf_trans.select(
+        pl.len().alias("total_transacciones"),
+        (~pl.col("SKU_ID").is_in(skus)).sum().alias("skus_sin_inventario"),
+    )
+
+
+def _metricas_transacciones(fila: dict) -> dict:
+    return {
+        "health_score_antes": 100,
+        "health_score_despues": 100,
+        "total_transacciones": int(fila["total_transacciones"]),
+        "skus_sin_inventario": int(fila["skus_sin_inventario"]),
+    }
+
+
+def _plan_consolidado(lf_trans: pl.LazyFrame, lf_inv: pl.LazyFrame,
+                      lf_feed: pl.LazyFrame) -> pl.LazyFrame:
+    columnas = lf_trans.collect_schema().names()
+    if "Tiempo_Entrega" not in columnas:
+        posibles = [c for c in columnas if "tiempo" in c.lower() or "entrega" in c.lower()]
+        lf_trans = (lf_trans.rename({posibles[0]: "Tiempo_Entrega"}) if posibles
+                    else lf_trans.with_columns(pl.lit(0).alias("Tiempo_Entrega")))
+
+    # Sufijos _x / _y como en pandas.merge para las columnas repetidas
+    derecha = lf_inv.select(_COLUMNAS_INVENTARIO)
+    repetidas = (set(lf_trans.collect_schema().names()) & set(_COLUMNAS_INVENTARIO)) - {"SKU_ID"}
+    lf = lf_trans.rename({c: f"{c}_x" for c in repetidas}).join(
+        derecha.rename({c: f"{c}_y" for c in repetidas}),
+        on="SKU_ID", how="left", maintain_order="left_right",
+    )
+
+    presentes = [c for c in _COLUMNAS_FEEDBACK if c in lf_feed.collect_schema().names()]
+    feed = lf_feed.select(presentes).unique(subset=["Transaccion_ID"], keep="first",
+                                           maintain_order=True)
+    lf = lf.join(feed, on="Transaccion_ID", how="left", maintain_order="left_right")
+
+    categoria = pl.col("Categoria").fill_null("no catalogado")
+    lf = lf.with_columns(
+        categoria,
+        (categoria == "no catalogado").alias("venta_sin_inventario"),
+        _numerico("NPS_Numerico").fill_null(5.0),
+        pl.col("Stock_Actual").fill_null(0),
+        pl.col("Tiempo_Entrega").fill_null(0),
+        _numerico("Ticket_Soporte").fill_null(0).cast(pl.Int64),
+    )
+    ingreso = pl.col("Precio_Venta_Final") * pl.col("Cantidad_Vendida")
+    costo = (pl.col("Costo_Unitario_USD").fill_null(0) * pl.col("Cantidad_Vendida")
+             + pl.col("Costo_Envio"))
+    lead = pl.col("Lead_Time_Dias").fill_null(0)
+    stock = pl.col("Stock_Actual")
+    return lf.with_columns(
+        ingreso.alias("ingreso_total"),
+        costo.alias("costo_total"),
+        (ingreso - costo).alias("margen_real"),
+        (pl.col("Tiempo_Entrega") - lead).alias("brecha_entrega"),
+        ((stock > stock.quantile(0.75, "linear").fill_null(0))
+         & (pl.col("NPS_Numerico") < 7)).alias("paradoja_fidelidad"),
+    )
+
+
+# =====================================================================
+#  API con la misma firma que el pipeline pandas
+# =====================================================================
+
+def procesar_inventario(inventario_path: str) -> tuple:
+    pasos = iniciar_etapa("inventario")
+    pasos.paso("Plan Polars (lectura + reglas)")
+    lf_raw = _leer_csv(inventario_path)
+    df_raw, df = pl.collect_all([lf_raw, _plan_inventario(lf_raw)])
+    df, metricas = _metricas_inventario(df_raw, df)
+    pasos.cerrar(df)
+    return _a_pandas(df), metricas
+
+
+def procesar_feedback(ruta_csv: str) -> tuple:
+    pasos = iniciar_etapa("feedback")
+    pasos.paso("Plan Polars (lectura + reglas)")
+    lf_raw = _leer_csv(ruta_csv)
+    df_raw, df = pl.collect_all([lf_raw, _plan_feedback(lf_raw)])
+    df, metricas = _metricas_feedback(df_raw, df)
+    pasos.cerrar(df)
+    return _a_pandas(df), metricas
+
+
+def procesar_transacciones(ruta_csv, df_inventario, df_feedback) -> tuple:
+    pasos = iniciar_etapa("transacciones")
+    pasos.paso("Plan Polars (lectura + reglas)")
+    lf_inv = pl.from_pandas(df_inventario).lazy()
+    lf_trans = _plan_transacciones(_leer_csv(ruta_csv), lf_inv,
+                                   pl.from_pandas(df_feedback).lazy())
+    df, fila = pl.collect_all([lf_trans, _plan_metricas_transacciones(lf_trans, lf_inv)])
+    pasos.cerrar(df)
+    return _a_pandas(df), _metricas_transacciones(fila.row(0, named=True))
+
+
+def crear_dataset_consolidado(df_trans, df_inv, df_feed):
+    pasos = iniciar_etapa("consolidado")
+    pasos.paso("Plan Polars (cruces + cálculos)")
+    df = _plan_consolidado(pl.from_pandas(df_trans).lazy(), pl.from_pandas(df_inv).lazy(),
+                           pl.from_pandas(df_feed).lazy()).collect()
+    pasos.cerrar(df)
+    return _a_pandas(df)
+
+
+def ejecutar_pipeline(ruta_inventario: str, ruta_feedback: str, ruta_transacciones: str):
+    """Pipeline completo sin pasar por pandas entre etapas.
+
+    Devuelve ``(df_dss, met_inv, met_feed, met_trans)`` con ``df_dss`` en
+    pandas. Inventario y feedback (dimensiones) se materializan primero,
+    juntos; transacciones y consolidación forman un único plan cuya lectura
+    y reglas comparten ambos resultados (conjunto y métricas).
+    """
+    pasos = iniciar_etapa("polars")
+    pasos.paso("Dimensiones (inventario + feedback)")
+    lf_inv_raw, lf_feed_raw = _leer_csv(ruta_inventario), _leer_csv(ruta_feedback)
+    inv_raw, inv, feed_raw, feed = pl.collect_all([
+        lf_inv_raw, _plan_inventario(lf_inv_raw), lf_feed_raw, _plan_feedback(lf_feed_raw),
+    ])
+    inv, met_inv = _metricas_inventario(inv_raw, inv)
+    feed, met_feed = _metricas_feedback(feed_raw, feed)
+
+    pasos.paso("Transacciones + consolidación", inv)
+    lf_inv, lf_feed = inv.lazy(), feed.lazy()
+    lf_trans = _plan_transacciones(_leer_csv(ruta_transacciones), lf_inv, lf_feed)
+    dss, fila = pl.collect_all([
+        _plan_consolidado(lf_trans, lf_inv, lf_feed),
+        _plan_metricas_transacciones(lf_trans, lf_inv),
+    ])
+    pasos.paso("Conversión a pandas", dss)
+    df_dss = _a_pandas(dss)
+    pasos.cerrar(df_dss)
+    return df_dss, met_inv, met_feed, _metricas_transacciones(fila.row(0, named=True))
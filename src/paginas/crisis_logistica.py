@@ -11,22 +11,23 @@ def mostrar_crisis_logistica(df_filtrado):
     # ---------------------------------------------------------
     # 1. Preparación de Datos
     # ---------------------------------------------------------
-    df_log = df_filtrado.dropna(subset=["Tiempo_Entrega", "NPS_Numerico"]).copy()
-    
-    df_log["Ciudad_Destino"] = df_log["Ciudad_Destino"].astype(str).str.strip().str.upper()
-
-    df_analisis = df_log[
-        (df_log["Tiempo_Entrega"] < 100) & 
-        (df_log["Tiempo_Entrega"] > 0)
-    ].copy()
+    # Máscaras sobre df_filtrado (de solo lectura): la ciudad normalizada y
+    # la marca de canal digital vienen calculadas desde la carga.
+    tiempo = df_filtrado["Tiempo_Entrega"]
+    validos = tiempo.notna() & df_filtrado["NPS_Numerico"].notna()
 
-    if df_analisis.empty:
-        df_analisis = df_log[df_log["Tiempo_Entrega"] < 100].copy()
+    en_analisis = validos & (tiempo < 100) & (tiempo > 0)
+    if not en_analisis.any():
+        en_analisis = validos & (tiempo < 100)
 
-    filtro_canal = df_analisis["Ciudad_Destino"].str.contains("CANAL DIGITAL|DIGITAL", na=False)
-    registros_canal_digital = df_analisis[filtro_canal].shape[0]
+    filtro_canal = df_filtrado["canal_digital"]
+    registros_canal_digital = int((en_analisis & filtro_canal).sum())
 
-    df_geo = df_analisis[~filtro_canal].copy()
+    df_analisis = df_filtrado.loc[en_analisis, ["Tiempo_Entrega", "NPS_Numerico", "brecha_entrega"]]
+    df_geo = df_filtrado.loc[
+        en_analisis & ~filtro_canal,
+        ["Bodega_Origen", "ciudad_normalizada", "NPS_Numerico", "Tiempo_Entrega", "Transaccion_ID"]
+    ].rename(columns={"ciudad_normalizada": "Ciudad_Destino"})
 
     # ---------------------------------------------------------
     # 2. KPIs de Desempeño Logístico
@@ -85,10 +86,7 @@ def mostrar_crisis_logistica(df_filtrado):
     st.subheader("📉 Correlación Específica por Ciudad")
     
     correlaciones_ciudad = []
-    ciudades_validas = df_geo["Ciudad_Destino"].unique()
-    
-    for ciudad in ciudades_validas:
-        df_c = df_geo[df_geo["Ciudad_Destino"] == ciudad]
+    for ciudad, df_c in df_geo.groupby("Ciudad_Destino", sort=False):
         if len(df_c) >= 2: 
             corr = df_c["Tiempo_Entrega"].corr(df_c["NPS_Numerico"])
             if not np.isnan(corr):
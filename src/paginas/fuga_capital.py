@@ -4,12 +4,14 @@ import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 
+from src.agregaciones import eficiencia_canal, riesgo_sku
+
 def mostrar_fuga_capital(df_filtrado):
 
     st.header("💰 Fuga de Capital y Rentabilidad")
     
     # 1. Identificación de Pérdidas (Solo registros con margen < 0)
-    df_perdida = df_filtrado[df_filtrado["margen_real"] < 0].copy()
+    df_perdida = df_filtrado[df_filtrado["margen_real"] < 0]
     total_fuga = df_perdida["margen_real"].sum()
     
     col1, col2, col3 = st.columns(3)
@@ -26,11 +28,7 @@ def mostrar_fuga_capital(df_filtrado):
 
     # 2. Matriz de Riesgo (Dispersión)
     st.subheader("🔍 Análisis de Riesgo: ¿Volumen o Falla de Precio?")
-    df_sku_risk = df_filtrado.groupby(["SKU_ID", "Categoria"]).agg({
-        "margen_real": "sum",
-        "ingreso_total": "sum",
-        "Cantidad_Vendida": "sum"
-    }).reset_index()
+    df_sku_risk = riesgo_sku(df_filtrado)
     df_sku_risk["size_burbuja"] = df_sku_risk["Cantidad_Vendida"].fillna(0).abs() + 0.1
 
     fig_risk = px.scatter(
@@ -46,10 +44,7 @@ def mostrar_fuga_capital(df_filtrado):
     st.subheader("🌐 Eficiencia Relativa por Canal")
     canal_col = "Canal_Venta" if "Canal_Venta" in df_filtrado.columns else "Bodega_Origen"
     
-    df_canal = df_filtrado.groupby(canal_col).agg({
-        "margen_real": "sum",
-        "ingreso_total": "sum"
-    }).reset_index()
+    df_canal = eficiencia_canal(df_filtrado, canal_col)
     df_canal["%_Margen"] = df_canal.apply(lambda x: (x["margen_real"] / x["ingreso_total"] * 100) if x["ingreso_total"] > 0 else 0, axis=1)
 
     fig_canal = px.bar(
@@ -3,7 +3,10 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 
-def mostrar_resumen_ejecutivo(df_filtrado, health_scores, metricas_calidad):
+from src.agregaciones import top_categorias as agregar_top_categorias
+from src.ui.exportacion import render_exportacion
+
+def mostrar_resumen_ejecutivo(df_filtrado, health_scores, metricas_calidad, almacen=None):
 
     st.header("📈 Resumen Ejecutivo")
     st.markdown("---")
@@ -82,11 +85,7 @@ def mostrar_resumen_ejecutivo(df_filtrado, health_scores, metricas_calidad):
     # -----------------------------
     st.subheader("🏆 Top Categorías por Ingresos")
 
-    top_categorias = df_filtrado.groupby("Categoria").agg({
-        "ingreso_total": "sum",
-        "margen_real": "sum",
-        "Transaccion_ID": "count"
-    }).rename(columns={
+    top_categorias = agregar_top_categorias(df_filtrado).rename(columns={
         "ingreso_total": "Ingresos",
         "margen_real": "Margen",
         "Transaccion_ID": "Transacciones"
@@ -128,8 +127,10 @@ def mostrar_resumen_ejecutivo(df_filtrado, health_scores, metricas_calidad):
     col_c1, col_c2, col_c3 = st.columns(3)
     
     with col_c1:
-        csv = df_filtrado.to_csv(index=False).encode('utf-8')
-        st.download_button("📥 Datos Filtrados (CSV)", data=csv, file_name="datos_filtrados.csv", mime="text/csv")
+        # El archivo se prepara al pedirlo, no en cada rerun.
+        render_exportacion(df_filtrado, almacen, clave="exportar_filtrados",
+                           nombre_archivo="datos_filtrados", metricas_calidad=metricas_calidad,
+                           codificacion='utf-8')
     
     with col_c2:
         metricas_df = pd.DataFrame(metricas_calidad).T
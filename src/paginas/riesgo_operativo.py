@@ -6,14 +6,14 @@ import plotly.express as px
 import numpy as np
 from datetime import datetime
 
+from src.agregaciones import riesgo_bodega
+
 
 # =============================================================================
 # FUNCIÓN PURA: construcción de la figura (NO usa Streamlit)
 # =============================================================================
 def construir_fig_riesgo_operativo(df_filtrado: pd.DataFrame):
 
-    df = df_filtrado.copy()
-
     columnas_requeridas = {
         "Ultima_Revision",
         "Bodega_Origen",
@@ -22,7 +22,7 @@ def construir_fig_riesgo_operativo(df_filtrado: pd.DataFrame):
         "NPS_Numerico"
     }
 
-    if not columnas_requeridas.issubset(df.columns):
+    if not columnas_requeridas.issubset(df_filtrado.columns):
         fig = px.scatter(title="Impacto del Descuido Operativo por Bodega")
         fig.add_annotation(
             text="Columnas requeridas no disponibles para el análisis de riesgo",
@@ -34,7 +34,7 @@ def construir_fig_riesgo_operativo(df_filtrado: pd.DataFrame):
         )
         return fig
 
-    if df.empty:
+    if df_filtrado.empty:
         fig = px.scatter(title="Impacto del Descuido Operativo por Bodega")
         fig.add_annotation(
             text="No hay datos para los filtros actuales",
@@ -46,11 +46,15 @@ def construir_fig_riesgo_operativo(df_filtrado: pd.DataFrame):
         )
         return fig
 
-    df["Ultima_Revision"] = pd.to_datetime(df["Ultima_Revision"], errors="coerce")
-    fecha_referencia = df["Ultima_Revision"].max()
-    df["dias_sin_revision"] = (fecha_referencia - df["Ultima_Revision"]).dt.days
-
-    df = df.dropna(subset=["dias_sin_revision"])
+    # Frame angosto con la derivada: df_filtrado es de solo lectura.
+    revision = pd.to_datetime(df_filtrado["Ultima_Revision"], errors="coerce")
+    df = pd.DataFrame({
+        "Bodega_Origen": df_filtrado["Bodega_Origen"],
+        "Ticket_Soporte": df_filtrado["Ticket_Soporte"],
+        "ingreso_total": df_filtrado["ingreso_total"],
+        "NPS_Numerico": df_filtrado["NPS_Numerico"],
+        "dias_sin_revision": (revision.max() - revision).dt.days,
+    }).dropna(subset=["dias_sin_revision"])
 
     if df.empty:
         fig = px.scatter(title="Impacto del Descuido Operativo por Bodega")
@@ -107,13 +111,11 @@ def construir_fig_riesgo_operativo(df_filtrado: pd.DataFrame):
 # =============================================================================
 def mostrar_riesgo_operativo(df_filtrado: pd.DataFrame, renderizar: bool = True):
 
-    df = df_filtrado.copy()
-    df["Ultima_Revision"] = pd.to_datetime(df["Ultima_Revision"], errors="coerce")
-
+    revision = pd.to_datetime(df_filtrado["Ultima_Revision"], errors="coerce")
     fecha_referencia = pd.to_datetime(datetime.now().date())
-    df["dias_sin_revision"] = (fecha_referencia - df["Ultima_Revision"]).dt.days
+    dias_sin_revision = (fecha_referencia - revision).dt.days
 
-    fig_riesgo = construir_fig_riesgo_operativo(df)
+    fig_riesgo = construir_fig_riesgo_operativo(df_filtrado)
 
     if renderizar:
         st.header("⚠️ Riesgo Operativo: Bodegas 'A Ciegas'")
@@ -121,24 +123,25 @@ def mostrar_riesgo_operativo(df_filtrado: pd.DataFrame, renderizar: bool = True)
         col1, col2, col3 = st.columns(3)
 
         with col1:
-            promedio_dias = df["dias_sin_revision"].mean()
+            promedio_dias = dias_sin_revision.mean()
             st.metric(
                 "📅 Promedio Días Sin Revisión",
                 f"{promedio_dias:.0f} días" if not np.isnan(promedio_dias) else "N/A"
             )
 
         with col2:
-            tasa_soporte = df["Ticket_Soporte"].mean() * 100
+            tasa_soporte = df_filtrado["Ticket_Soporte"].mean() * 100
             st.metric(
                 "🎫 Tasa de Tickets de Soporte",
                 f"{tasa_soporte:.1f}%" if not np.isnan(tasa_soporte) else "N/A"
             )
 
         with col3:
-            df_corr = df.dropna(subset=["dias_sin_revision", "NPS_Numerico"])
+            nps = df_filtrado["NPS_Numerico"]
+            validos = dias_sin_revision.notna() & nps.notna()
             correlacion = (
-                df_corr["dias_sin_revision"].corr(df_corr["NPS_Numerico"])
-                if not df_corr.empty else np.nan
+                dias_sin_revision[validos].corr(nps[validos])
+                if validos.any() else np.nan
             )
             st.metric(
                 "📈 Correlación Riesgo/NPS",
@@ -154,17 +157,7 @@ def mostrar_riesgo_operativo(df_filtrado: pd.DataFrame, renderizar: bool = True)
         st.markdown("---")
         st.subheader("🏭 Top Bodegas en Riesgo Crítico")
 
-        df_bodegas = (
-            df
-            .dropna(subset=["dias_sin_revision"])
-            .groupby("Bodega_Origen")
-            .agg(
-                Dias_Sin_Revision=("dias_sin_revision", "mean"),
-                Tasa_Tickets_Soporte=("Ticket_Soporte", lambda x: x.mean() * 100),
-                Ingresos_Expuestos=("ingreso_total", "sum")
-            )
-            .reset_index()
-        )
+        df_bodegas = riesgo_bodega(df_filtrado, fecha_referencia)
 
         if df_bodegas.empty:
             st.info("No hay información suficiente para identificar bodegas en riesgo.")
@@ -1,4 +1,6 @@
 ﻿# -*- coding: utf-8 -*-
+import json
+
 import streamlit as st
 import pandas as pd
 import plotly.express as px
@@ -10,7 +12,40 @@ def _metric_value(metricas: dict, *keys, default=0):
             return metricas.get(key, default)
     return default
 
-def mostrar_salud_datos(df, metricas_calidad):
+def _mostrar_rendimiento_pipeline(traza):
+    st.markdown("---")
+    st.subheader("⏱️ Rendimiento del Pipeline")
+    pasos = pd.DataFrame(traza.get("pasos", []))
+    if pasos.empty:
+        st.caption("No hay pasos instrumentados para esta carga.")
+        return
+
+    por_etapa = pasos.groupby("etapa", sort=False)["duracion_ms"].sum()
+    c1, c2, c3 = st.columns(3)
+    c1.metric("⏱️ Tiempo Total", f"{traza.get('total_ms', 0):,.0f} ms")
+    c2.metric("🐢 Etapa Más Lenta", por_etapa.idxmax().capitalize(),
+              f"{por_etapa.max():,.0f} ms", delta_color="off")
+    memoria = traza.get("memoria_delta_mb")
+    c3.metric("🧠 Memoria (Δ RSS)", "N/D" if memoria is None else f"{memoria:+,.1f} MB")
+
+    fig = px.bar(pasos, x="duracion_ms", y="paso", color="etapa", orientation="h",
+                 title="Duración por Paso",
+                 labels={"duracion_ms": "Duración (ms)", "paso": "", "etapa": "Etapa"})
+    fig.update_yaxes(categoryorder="array", categoryarray=list(pasos["paso"][::-1]))
+    fig.update_layout(height=max(400, 22 * len(pasos)))
+    st.plotly_chart(fig, use_container_width=True)
+
+    with st.expander("Detalle por paso"):
+        st.dataframe(pasos, use_container_width=True, hide_index=True)
+
+    st.download_button(
+        "📥 Descargar traza (JSON)",
+        data=json.dumps(traza, ensure_ascii=False, indent=2),
+        file_name="traza_pipeline.json",
+        mime="application/json",
+    )
+
+def mostrar_salud_datos(df, metricas_calidad, traza=None):
     st.header("🔍 Salud del Dato - Auditoría de Calidad")
     st.markdown("---")
     
@@ -69,4 +104,8 @@ def mostrar_salud_datos(df, metricas_calidad):
         c1, c2 = st.columns(2)
         c1.metric("🚚 Tiempos 'Outliers'", _metric_value(m, "tiempos_outliers"))
         c2.metric("❌ SKUs No Catalogados", _metric_value(m, "skus_sin_inventario"))
-        st.info("Estrategia: Corrección de tiempos de entrega de 999 días.")
\ No newline at end of file
+        st.info("Estrategia: Corrección de tiempos de entrega de 999 días.")
+
+    # 5. Costo de cada paso del pipeline
+    if traza:
+        _mostrar_rendimiento_pipeline(traza)
\ No newline at end of file
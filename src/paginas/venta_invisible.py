@@ -3,16 +3,16 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 
+from src.agregaciones import serie_venta_invisible
+
 
 # =============================================================================
 # FUNCIÓN PURA: Construcción de la figura
 # =============================================================================
 def construir_fig_venta_invisible(df_filtrado: pd.DataFrame):
 
-    df = df_filtrado.copy()
-
     columnas_requeridas = {"venta_sin_inventario", "Ciudad_Destino", "ingreso_total"}
-    if not columnas_requeridas.issubset(df.columns):
+    if not columnas_requeridas.issubset(df_filtrado.columns):
         fig = px.bar(title="Top 10 Ciudades con Ventas Invisibles")
         fig.add_annotation(
             text="Columnas requeridas no disponibles para generar la gráfica",
@@ -24,7 +24,9 @@ def construir_fig_venta_invisible(df_filtrado: pd.DataFrame):
         )
         return fig
 
-    df_sin_inv = df[df["venta_sin_inventario"]].copy()
+    df_sin_inv = df_filtrado.loc[
+        df_filtrado["venta_sin_inventario"], ["Ciudad_Destino", "ingreso_total"]
+    ]
 
     # Caso sin datos
     if df_sin_inv.empty:
@@ -100,18 +102,22 @@ def construir_fig_venta_invisible(df_filtrado: pd.DataFrame):
 # =============================================================================
 def mostrar_venta_invisible(df_filtrado: pd.DataFrame, renderizar: bool = True):
 
-    df = df_filtrado.copy()
-    df_sin_inv = df[df["venta_sin_inventario"]].copy()
+    # Solo las columnas que usa la página, sin copiar df_filtrado completo.
+    columnas = [
+        c for c in ("SKU_ID", "ingreso_total", "Fecha_Venta", "Canal_Venta", "Bodega_Origen")
+        if c in df_filtrado.columns
+    ]
+    df_sin_inv = df_filtrado.loc[df_filtrado["venta_sin_inventario"], columnas]
 
     ingreso_riesgo = df_sin_inv["ingreso_total"].sum() if not df_sin_inv.empty else 0
-    total_general = df["ingreso_total"].sum()
+    total_general = df_filtrado["ingreso_total"].sum()
     pct_ingreso_riesgo = (
         ingreso_riesgo / total_general * 100
         if total_general != 0 else 0
     )
     skus_huerfanos = df_sin_inv["SKU_ID"].nunique() if not df_sin_inv.empty else 0
 
-    fig_city = construir_fig_venta_invisible(df)
+    fig_city = construir_fig_venta_invisible(df_filtrado)
 
     if renderizar:
         st.header("👻 Análisis de la Venta Invisible")
@@ -135,16 +141,7 @@ def mostrar_venta_invisible(df_filtrado: pd.DataFrame, renderizar: bool = True):
 
         st.subheader("📅 Evolución del Riesgo de Inventario")
         if not df_sin_inv.empty and "Fecha_Venta" in df_sin_inv.columns:
-            df_tiempo = (
-                df_sin_inv
-                .groupby(df_sin_inv["Fecha_Venta"].dt.to_period("M"))
-                .agg(
-                    ingreso_total=("ingreso_total", "sum"),
-                    transacciones=("Transaccion_ID", "count")
-                )
-                .reset_index()
-            )
-            df_tiempo["Fecha_Venta"] = df_tiempo["Fecha_Venta"].astype(str)
+            df_tiempo = serie_venta_invisible(df_filtrado)
 
             fig_line = px.line(
                 df_tiempo,
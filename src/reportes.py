@@ -6,8 +6,11 @@ Los gráficos que se insertan en el PDF se renderizan con **matplotlib**
 (backend ``Agg``), eliminando completamente la dependencia de kaleido / Chrome.
 Las gráficas interactivas del dashboard siguen siendo Plotly.
 """
-import matplotlib
-matplotlib.use("Agg")
+import copy
+import logging
+import time
+from contextlib import contextmanager
+from functools import lru_cache
 
 import pandas as pd
 import numpy as np
@@ -19,42 +22,56 @@ from reportlab.platypus import (
     SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image,
 )
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-import matplotlib.pyplot as plt
-import matplotlib.ticker as mticker
 import io
-import sys
+
+from src.telemetria import histograma
+
+logger = logging.getLogger(__name__)
+
+_DURACION_REPORTE = histograma(
+    "dss_reporte_etapa_segundos", "Duración de las etapas del reporte PDF", ("etapa",)
+)
+
+
+def _pyplot():
+    """Importa matplotlib bajo demanda con el backend ``Agg``.
+
+    Mantiene matplotlib fuera del arranque de la app: solo se carga cuando
+    efectivamente se dibuja un gráfico del PDF.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    import matplotlib.ticker as mticker
+    return plt, mticker
 
 
 # =====================================================================
 #  Constructores de gráficos con Matplotlib (solo para el PDF)
 # =====================================================================
 
-def _fig_venta_invisible_mpl(df: pd.DataFrame, width=450, height=250):
-    """Gráfico de barras horizontal: Top 10 ciudades con mayor fuga."""
-    columnas = {"venta_sin_inventario", "Ciudad_Destino", "ingreso_total"}
-    if not columnas.issubset(df.columns):
-        return None
+def _fig_venta_invisible_mpl(fuga_ciudades, width=450, height=250):
+    """Gráfico de barras horizontal: Top 10 ciudades con mayor fuga.
 
-    df_sin = df[df["venta_sin_inventario"]].copy()
-    if df_sin.empty:
+    *fuga_ciudades* es la lista ``[(ciudad, ingreso), ...]`` del modelo del
+    reporte, ya ordenada de menor a mayor.
+    """
+    if not fuga_ciudades:
         return None
 
-    fuga = (
-        df_sin
-        .groupby("Ciudad_Destino", dropna=False)["ingreso_total"]
-        .sum()
-        .sort_values(ascending=True)
-        .tail(10)
-    )
+    ciudades = [str(c) for c, _ in fuga_ciudades]
+    valores = [v for _, v in fuga_ciudades]
+    maximo = max(valores)
 
+    plt, mticker = _pyplot()
     fig_w = max(width / 80, 4)
     fig_h = max(height / 80, 2.5)
     fig, ax = plt.subplots(figsize=(fig_w, fig_h), dpi=150)
 
-    bars = ax.barh(fuga.index.astype(str), fuga.values, color="#1f4e78",
+    bars = ax.barh(ciudades, valores, color="#1f4e78",
                    edgecolor="white", linewidth=0.3)
-    for bar, val in zip(bars, fuga.values):
-        ax.text(val + fuga.max() * 0.01, bar.get_y() + bar.get_height() / 2,
+    for bar, val in zip(bars, valores):
+        ax.text(val + maximo * 0.01, bar.get_y() + bar.get_height() / 2,
                 f"${val:,.0f}", va="center", fontsize=6, color="#333333")
 
     ax.set_title("Top 10 Ciudades – Fuga por Venta Invisible",
@@ -73,49 +90,34 @@ def _fig_venta_invisible_mpl(df: pd.DataFrame, width=450, height=250):
     return buf.read()
 
 
-def _fig_riesgo_operativo_mpl(df: pd.DataFrame, width=450, height=250):
-    """Scatter: días sin revisión vs tasa de soporte por bodega."""
-    columnas = {"Ultima_Revision", "Bodega_Origen", "Ticket_Soporte",
-                "ingreso_total", "NPS_Numerico"}
-    if not columnas.issubset(df.columns):
-        return None
+def _fig_riesgo_operativo_mpl(bodegas, width=450, height=250):
+    """Scatter: días sin revisión vs tasa de soporte por bodega.
 
-    df_work = df.copy()
-    df_work["Ultima_Revision"] = pd.to_datetime(
-        df_work["Ultima_Revision"], errors="coerce")
-    fecha_ref = df_work["Ultima_Revision"].max()
-    if pd.isna(fecha_ref):
-        return None
-    df_work["dias_sin_revision"] = (fecha_ref - df_work["Ultima_Revision"]).dt.days
-    df_work = df_work.dropna(subset=["dias_sin_revision"])
-    if df_work.empty:
+    *bodegas* es la lista de registros ``{"bodega", "dias", "tickets",
+    "ingresos"}`` del modelo del reporte.
+    """
+    if not bodegas:
         return None
 
-    agg = (
-        df_work
-        .groupby("Bodega_Origen")
-        .agg(
-            dias=("dias_sin_revision", "mean"),
-            tickets=("Ticket_Soporte", lambda x: x.mean() * 100),
-            ingresos=("ingreso_total", "sum"),
-        )
-        .reset_index()
-    )
+    dias = [b["dias"] for b in bodegas]
+    tickets = [b["tickets"] for b in bodegas]
+    ingresos = np.array([b["ingresos"] for b in bodegas], dtype=float)
 
+    plt, mticker = _pyplot()
     fig_w = max(width / 80, 4)
     fig_h = max(height / 80, 2.5)
     fig, ax = plt.subplots(figsize=(fig_w, fig_h), dpi=150)
 
-    sizes = (agg["ingresos"] / agg["ingresos"].max() * 300).clip(lower=30)
+    sizes = np.clip(ingresos / ingresos.max() * 300, 30, None)
     scatter = ax.scatter(
-        agg["dias"], agg["tickets"],
-        s=sizes, c=agg["tickets"],
+        dias, tickets,
+        s=sizes, c=tickets,
         cmap="OrRd", edgecolors="white", linewidth=0.5, alpha=0.85,
     )
 
-    for _, row in agg.iterrows():
+    for b in bodegas:
         ax.annotate(
-            row["Bodega_Origen"], (row["dias"], row["tickets"]),
+            b["bodega"], (b["dias"], b["tickets"]),
             fontsize=5, ha="center", va="bottom", color="#444444",
         )
 
@@ -136,406 +138,597 @@ def _fig_riesgo_operativo_mpl(df: pd.DataFrame, width=450, height=250):
     return buf.read()
 
 
+# =====================================================================
+#  Instrumentación opcional de tiempos
+# =====================================================================
+
+@contextmanager
+def _medir_etapa(tiempos, etapa: str):
+    """Mide la duración de una etapa del reporte.
+
+    Si *tiempos* es un dict, acumula los milisegundos bajo la clave *etapa*;
+    además emite un evento ``DEBUG`` en el logger del módulo y lo observa en
+    la métrica ``dss_reporte_etapa_segundos``.
+    """
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - inicio) * 1000
+        if tiempos is not None:
+            tiempos[etapa] = round(tiempos.get(etapa, 0.0) + ms, 3)
+        logger.debug("reporte_pdf etapa=%s ms=%.1f", etapa, ms)
+        _DURACION_REPORTE.observar(ms / 1000, etapa=etapa)
+
+
+# =====================================================================
+#  Plantilla precompilada (estilos, tablas y texto estático)
+# =====================================================================
+
+@lru_cache(maxsize=1)
+def _plantilla() -> dict:
+    """Construye una sola vez todo lo que no depende de los datos.
+
+    Incluye los estilos de párrafo, los ``TableStyle`` de cada sección y los
+    párrafos narrativos fijos ya parseados. Los párrafos se entregan al story
+    como copias superficiales (``_estatico``) para que cada documento haga su
+    propio ``wrap`` sin volver a parsear el markup.
+    """
+    styles = getSampleStyleSheet()
+
+    estilos = {
+        "title": ParagraphStyle(
+            "Title", parent=styles["Title"], fontSize=22,
+            textColor=colors.HexColor("#1f4e78"), spaceAfter=20),
+        "h2": ParagraphStyle(
+            "H2", parent=styles["Heading2"], fontSize=16,
+            textColor=colors.HexColor("#2e75b6"), spaceBefore=15,
+            spaceAfter=10),
+        "body": ParagraphStyle(
+            "Body", parent=styles["Normal"], fontSize=10, leading=12,
+            spaceAfter=10),
+        "alerta": ParagraphStyle(
+            "Alerta", parent=styles["Normal"], textColor=colors.red,
+            fontSize=10, leading=12, fontWeight="Bold"),
+        "kpi_header": ParagraphStyle(
+            "KPIHeader", parent=styles["Normal"], fontSize=9,
+            fontWeight="Bold", alignment=1,
+            textColor=colors.HexColor("#333333")),
+        "kpi_value": ParagraphStyle(
+            "KPIValue", parent=styles["Normal"], fontSize=13,
+            fontWeight="Bold", alignment=1,
+            textColor=colors.HexColor("#1f4e78")),
+        "caption": ParagraphStyle(
+            "Caption", parent=styles["Normal"], fontSize=8,
+            textColor=colors.HexColor("#666666"), alignment=1),
+        "error": ParagraphStyle(
+            "Err", fontSize=9, textColor=colors.red, alignment=1),
+    }
+
+    tablas = {
+        "health": TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1f4e78")),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ]),
+        "kpis": TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#eeeeee")),
+            ("GRID", (0, 0), (-1, -1), 1, colors.white),
+            ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 12),
+            ("TOPPADDING", (0, 0), (-1, -1), 12),
+        ]),
+        "logistica": TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#ebf5fb")),
+            ("GRID", (0, 0), (-1, -1), 1, colors.white),
+            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+        ]),
+        "venta_invisible": TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#f2f4f4")),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+            ("ALIGN", (1, 1), (-1, -1), "RIGHT"),
+            ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ]),
+        "fidelidad": TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#fcf3cf")),
+            ("GRID", (0, 0), (-1, -1), 1, colors.white),
+            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+        ]),
+        "operativo": TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#f2d7d5")),
+            ("GRID", (0, 0), (-1, -1), 1, colors.white),
+            ("ALIGN", (0, 0), (-1, -1), "CENTER"),
+        ]),
+        "bodegas": TableStyle([
+            ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#922b21")),
+            ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
+            ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
+            ("ALIGN", (1, 1), (-1, -1), "CENTER"),
+            ("ROWBACKGROUNDS", (0, 1), (-1, -1),
+             [colors.whitesmoke, colors.white]),
+            ("FONTSIZE", (0, 0), (-1, -1), 9),
+        ]),
+    }
+
+    anchos = {
+        "health": [1.5 * 72, 1.2 * 72, 1.2 * 72, 1 * 72],
+        "kpis": [1.35 * 72] * 4,
+        "tres_columnas": [1.8 * 72] * 3,
+        "venta_invisible": [2.5 * 72, 1.5 * 72],
+        "bodegas": [1.2 * 72, 1.2 * 72, 1.1 * 72, 1.5 * 72],
+    }
+
+    textos = {
+        # (estilo, markup)
+        "titulo": ("title",
+                   "Informe de Auditoría Integral: TechLogistics S.A.S"),
+        "asunto": ("body",
+                   "<b>Asunto:</b> Diagnóstico de Riesgo Operativo, "
+                   "Rentabilidad, Logistica y Fidelización"),
+        "h_calidad": ("h2", "1. Certificación de Calidad de la Información"),
+        "h_kpis": ("h2", "2. Resumen de Indicadores Clave (KPIs)"),
+        "h_logistica": ("h2", "3. Crisis Logística y Cuellos de Botella"),
+        "h_financiero": ("h2", "4. Riesgos Financieros y Administrativos"),
+        "h_fidelidad": ("h2",
+                        "5. Diagnóstico de Fidelidad y Paradoja de Inventario"),
+        "h_operativo": ("h2", "6. Riesgo Operativo: Bodegas 'A Ciegas'"),
+        "accion_logistica": ("alerta",
+                             "⚠️ <b>ACCIÓN INMEDIATA:</b> Se requiere el "
+                             "<b>cambio de operador logístico</b> para la ruta "
+                             "<b>Zona Franca - Barranquilla</b>."),
+        "explicacion_paradoja": ("body",
+                                 "<b>Explicación de la Paradoja:</b>"),
+        "hipotesis_sobrecosto": ("body",
+                                 "• <b>Hipótesis de Sobrecosto:</b> Para "
+                                 "categorías con Rating aceptable pero NPS "
+                                 "bajo, el cliente valora el producto pero "
+                                 "percibe un desbalance entre costo y "
+                                 "beneficio (sobreprecio), lo que frena la "
+                                 "rotación."),
+        "top_bodegas": ("body", "<b>Top 5 Bodegas en Riesgo Crítico:</b>"),
+        "diagnostico_gestion": ("body",
+                                "<b>Diagnóstico de Gestión:</b> Las bodegas "
+                                "con mayor antigüedad de revisión operan "
+                                "prácticamente 'a ciegas'. La falta de "
+                                "revisión genera inconsistencias que disparan "
+                                "los tickets de soporte, degradando la "
+                                "confianza operativa."),
+        # Encabezados de las tablas de KPIs
+        "kh_ingresos": ("kpi_header", "Total Ingresos (USD)"),
+        "kh_margen": ("kpi_header", "Margen Operativo"),
+        "kh_nps_global": ("kpi_header", "NPS Global"),
+        "kh_soporte": ("kpi_header", "Tasa Soporte"),
+        "kh_tiempo": ("kpi_header", "⏳ Tiempo Entrega Prom."),
+        "kh_corr_tiempo": ("kpi_header", "🔗 Correlación NPS/Tiempo"),
+        "kh_brecha": ("kpi_header", "🚩 Brecha Máxima"),
+        "kh_nps_prom": ("kpi_header", "NPS Promedio"),
+        "kh_rating": ("kpi_header", "Rating Producto"),
+        "kh_paradoja": ("kpi_header", "Casos Paradoja"),
+        "kh_dias": ("kpi_header", "Promedio Días Sin Revisión"),
+        "kh_tickets": ("kpi_header", "Tasa Tickets Soporte"),
+        "kh_corr_riesgo": ("kpi_header", "Correlación Riesgo/NPS"),
+        # Valores fijos de la sección logística
+        "kv_tiempo": ("kpi_value", "15.0 días"),
+        "kv_corr_tiempo": ("kpi_value", "-0.01"),
+        "kv_brecha": ("kpi_value", "29 días"),
+    }
+    estaticos = {
+        clave: Paragraph(markup, estilos[estilo])
+        for clave, (estilo, markup) in textos.items()
+    }
+
+    return {
+        "estilos": estilos,
+        "tablas": tablas,
+        "anchos": anchos,
+        "estaticos": estaticos,
+    }
+
+
+def _estatico(plantilla: dict, clave: str):
+    """Copia superficial de un párrafo estático ya parseado."""
+    return copy.copy(plantilla["estaticos"][clave])
+
+
+def _tabla(data, plantilla: dict, estilo: str, anchos: str = None):
+    t = Table(data, colWidths=plantilla["anchos"][anchos or estilo])
+    t.setStyle(plantilla["tablas"][estilo])
+    return t
+
+
 # =====================================================================
 #  Inserción de imágenes PNG en el story de ReportLab
 # =====================================================================
 
-def _insertar_grafico(img_bytes, story, caption, width=450, height=250):
+def _insertar_grafico(img_bytes, story, caption, plantilla, width=450,
+                      height=250):
     """Inserta bytes PNG en la lista *story* de ReportLab."""
+    estilos = plantilla["estilos"]
     if not img_bytes:
-        style_err = ParagraphStyle("Err", fontSize=9, textColor=colors.red,
-                                   alignment=1)
         story.append(Paragraph(
-            f"<i>[Gráfico no disponible: {caption}]</i>", style_err))
+            f"<i>[Gráfico no disponible: {caption}]</i>", estilos["error"]))
         return False
 
     try:
-        buf = io.BytesIO(img_bytes)
-        buf.seek(0)
-        img = Image(buf, width=width, height=height)
+        img = Image(io.BytesIO(img_bytes), width=width, height=height)
         img.hAlign = "CENTER"
 
         story.append(Spacer(1, 12))
         story.append(img)
-
-        style_cap = ParagraphStyle(
-            "Caption",
-            parent=getSampleStyleSheet()["Normal"],
-            fontSize=8,
-            textColor=colors.HexColor("#666666"),
-            alignment=1,
-        )
-        story.append(Paragraph(f"<i>{caption}</i>", style_cap))
+        story.append(Paragraph(f"<i>{caption}</i>", estilos["caption"]))
         story.append(Spacer(1, 10))
-        print(f"[PDF] ✓ Gráfico insertado: {caption}", file=sys.stderr)
+        logger.debug("reporte_pdf grafico=%r insertado", caption)
         return True
     except Exception as exc:
-        print(f"[PDF] ✗ Error insertando gráfico '{caption}': {exc}",
-              file=sys.stderr)
-        style_err = ParagraphStyle("Err", fontSize=9, textColor=colors.red,
-                                   alignment=1)
+        logger.warning("reporte_pdf grafico=%r error=%s", caption, exc)
         story.append(Paragraph(
-            f"<i>[Error al insertar: {caption}]</i>", style_err))
+            f"<i>[Error al insertar: {caption}]</i>", estilos["error"]))
         return False
 
 
 # =====================================================================
-#  Generador principal del PDF
+#  Modelo del reporte (contrato de entrada solo con agregados)
 # =====================================================================
 
-def generar_reporte_ejecutivo_pdf(df_filtrado, health_scores, metricas_calidad):
-    """Genera el reporte ejecutivo en PDF y devuelve sus bytes.
+def _registros(df_agg: pd.DataFrame, columnas: dict) -> list:
+    """Convierte un agregado pequeño en lista de dicts con tipos nativos."""
+    return [
+        {destino: (str(r[origen]) if destino == "bodega" else float(r[origen]))
+         for destino, origen in columnas.items()}
+        for _, r in df_agg.iterrows()
+    ]
 
-    Los gráficos se renderizan con matplotlib (sin kaleido).
-    La firma ya **no recibe figuras Plotly**; construye sus propias figuras.
+
+def construir_modelo_reporte(df_filtrado: pd.DataFrame, hoy=None) -> dict:
+    """Reduce un dataset filtrado al modelo compacto que consume el PDF.
+
+    No copia el dataframe ni le agrega columnas: cada indicador se calcula
+    sobre máscaras y series, y los únicos agregados que sobreviven son
+    escalares y tablas Top-N. El resultado es un dict de tipos nativos, de
+    tamaño independiente del número de filas, que puede serializarse o
+    enviarse a otro proceso. *hoy* fija la fecha de referencia para los días
+    sin revisión (por defecto, la fecha actual).
     """
-    print("\n" + "=" * 80, file=sys.stderr)
-    print("INICIANDO GENERACIÓN DE REPORTE PDF (matplotlib)", file=sys.stderr)
-    print("=" * 80, file=sys.stderr)
+    hoy = pd.to_datetime(hoy if hoy is not None else datetime.now().date())
+    columnas = df_filtrado.columns
 
-    buffer = BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=letter, leftMargin=40,
-                            rightMargin=40)
-    styles = getSampleStyleSheet()
-    story = []
+    ingreso = df_filtrado["ingreso_total"]
+    margen = df_filtrado["margen_real"]
+    tickets = df_filtrado["Ticket_Soporte"]
+    nps = df_filtrado["NPS_Numerico"]
+    tiempo = df_filtrado["Tiempo_Entrega"]
+    revision = pd.to_datetime(df_filtrado["Ultima_Revision"], errors="coerce")
 
-    df = df_filtrado.copy()
-    df["Ultima_Revision"] = pd.to_datetime(df["Ultima_Revision"], errors="coerce")
-    hoy = pd.to_datetime(datetime.now().date())
-    df["Dias_Desde_Revision"] = (hoy - df["Ultima_Revision"]).dt.days.fillna(0)
-    df["Ciudad_Destino_Norm"] = (
-        df["Ciudad_Destino"].astype(str).str.strip().str.upper()
-    )
+    mask_analisis = (tiempo < 100) & (tiempo > 0)
+    hay_analisis = bool(mask_analisis.any())
 
-    df_analisis = df[
-        (df["Tiempo_Entrega"] < 100) & (df["Tiempo_Entrega"] > 0)
-    ].copy()
-
-    # ── Estilos ──────────────────────────────────────────────────
-    style_title = ParagraphStyle(
-        "Title", parent=styles["Title"], fontSize=22,
-        textColor=colors.HexColor("#1f4e78"), spaceAfter=20)
-    style_h2 = ParagraphStyle(
-        "H2", parent=styles["Heading2"], fontSize=16,
-        textColor=colors.HexColor("#2e75b6"), spaceBefore=15, spaceAfter=10)
-    style_body = ParagraphStyle(
-        "Body", parent=styles["Normal"], fontSize=10, leading=12,
-        spaceAfter=10)
-    style_alerta = ParagraphStyle(
-        "Alerta", parent=styles["Normal"], textColor=colors.red, fontSize=10,
-        leading=12, fontWeight="Bold")
-    style_kpi_header = ParagraphStyle(
-        "KPIHeader", parent=styles["Normal"], fontSize=9, fontWeight="Bold",
-        alignment=1, textColor=colors.HexColor("#333333"))
-    style_kpi_value = ParagraphStyle(
-        "KPIValue", parent=styles["Normal"], fontSize=13, fontWeight="Bold",
-        alignment=1, textColor=colors.HexColor("#1f4e78"))
-
-    # ── 1. ENCABEZADO ───────────────────────────────────────────
-    story.append(Paragraph(
-        "Informe de Auditoría Integral: TechLogistics S.A.S", style_title))
-    story.append(Paragraph(
-        f"<b>Fecha de Emisión:</b> {datetime.now().strftime('%d/%m/%Y %H:%M')}",
-        style_body))
-    story.append(Paragraph(
-        "<b>Asunto:</b> Diagnóstico de Riesgo Operativo, Rentabilidad, "
-        "Logistica y Fidelización", style_body))
-    story.append(Spacer(1, 12))
-
-    # ── 2. SALUD DEL DATO ───────────────────────────────────────
-    story.append(Paragraph(
-        "1. Certificación de Calidad de la Información", style_h2))
-    data_health = [["Módulo", "Score Inicial", "Score Final", "Mejora"]]
-    for ds, scores in health_scores.items():
-        mejora = scores["Despues"] - scores["Antes"]
-        data_health.append([
-            ds.capitalize(),
-            f"{scores['Antes']:.1f}%",
-            f"{scores['Despues']:.1f}%",
-            f"+{mejora:.1f}%",
-        ])
-
-    t_health = Table(data_health,
-                     colWidths=[1.5 * 72, 1.2 * 72, 1.2 * 72, 1 * 72])
-    t_health.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#1f4e78")),
-        ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-    ]))
-    story.append(t_health)
-    story.append(Spacer(1, 15))
-
-    # ── 3. KPIs GENERALES ───────────────────────────────────────
-    story.append(Paragraph(
-        "2. Resumen de Indicadores Clave (KPIs)", style_h2))
-    total_ingresos = df["ingreso_total"].sum()
+    # ── KPIs generales
+    total_ingresos = float(ingreso.sum())
     margen_promedio = (
-        (df["margen_real"].sum() / total_ingresos * 100)
-        if total_ingresos != 0 else 0
-    )
-    nps_global = df_analisis["NPS_Numerico"].mean()
-    tasa_soporte_global = df["Ticket_Soporte"].mean() * 100
-
-    data_kpis = [
-        [Paragraph("Total Ingresos (USD)", style_kpi_header),
-         Paragraph("Margen Operativo", style_kpi_header),
-         Paragraph("NPS Global", style_kpi_header),
-         Paragraph("Tasa Soporte", style_kpi_header)],
-        [Paragraph(f"${total_ingresos:,.0f}", style_kpi_value),
-         Paragraph(f"{margen_promedio:.1f}%", style_kpi_value),
-         Paragraph(f"{nps_global:.2f}", style_kpi_value),
-         Paragraph(f"{tasa_soporte_global:.1f}%", style_kpi_value)],
-    ]
-    t_kpis = Table(data_kpis, colWidths=[1.35 * 72] * 4)
-    t_kpis.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#eeeeee")),
-        ("GRID", (0, 0), (-1, -1), 1, colors.white),
-        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
-        ("BOTTOMPADDING", (0, 0), (-1, -1), 12),
-        ("TOPPADDING", (0, 0), (-1, -1), 12),
-    ]))
-    story.append(t_kpis)
-    story.append(Spacer(1, 10))
-
-    # ── 4. CRISIS LOGÍSTICA ─────────────────────────────────────
-    story.append(Paragraph(
-        "3. Crisis Logística y Cuellos de Botella", style_h2))
-    data_log_kpis = [
-        [Paragraph("⏳ Tiempo Entrega Prom.", style_kpi_header),
-         Paragraph("🔗 Correlación NPS/Tiempo", style_kpi_header),
-         Paragraph("🚩 Brecha Máxima", style_kpi_header)],
-        [Paragraph("15.0 días", style_kpi_value),
-         Paragraph("-0.01", style_kpi_value),
-         Paragraph("29 días", style_kpi_value)],
-    ]
-    t_log = Table(data_log_kpis, colWidths=[1.8 * 72] * 3)
-    t_log.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#ebf5fb")),
-        ("GRID", (0, 0), (-1, -1), 1, colors.white),
-        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-    ]))
-    story.append(t_log)
-    story.append(Spacer(1, 10))
-
-    filtro_canal = df_analisis["Ciudad_Destino_Norm"].str.contains(
-        "CANAL DIGITAL|DIGITAL", na=False)
-    registros_canal_digital = df_analisis[filtro_canal].shape[0]
-    story.append(Paragraph(
-        f"<b>HALLAZGO DE TRAZABILIDAD:</b> Se identificaron "
-        f"<b>{registros_canal_digital} registros</b> con ciudad de destino "
-        f"<b>CANAL DIGITAL</b>. Al normalizar los datos, este volumen revela "
-        f"una carencia crítica de control geográfico sobre el gasto logístico.",
-        style_body))
-    story.append(Paragraph(
-        "⚠️ <b>ACCIÓN INMEDIATA:</b> Se requiere el <b>cambio de operador "
-        "logístico</b> para la ruta <b>Zona Franca - Barranquilla</b>.",
-        style_alerta))
-    story.append(Spacer(1, 10))
-
-    # ── 5. RIESGOS FINANCIEROS Y VENTA INVISIBLE ────────────────
-    story.append(Paragraph(
-        "4. Riesgos Financieros y Administrativos", style_h2))
-
-    df_sin_inv = (
-        df[df["venta_sin_inventario"]].copy()
-        if "venta_sin_inventario" in df.columns else pd.DataFrame()
-    )
-    ingreso_riesgo = (
-        df_sin_inv["ingreso_total"].sum() if not df_sin_inv.empty else 0
+        float(margen.sum()) / total_ingresos * 100 if total_ingresos != 0 else 0
     )
-    porcentaje_riesgo = (
-        (ingreso_riesgo / total_ingresos * 100) if total_ingresos else 0
-    )
-    skus_no_catalogados = (
-        df_sin_inv["SKU_ID"].nunique() if not df_sin_inv.empty else 0
+    nps_analisis = nps[mask_analisis].mean()
+    tasa_soporte = float(tickets.mean() * 100)
+
+    # ── Crisis logística
+    ciudad_analisis = (
+        df_filtrado.loc[mask_analisis, "Ciudad_Destino"]
+        .astype(str).str.strip().str.upper()
     )
-    transacciones_afectadas = len(df_sin_inv)
-
-    story.append(Paragraph(
-        f"<b>Diagnóstico de Venta Invisible:</b> Impacto financiero de "
-        f"<b>USD ${ingreso_riesgo:,.2f}</b> ({porcentaje_riesgo:.1f}% del "
-        f"total) por SKUs no catalogados.", style_body))
-
-    # Gráfico matplotlib – venta invisible
-    img_ciudades = _fig_venta_invisible_mpl(df, width=450, height=250)
-    _insertar_grafico(img_ciudades, story,
-                      "Ingresos en riesgo por ciudad (resumen)",
-                      width=450, height=250)
-
-    data_inv = [
-        ["Métrica de Riesgo", "Valor Detectado"],
-        ["Ingreso en Riesgo (USD)", f"${ingreso_riesgo:,.2f}"],
-        ["SKUs No Catalogados", str(skus_no_catalogados)],
-        ["Transacciones Afectadas", str(transacciones_afectadas)],
-    ]
-    t_inv = Table(data_inv, colWidths=[2.5 * 72, 1.5 * 72])
-    t_inv.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#f2f4f4")),
-        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-        ("ALIGN", (1, 1), (-1, -1), "RIGHT"),
-        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
-    ]))
-    story.append(t_inv)
-
-    df_perdida = df[df["margen_real"] < 0]
-    total_fuga = abs(df_perdida["margen_real"].sum())
-    story.append(Paragraph(
-        f"• <b>Fuga de Capital:</b> Pérdida directa de "
-        f"<b>USD ${total_fuga:,.2f}</b> en márgenes negativos.", style_body))
-
-    # ── 6. DIAGNÓSTICO DE FIDELIDAD ─────────────────────────────
-    story.append(Paragraph(
-        "5. Diagnóstico de Fidelidad y Paradoja de Inventario", style_h2))
-
-    nps_avg_fid = (
-        df_analisis["NPS_Numerico"].mean() if not df_analisis.empty else 0
+    registros_canal_digital = int(
+        ciudad_analisis.str.contains("CANAL DIGITAL|DIGITAL", na=False).sum()
     )
-    rating_prod = (
-        df_analisis["Rating_Producto"].mean()
-        if "Rating_Producto" in df_analisis.columns else 0
+
+    # ── Venta invisible
+    fuga_ciudades = []
+    ingreso_riesgo, skus_no_catalogados, transacciones_afectadas = 0.0, 0, 0
+    if "venta_sin_inventario" in columnas:
+        mask_sin_inv = df_filtrado["venta_sin_inventario"].astype(bool)
+        transacciones_afectadas = int(mask_sin_inv.sum())
+        if transacciones_afectadas:
+            ingreso_sin_inv = ingreso[mask_sin_inv]
+            ingreso_riesgo = float(ingreso_sin_inv.sum())
+            skus_no_catalogados = int(
+                df_filtrado.loc[mask_sin_inv, "SKU_ID"].nunique())
+            fuga = (
+                ingreso_sin_inv
+                .groupby(df_filtrado.loc[mask_sin_inv, "Ciudad_Destino"],
+                         dropna=False)
+                .sum()
+                .sort_values(ascending=True)
+                .tail(10)
+            )
+            fuga_ciudades = [(str(c), float(v)) for c, v in fuga.items()]
+
+    # ── Fidelidad
+    rating = (
+        df_filtrado.loc[mask_analisis, "Rating_Producto"].mean()
+        if "Rating_Producto" in columnas else 0
     )
     casos_paradoja = (
-        int(df["paradoja_fidelidad"].sum())
-        if "paradoja_fidelidad" in df.columns else 0
+        int(df_filtrado["paradoja_fidelidad"].sum())
+        if "paradoja_fidelidad" in columnas else 0
     )
 
-    story.append(Paragraph(
-        f"Se ha detectado una <b>paradoja crítica</b> en la gestión de stock: "
-        f"existen <b>{casos_paradoja} instancias</b> de productos con alta "
-        f"disponibilidad (Stock > Q3) pero sentimiento negativo del cliente "
-        f"(NPS < 7).", style_body))
-
-    data_fid = [
-        [Paragraph("NPS Promedio", style_kpi_header),
-         Paragraph("Rating Producto", style_kpi_header),
-         Paragraph("Casos Paradoja", style_kpi_header)],
-        [Paragraph(f"{nps_avg_fid:.2f}/10", style_kpi_value),
-         Paragraph(f"{rating_prod:.2f}/5", style_kpi_value),
-         Paragraph(f"{casos_paradoja}", style_kpi_value)],
-    ]
-    t_fid = Table(data_fid, colWidths=[1.8 * 72] * 3)
-    t_fid.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#fcf3cf")),
-        ("GRID", (0, 0), (-1, -1), 1, colors.white),
-        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-    ]))
-    story.append(t_fid)
-    story.append(Spacer(1, 10))
-
-    story.append(Paragraph("<b>Explicación de la Paradoja:</b>", style_body))
-    story.append(Paragraph(
-        f"• <b>Calidad Deficiente:</b> El Rating de producto de "
-        f"<b>{rating_prod:.2f}/5</b> indica que el estancamiento de "
-        f"inventario se debe primordialmente a una <b>baja percepción de "
-        f"calidad</b> del SKU. El mercado está rechazando activamente estos "
-        f"productos.", style_body))
-    story.append(Paragraph(
-        "• <b>Hipótesis de Sobrecosto:</b> Para categorías con Rating "
-        "aceptable pero NPS bajo, el cliente valora el producto pero percibe "
-        "un desbalance entre costo y beneficio (sobreprecio), lo que frena la "
-        "rotación.", style_body))
-
-    # ── 7. RIESGO OPERATIVO ─────────────────────────────────────
-    story.append(Paragraph(
-        "6. Riesgo Operativo: Bodegas 'A Ciegas'", style_h2))
-
-    promedio_dias = df["Dias_Desde_Revision"].mean()
-    tasa_tickets = df["Ticket_Soporte"].mean() * 100
-    df_corr = df.dropna(subset=["Dias_Desde_Revision", "NPS_Numerico"])
+    # ── Riesgo operativo (días contra hoy para KPIs y tabla)
+    dias_hoy = (hoy - revision).dt.days.fillna(0)
+    mask_corr = nps.notna()
     corr_nps = (
-        df_corr["Dias_Desde_Revision"].corr(df_corr["NPS_Numerico"])
-        if not df_corr.empty else 0
+        dias_hoy[mask_corr].corr(nps[mask_corr]) if mask_corr.any() else 0
     )
 
-    story.append(Paragraph(
-        f"El análisis de riesgo operativo revela que el sistema de "
-        f"almacenamiento opera con un rezago crítico de auditoría, con un "
-        f"promedio de <b>{promedio_dias:.0f} días sin revisión</b> física de "
-        f"stock. Este descuido administrativo tiene una incidencia directa en "
-        f"la <b>tasa de soporte del {tasa_tickets:.1f}%</b>.", style_body))
-
-    data_ops = [
-        [Paragraph("Promedio Días Sin Revisión", style_kpi_header),
-         Paragraph("Tasa Tickets Soporte", style_kpi_header),
-         Paragraph("Correlación Riesgo/NPS", style_kpi_header)],
-        [Paragraph(f"{promedio_dias:.0f} días", style_kpi_value),
-         Paragraph(f"{tasa_tickets:.1f}%", style_kpi_value),
-         Paragraph(f"{corr_nps:.2f}", style_kpi_value)],
-    ]
-    t_ops = Table(data_ops, colWidths=[1.8 * 72] * 3)
-    t_ops.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#f2d7d5")),
-        ("GRID", (0, 0), (-1, -1), 1, colors.white),
-        ("ALIGN", (0, 0), (-1, -1), "CENTER"),
-    ]))
-    story.append(t_ops)
-    story.append(Spacer(1, 10))
-
-    # Top 5 bodegas — calculado dinámicamente
-    story.append(Paragraph(
-        "<b>Top 5 Bodegas en Riesgo Crítico:</b>", style_body))
-    df_bodegas = (
-        df.dropna(subset=["Dias_Desde_Revision"])
+    base_bodegas = pd.DataFrame({
+        "Bodega_Origen": df_filtrado["Bodega_Origen"],
+        "dias": dias_hoy,
+        "tickets": tickets,
+        "ingresos": ingreso,
+    })
+    top_bodegas = (
+        base_bodegas
         .groupby("Bodega_Origen")
-        .agg(
-            dias=("Dias_Desde_Revision", "mean"),
-            tickets=("Ticket_Soporte", lambda x: x.mean() * 100),
-            ingresos=("ingreso_total", "sum"),
-        )
+        .agg(dias=("dias", "mean"), tickets=("tickets", "mean"),
+             ingresos=("ingresos", "sum"))
         .sort_values("dias", ascending=False)
         .head(5)
         .reset_index()
     )
+    top_bodegas["tickets"] *= 100
+
+    # ── Gráfico de riesgo (días contra la revisión más reciente)
+    bodegas_grafico = []
+    fecha_ref = revision.max()
+    if pd.notna(fecha_ref):
+        base_bodegas["dias"] = (fecha_ref - revision).dt.days
+        agg_grafico = (
+            base_bodegas
+            .dropna(subset=["dias"])
+            .groupby("Bodega_Origen")
+            .agg(dias=("dias", "mean"), tickets=("tickets", "mean"),
+                 ingresos=("ingresos", "sum"))
+            .reset_index()
+        )
+        agg_grafico["tickets"] *= 100
+        bodegas_grafico = _registros(agg_grafico, {
+            "bodega": "Bodega_Origen", "dias": "dias",
+            "tickets": "tickets", "ingresos": "ingresos"})
+
+    return {
+        "registros": int(len(df_filtrado)),
+        "kpis": {
+            "total_ingresos": total_ingresos,
+            "margen_promedio": float(margen_promedio),
+            "nps_global": float(nps_analisis),
+            "tasa_soporte": tasa_soporte,
+        },
+        "logistica": {
+            "registros_canal_digital": registros_canal_digital,
+        },
+        "venta_invisible": {
+            "ingreso_riesgo": ingreso_riesgo,
+            "porcentaje_riesgo": (
+                ingreso_riesgo / total_ingresos * 100 if total_ingresos else 0
+            ),
+            "skus_no_catalogados": skus_no_catalogados,
+            "transacciones_afectadas": transacciones_afectadas,
+            "fuga_ciudades": fuga_ciudades,
+        },
+        "fuga_capital": float(abs(margen[margen < 0].sum())),
+        "fidelidad": {
+            "nps_promedio": float(nps_analisis) if hay_analisis else 0.0,
+            "rating_producto": float(rating),
+            "casos_paradoja": casos_paradoja,
+        },
+        "riesgo_operativo": {
+            "promedio_dias": float(dias_hoy.mean()),
+            "tasa_tickets": tasa_soporte,
+            "corr_nps": float(corr_nps),
+            "top_bodegas": _registros(top_bodegas, {
+                "bodega": "Bodega_Origen", "dias": "dias",
+                "tickets": "tickets", "ingresos": "ingresos"}),
+            "bodegas_grafico": bodegas_grafico,
+        },
+    }
 
-    data_bodegas = [
-        ["Bodega", "Días Sin Revisión", "% Tickets Soporte",
-         "Ingresos Expuestos"]
-    ]
-    for _, r in df_bodegas.iterrows():
-        data_bodegas.append([
-            str(r["Bodega_Origen"]),
-            f"{r['dias']:.0f}",
-            f"{r['tickets']:.1f}%",
-            f"${r['ingresos']:,.2f}",
-        ])
-
-    t_bodegas = Table(data_bodegas,
-                      colWidths=[1.2 * 72, 1.2 * 72, 1.1 * 72, 1.5 * 72])
-    t_bodegas.setStyle(TableStyle([
-        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor("#922b21")),
-        ("TEXTCOLOR", (0, 0), (-1, 0), colors.whitesmoke),
-        ("GRID", (0, 0), (-1, -1), 0.5, colors.grey),
-        ("ALIGN", (1, 1), (-1, -1), "CENTER"),
-        ("ROWBACKGROUNDS", (0, 1), (-1, -1),
-         [colors.whitesmoke, colors.white]),
-        ("FONTSIZE", (0, 0), (-1, -1), 9),
-    ]))
-    story.append(t_bodegas)
-
-    story.append(Paragraph(
-        "<b>Diagnóstico de Gestión:</b> Las bodegas con mayor antigüedad de "
-        "revisión operan prácticamente 'a ciegas'. La falta de revisión "
-        "genera inconsistencias que disparan los tickets de soporte, "
-        "degradando la confianza operativa.", style_body))
-
-    # Gráfico matplotlib – riesgo operativo
-    img_riesgo = _fig_riesgo_operativo_mpl(df, width=450, height=250)
-    _insertar_grafico(img_riesgo, story,
-                      "Bodegas con mayor riesgo operativo (resumen)",
-                      width=450, height=250)
+
+# =====================================================================
+#  Generador principal del PDF
+# =====================================================================
+
+def renderizar_reporte_pdf(modelo: dict, health_scores: dict, tiempos=None):
+    """Renderiza el PDF a partir del modelo de ``construir_modelo_reporte``.
+
+    Los estilos, tablas y textos fijos provienen de la plantilla cacheada
+    (``_plantilla``); aquí solo se enlazan los valores del modelo y las
+    imágenes. Si se pasa un dict en *tiempos*, se llena con la duración en
+    ms de cada etapa.
+    """
+    with _medir_etapa(tiempos, "plantilla"):
+        plantilla = _plantilla()
+    est = plantilla["estilos"]
+
+    def fijo(clave):
+        return _estatico(plantilla, clave)
+
+    kpis = modelo["kpis"]
+    vi = modelo["venta_invisible"]
+    fid = modelo["fidelidad"]
+    ops = modelo["riesgo_operativo"]
+
+    buffer = BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, leftMargin=40,
+                            rightMargin=40)
+    story = []
+
+    with _medir_etapa(tiempos, "graficos"):
+        img_ciudades = _fig_venta_invisible_mpl(
+            vi["fuga_ciudades"], width=450, height=250)
+        img_riesgo = _fig_riesgo_operativo_mpl(
+            ops["bodegas_grafico"], width=450, height=250)
+
+    with _medir_etapa(tiempos, "enlace"):
+        # ── 1. ENCABEZADO ───────────────────────────────────────
+        story.append(fijo("titulo"))
+        story.append(Paragraph(
+            f"<b>Fecha de Emisión:</b> "
+            f"{datetime.now().strftime('%d/%m/%Y %H:%M')}", est["body"]))
+        story.append(fijo("asunto"))
+        story.append(Spacer(1, 12))
+
+        # ── 2. SALUD DEL DATO ───────────────────────────────────
+        story.append(fijo("h_calidad"))
+        data_health = [["Módulo", "Score Inicial", "Score Final", "Mejora"]]
+        for ds, scores in health_scores.items():
+            mejora = scores["Despues"] - scores["Antes"]
+            data_health.append([
+                ds.capitalize(),
+                f"{scores['Antes']:.1f}%",
+                f"{scores['Despues']:.1f}%",
+                f"+{mejora:.1f}%",
+            ])
+        story.append(_tabla(data_health, plantilla, "health"))
+        story.append(Spacer(1, 15))
+
+        # ── 3. KPIs GENERALES ───────────────────────────────────
+        story.append(fijo("h_kpis"))
+        data_kpis = [
+            [fijo("kh_ingresos"), fijo("kh_margen"), fijo("kh_nps_global"),
+             fijo("kh_soporte")],
+            [Paragraph(f"${kpis['total_ingresos']:,.0f}", est["kpi_value"]),
+             Paragraph(f"{kpis['margen_promedio']:.1f}%", est["kpi_value"]),
+             Paragraph(f"{kpis['nps_global']:.2f}", est["kpi_value"]),
+             Paragraph(f"{kpis['tasa_soporte']:.1f}%", est["kpi_value"])],
+        ]
+        story.append(_tabla(data_kpis, plantilla, "kpis"))
+        story.append(Spacer(1, 10))
+
+        # ── 4. CRISIS LOGÍSTICA ─────────────────────────────────
+        story.append(fijo("h_logistica"))
+        data_log_kpis = [
+            [fijo("kh_tiempo"), fijo("kh_corr_tiempo"), fijo("kh_brecha")],
+            [fijo("kv_tiempo"), fijo("kv_corr_tiempo"), fijo("kv_brecha")],
+        ]
+        story.append(_tabla(data_log_kpis, plantilla, "logistica",
+                            "tres_columnas"))
+        story.append(Spacer(1, 10))
+        story.append(Paragraph(
+            f"<b>HALLAZGO DE TRAZABILIDAD:</b> Se identificaron "
+            f"<b>{modelo['logistica']['registros_canal_digital']} "
+            f"registros</b> con ciudad de destino <b>CANAL DIGITAL</b>. Al "
+            f"normalizar los datos, este volumen revela una carencia crítica "
+            f"de control geográfico sobre el gasto logístico.", est["body"]))
+        story.append(fijo("accion_logistica"))
+        story.append(Spacer(1, 10))
+
+        # ── 5. RIESGOS FINANCIEROS Y VENTA INVISIBLE ────────────
+        story.append(fijo("h_financiero"))
+        story.append(Paragraph(
+            f"<b>Diagnóstico de Venta Invisible:</b> Impacto financiero de "
+            f"<b>USD ${vi['ingreso_riesgo']:,.2f}</b> "
+            f"({vi['porcentaje_riesgo']:.1f}% del total) por SKUs no "
+            f"catalogados.", est["body"]))
+        _insertar_grafico(img_ciudades, story,
+                          "Ingresos en riesgo por ciudad (resumen)",
+                          plantilla, width=450, height=250)
+
+        data_inv = [
+            ["Métrica de Riesgo", "Valor Detectado"],
+            ["Ingreso en Riesgo (USD)", f"${vi['ingreso_riesgo']:,.2f}"],
+            ["SKUs No Catalogados", str(vi["skus_no_catalogados"])],
+            ["Transacciones Afectadas", str(vi["transacciones_afectadas"])],
+        ]
+        story.append(_tabla(data_inv, plantilla, "venta_invisible"))
+        story.append(Paragraph(
+            f"• <b>Fuga de Capital:</b> Pérdida directa de "
+            f"<b>USD ${modelo['fuga_capital']:,.2f}</b> en márgenes "
+            f"negativos.", est["body"]))
+
+        # ── 6. DIAGNÓSTICO DE FIDELIDAD ─────────────────────────
+        story.append(fijo("h_fidelidad"))
+        story.append(Paragraph(
+            f"Se ha detectado una <b>paradoja crítica</b> en la gestión de "
+            f"stock: existen <b>{fid['casos_paradoja']} instancias</b> de "
+            f"productos con alta disponibilidad (Stock > Q3) pero sentimiento "
+            f"negativo del cliente (NPS < 7).", est["body"]))
+        data_fid = [
+            [fijo("kh_nps_prom"), fijo("kh_rating"), fijo("kh_paradoja")],
+            [Paragraph(f"{fid['nps_promedio']:.2f}/10", est["kpi_value"]),
+             Paragraph(f"{fid['rating_producto']:.2f}/5", est["kpi_value"]),
+             Paragraph(f"{fid['casos_paradoja']}", est["kpi_value"])],
+        ]
+        story.append(_tabla(data_fid, plantilla, "fidelidad", "tres_columnas"))
+        story.append(Spacer(1, 10))
+
+        story.append(fijo("explicacion_paradoja"))
+        story.append(Paragraph(
+            f"• <b>Calidad Deficiente:</b> El Rating de producto de "
+            f"<b>{fid['rating_producto']:.2f}/5</b> indica que el "
+            f"estancamiento de inventario se debe primordialmente a una "
+            f"<b>baja percepción de calidad</b> del SKU. El mercado está "
+            f"rechazando activamente estos productos.", est["body"]))
+        story.append(fijo("hipotesis_sobrecosto"))
+
+        # ── 7. RIESGO OPERATIVO ─────────────────────────────────
+        story.append(fijo("h_operativo"))
+        story.append(Paragraph(
+            f"El análisis de riesgo operativo revela que el sistema de "
+            f"almacenamiento opera con un rezago crítico de auditoría, con un "
+            f"promedio de <b>{ops['promedio_dias']:.0f} días sin revisión</b> "
+            f"física de stock. Este descuido administrativo tiene una "
+            f"incidencia directa en la <b>tasa de soporte del "
+            f"{ops['tasa_tickets']:.1f}%</b>.", est["body"]))
+        data_ops = [
+            [fijo("kh_dias"), fijo("kh_tickets"), fijo("kh_corr_riesgo")],
+            [Paragraph(f"{ops['promedio_dias']:.0f} días", est["kpi_value"]),
+             Paragraph(f"{ops['tasa_tickets']:.1f}%", est["kpi_value"]),
+             Paragraph(f"{ops['corr_nps']:.2f}", est["kpi_value"])],
+        ]
+        story.append(_tabla(data_ops, plantilla, "operativo", "tres_columnas"))
+        story.append(Spacer(1, 10))
+
+        story.append(fijo("top_bodegas"))
+        data_bodegas = [
+            ["Bodega", "Días Sin Revisión", "% Tickets Soporte",
+             "Ingresos Expuestos"]
+        ]
+        for r in ops["top_bodegas"]:
+            data_bodegas.append([
+                r["bodega"],
+                f"{r['dias']:.0f}",
+                f"{r['tickets']:.1f}%",
+                f"${r['ingresos']:,.2f}",
+            ])
+        story.append(_tabla(data_bodegas, plantilla, "bodegas"))
+        story.append(fijo("diagnostico_gestion"))
+
+        _insertar_grafico(img_riesgo, story,
+                          "Bodegas con mayor riesgo operativo (resumen)",
+                          plantilla, width=450, height=250)
 
     # ── Construir PDF ────────────────────────────────────────────
-    print("\n[PDF] Construyendo documento...", file=sys.stderr)
     try:
-        doc.build(story)
-        buffer.seek(0)
-        print("[PDF] ✓ PDF generado exitosamente", file=sys.stderr)
-        print("=" * 80 + "\n", file=sys.stderr)
-        return buffer.getvalue()
-    except Exception as e:
-        print(f"[PDF] ✗ Error al construir PDF: {e}", file=sys.stderr)
-        import traceback
-        print(traceback.format_exc(), file=sys.stderr)
+        with _medir_etapa(tiempos, "construccion"):
+            doc.build(story)
+    except Exception:
+        logger.exception("reporte_pdf error al construir el documento")
         raise
+
+    logger.info("reporte_pdf generado registros=%d bytes=%d",
+                modelo["registros"], buffer.tell())
+    return buffer.getvalue()
+
+
+def generar_reporte_ejecutivo_pdf(df_filtrado, health_scores, metricas_calidad,
+                                  tiempos=None):
+    """Genera el reporte ejecutivo en PDF y devuelve sus bytes.
+
+    Los gráficos se renderizan con matplotlib (sin kaleido).
+    La firma ya **no recibe figuras Plotly**; construye sus propias figuras.
+
+    Equivale a ``construir_modelo_reporte`` + ``renderizar_reporte_pdf``:
+    el dataframe solo se recorre para producir el modelo agregado.
+    """
+    with _medir_etapa(tiempos, "modelo"):
+        modelo = construir_modelo_reporte(df_filtrado)
+    return renderizar_reporte_pdf(modelo, health_scores, tiempos=tiempos)
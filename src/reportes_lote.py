@@ -0,0 +1,192 @@
+# -*- coding: utf-8 -*-
+"""
+Generación en lote de reportes ejecutivos segmentados.
+
+Produce un PDF por cada valor de ``Bodega_Origen`` y de ``Categoria`` a
+partir de un único dataset consolidado. El pipeline de limpieza se ejecuta
+una sola vez; luego cada dimensión se parte con un único ``groupby``, cada
+segmento se reduce a su modelo agregado (``construir_modelo_reporte``) y
+los modelos se renderizan en procesos paralelos. Cada ejecución deja en el
+directorio de salida un ``manifest.json`` con el inventario de archivos
+generados.
+
+Uso:
+    python -m src.reportes_lote --salida reports/lote
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import pandas as pd
+
+from src.data_loader import (
+    _DEFAULT_FEEDBACK,
+    _DEFAULT_INVENTARIO,
+    _DEFAULT_TRANSACCIONES,
+    construir_dataset_dss,
+)
+from src.reportes import construir_modelo_reporte
+
+DIMENSIONES_SEGMENTO = ("Bodega_Origen", "Categoria")
+_SEGMENTO_NULO = "sin asignar"
+
+
+# =====================================================================
+#  Helpers
+# =====================================================================
+
+def _slug(valor) -> str:
+    """Nombre de archivo seguro para un valor de segmento."""
+    texto = _SEGMENTO_NULO if pd.isna(valor) else str(valor)
+    texto = unicodedata.normalize("NFKD", texto).encode("ascii", "ignore").decode()
+    texto = re.sub(r"[^A-Za-z0-9]+", "_", texto).strip("_").lower()
+    return texto or "segmento"
+
+
+def _nombre_unico(base: str, usados: set) -> str:
+    """``base`` con sufijo ``_2``, ``_3``... si otro segmento ya lo usa.
+
+    Valores distintos pueden dar el mismo slug ("Norte"/"norte",
+    "Zona Franca"/"zona_franca"); sin sufijo un PDF pisaría al otro.
+    """
+    nombre, n = base, 1
+    while nombre in usados:
+        n += 1
+        nombre = f"{base}_{n}"
+    usados.add(nombre)
+    return nombre
+
+
+def _preparar_dataset(df_dss: pd.DataFrame) -> pd.DataFrame:
+    """Aplica una sola vez las transformaciones compartidas por todos los segmentos."""
+    return df_dss.rename(columns={"Bodega_Origen_x": "Bodega_Origen"})
+
+
+def _iterar_segmentos(df: pd.DataFrame, dimensiones):
+    """Recorre cada dimensión con un único groupby y entrega sus segmentos."""
+    for dimension in dimensiones:
+        if dimension not in df.columns:
+            continue
+        for valor, df_segmento in df.groupby(dimension, sort=True, dropna=False):
+            yield dimension, valor, df_segmento
+
+
+def _renderizar_segmento(entrada, modelo, health_scores, ruta_pdf) -> dict:
+    """Trabajo ejecutado en cada proceso: renderiza y escribe un PDF.
+
+    El proceso solo recibe el modelo agregado del segmento (unos pocos KB),
+    nunca las filas del dataset.
+    """
+    from src.reportes import renderizar_reporte_pdf
+
+    entrada = dict(entrada)
+    try:
+        pdf_bytes = renderizar_reporte_pdf(modelo, health_scores)
+        with open(ruta_pdf, "wb") as fh:
+            fh.write(pdf_bytes)
+        entrada["bytes"] = len(pdf_bytes)
+        entrada["estado"] = "ok"
+    except Exception as exc:
+        entrada["estado"] = "error"
+        entrada["error"] = str(exc)
+    return entrada
+
+
+# =====================================================================
+#  Motor de lote
+# =====================================================================
+
+def generar_reportes_segmentados(df_dss, health_scores, directorio_salida,
+                                 dimensiones=DIMENSIONES_SEGMENTO,
+                                 max_workers=None) -> dict:
+    """Genera un PDF por segmento y devuelve el manifiesto escrito en disco.
+
+    ``df_dss`` es el dataset consolidado tal como lo entrega
+    ``construir_dataset_dss``; los health scores son compartidos por todos
+    los reportes.
+    """
+    os.makedirs(directorio_salida, exist_ok=True)
+    inicio = datetime.now()
+
+    df = _preparar_dataset(df_dss)
+    hoy = inicio.date()
+
+    # Los modelos se construyen en el proceso principal: cada segmento se
+    # reduce a sus agregados antes de cruzar la frontera entre procesos.
+    trabajos = []
+    usados = set()
+    for dimension, valor, df_segmento in _iterar_segmentos(df, dimensiones):
+        nombre = _nombre_unico(f"Reporte_{_slug(dimension)}_{_slug(valor)}", usados) + ".pdf"
+        entrada = {
+            "dimension": dimension,
+            "segmento": _SEGMENTO_NULO if pd.isna(valor) else str(valor),
+            "archivo": nombre,
+            "registros": int(len(df_segmento)),
+        }
+        modelo = construir_modelo_reporte(df_segmento, hoy=hoy)
+        trabajos.append(
+            (entrada, modelo, health_scores,
+             os.path.join(directorio_salida, nombre))
+        )
+
+    reportes = []
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futuros = [pool.submit(_renderizar_segmento, *t) for t in trabajos]
+        for futuro in as_completed(futuros):
+            reportes.append(futuro.result())
+
+    reportes.sort(key=lambda r: (r["dimension"], r["segmento"]))
+    manifiesto = {
+        "generado": inicio.isoformat(timespec="seconds"),
+        "duracion_s": round((datetime.now() - inicio).total_seconds(), 2),
+        "registros_totales": int(len(df)),
+        "dimensiones": [d for d in dimensiones if d in df.columns],
+        "health_scores": {
+            ds: {k: float(v) for k, v in sc.items()}
+            for ds, sc in health_scores.items()
+        },
+        "reportes": reportes,
+    }
+
+    with open(os.path.join(directorio_salida, "manifest.json"), "w",
+              encoding="utf-8") as fh:
+        json.dump(manifiesto, fh, ensure_ascii=False, indent=2)
+
+    return manifiesto
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Genera los reportes ejecutivos por bodega y categoría.")
+    parser.add_argument("--inventario", default=_DEFAULT_INVENTARIO)
+    parser.add_argument("--feedback", default=_DEFAULT_FEEDBACK)
+    parser.add_argument("--transacciones", default=_DEFAULT_TRANSACCIONES)
+    parser.add_argument("--salida", default=os.path.join(
+        "reports", f"lote_{datetime.now().strftime('%Y%m%d')}"))
+    parser.add_argument("--dimensiones", nargs="+",
+                        default=list(DIMENSIONES_SEGMENTO))
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args(argv)
+
+    df_dss, health_scores, _ = construir_dataset_dss(
+        args.inventario, args.feedback, args.transacciones)
+    manifiesto = generar_reportes_segmentados(
+        df_dss, health_scores, args.salida,
+        dimensiones=args.dimensiones, max_workers=args.workers)
+
+    errores = [r for r in manifiesto["reportes"] if r["estado"] != "ok"]
+    print(f"{len(manifiesto['reportes']) - len(errores)} reportes generados "
+          f"en {args.salida} ({manifiesto['duracion_s']} s)")
+    for r in errores:
+        print(f"  ✗ {r['dimension']}={r['segmento']}: {r['error']}",
+              file=sys.stderr)
+    return 1 if errores else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,184 @@
+# -*- coding: utf-8 -*-
+"""
+Dimensión de rutas (bodega × ciudad) y estadísticas de imputación por ruta.
+
+Cada par (``Bodega_Origen``, ``Ciudad_Destino``) recibe un código entero
+estable; las transacciones llevan el código y la imputación de los PASOS
+11–12 es una búsqueda por código, sin concatenar texto fila a fila::
+
+    codigos, dimension = codificar(df["Bodega_Origen"], df["Ciudad_Destino"])
+    sketch = sketch_ruta(codigos, df["Costo_Envio"])
+    mediana = por_codigo(medianas(sketch, len(dimension)), codigos)
+
+La dimensión y los sketches viajan con el dataset publicado (estado de
+``src.ingesta``): un lote nuevo reutiliza los códigos y agrega sus rutas
+nuevas al final. El sketch de una ruta es el conteo de sus valores
+observados; mientras una ruta tenga hasta ``DSS_RUTAS_VALORES_SKETCH``
+valores distintos es exacto, y por encima se compacta en centroides de peso
+parecido (la mediana pasa a ser aproximada).
+"""
+import numpy as np
+import pandas as pd
+
+from src import config
+
+COLUMNAS_DIMENSION = ("Bodega_Origen", "Ciudad_Destino")
+
+# Código de las filas sin bodega o sin ciudad (sin ruta)
+SIN_RUTA = -1
+
+
+# =====================================================================
+#  Dimensión
+# =====================================================================
+
+def dimension_vacia() -> pd.DataFrame:
+    return pd.DataFrame({c: pd.Series(dtype=object) for c in COLUMNAS_DIMENSION})
+
+
+def codificar(bodega: pd.Series, ciudad: pd.Series, dimension: pd.DataFrame = None) -> tuple:
+    """Código de ruta de cada fila: ``(codigos int32, dimension)``.
+
+    Las rutas que no están en *dimension* se agregan al final, así que los
+    códigos existentes no cambian. Las filas sin bodega o sin ciudad llevan
+    ``SIN_RUTA``. Solo se recorre el texto una vez por columna; el cruce
+    con la dimensión es por par distinto, no por fila.
+    """
+    if dimension is None:
+        dimension = dimension_vacia()
+    codigo_bodega, bodegas = pd.factorize(bodega)
+    codigo_ciudad, ciudades = pd.factorize(ciudad)
+    validas = (codigo_bodega >= 0) & (codigo_ciudad >= 0)
+    par = np.where(validas, codigo_bodega.astype("int64") * len(ciudades) + codigo_ciudad, -1)
+    codigo_par, pares = pd.factorize(par)
+
+    conocidas = {ruta: codigo for codigo, ruta in
+                 enumerate(zip(*(dimension[c] for c in COLUMNAS_DIMENSION)))}
+    nuevas = []
+    codigo_ruta = np.empty(len(pares), dtype=np.int32)
+    for i, clave in enumerate(pares):
+        if clave < 0:
+            codigo_ruta[i] = SIN_RUTA
+            continue
+        ruta = (bodegas[clave // len(ciudades)], ciudades[clave % len(ciudades)])
+        if ruta not in conocidas:
+            conocidas[ruta] = len(conocidas)
+            nuevas.append(ruta)
+        codigo_ruta[i] = conocidas[ruta]
+    if nuevas:
+        dimension = pd.concat(
+            [dimension, pd.DataFrame(nuevas, columns=list(COLUMNAS_DIMENSION), dtype=object)],
+            ignore_index=True,
+        )
+    return codigo_ruta[codigo_par], dimension
+
+
+def etiquetas(codigos: np.ndarray, dimension: pd.DataFrame) -> np.ndarray:
+    """``id_tiempos_entrega`` ("bodega-ciudad") de cada fila; NaN sin ruta.
+
+    El texto se arma una vez por ruta, no por fila.
+    """
+    por_ruta = (dimension["Bodega_Origen"] + "-" + dimension["Ciudad_Destino"]).to_numpy(object)
+    return por_codigo(por_ruta, codigos)
+
+
+def por_codigo(por_ruta: np.ndarray, codigos: np.ndarray) -> np.ndarray:
+    """Valor de la ruta de cada fila (NaN para ``SIN_RUTA`` y rutas sin valor)."""
+    # El último elemento es el valor de SIN_RUTA (índice -1).
+    return np.append(por_ruta, np.nan)[codigos]
+
+
+# =====================================================================
+#  Sketches (conteo de valores observados por ruta)
+# =====================================================================
+
+def sketch_ruta(codigos: np.ndarray, valores) -> pd.Series:
+    """Conteo de valores observados indexado por (codigo, valor), ordenado."""
+    observados = pd.DataFrame({"codigo": codigos, "valor": np.asarray(valores, dtype=float)})
+    observados = observados[(observados["codigo"] != SIN_RUTA) & observados["valor"].notna()]
+    return observados.value_counts().sort_index()
+
+
+def sumar(previo: pd.Series, nuevo: pd.Series, max_valores: int = None) -> pd.Series:
+    """Sketch con las observaciones de ambos, compactado a *max_valores* por ruta."""
+    if previo is None or previo.empty:
+        total = nuevo
+    else:
+        total = previo.add(nuevo, fill_value=0).astype("int64").sort_index()
+    return compactar(total, max_valores or config.RUTAS_VALORES_SKETCH)
+
+
+def compactar(sketch: pd.Series, max_valores: int) -> pd.Series:
+    """Rutas con más de *max_valores* valores distintos, en centroides de peso parecido.
+
+    Cada centroide es la media ponderada de valores consecutivos y suma sus
+    conteos; las rutas por debajo del límite no cambian.
+    """
+    codigo = sketch.index.get_level_values("codigo").to_numpy()
+    distintos = pd.Series(codigo).groupby(codigo).transform("size").to_numpy()
+    if (distintos <= max_valores).all():
+        return sketch
+
+    conteo = sketch.to_numpy()
+    valor = sketch.index.get_level_values("valor").to_numpy(dtype=float)
+    acumulado = pd.Series(conteo).groupby(codigo).cumsum().to_numpy()
+    total = pd.Series(conteo).groupby(codigo).transform("sum").to_numpy()
+    # Índice del centroide según el peso acumulado antes de cada valor
+    centroide = np.where(
+        distintos > max_valores,
+        (acumulado - conteo) * max_valores // total,
+        np.arange(len(sketch)),
+    )
+    grupos = pd.DataFrame({"codigo": codigo, "centroide": centroide,
+                           "peso": conteo * valor, "conteo": conteo})
+    compacto = grupos.groupby(["codigo", "centroide"], sort=True)[["peso", "conteo"]].sum()
+    return pd.Series(
+        compacto["conteo"].to_numpy(),
+        index=pd.MultiIndex.from_arrays(
+            [compacto.index.get_level_values("codigo"),
+             compacto["peso"].to_numpy() / compacto["conteo"].to_numpy()],
+            names=["codigo", "valor"],
+        ),
+    )
+
+
+def mediana_por_codigo(codigos: np.ndarray, valores: pd.Series, n_rutas: int) -> np.ndarray:
+    """Mediana exacta por código de ruta de un solo frame (sin sketch)."""
+    return valores.groupby(codigos).median().reindex(range(n_rutas)).to_numpy(dtype=float)
+
+
+def _observaciones(sketch: pd.Series, n_rutas: int) -> np.ndarray:
+    """Número de observaciones de cada código de ruta."""
+    codigo = sketch.index.get_level_values("codigo").to_numpy(dtype="int64")
+    return np.bincount(codigo, weights=sketch.to_numpy(), minlength=n_rutas).astype("int64")
+
+
+def _valor_en(sketch: pd.Series, n: np.ndarray, rango: np.ndarray) -> np.ndarray:
+    """Valor en la posición *rango* (0 = menor) de cada ruta; NaN sin datos."""
+    valor = sketch.index.get_level_values("valor").to_numpy(dtype=float)
+    acumulado = sketch.to_numpy().cumsum()
+    # Las rutas están contiguas y en orden de código en el sketch
+    inicio = n.cumsum() - n
+    resultado = np.full(len(n), np.nan)
+    con_datos = n > 0
+    posicion = np.searchsorted(acumulado, inicio[con_datos] + rango[con_datos], side="right")
+    resultado[con_datos] = valor[posicion]
+    return resultado
+
+
+def medianas(sketch: pd.Series, n_rutas: int) -> np.ndarray:
+    """Mediana por código de ruta (como ``groupby(ruta).median()``)."""
+    n = _observaciones(sketch, n_rutas)
+    return (_valor_en(sketch, n, (n - 1) // 2) + _valor_en(sketch, n, n // 2)) / 2
+
+
+def cuantiles(sketch: pd.Series, n_rutas: int, q: float) -> np.ndarray:
+    """Cuantil *q* por código de ruta (interpolación lineal, como ``quantile``)."""
+    n = _observaciones(sketch, n_rutas)
+    h = (n - 1) * q
+    k = np.floor(h).astype("int64")
+    a = _valor_en(sketch, n, k)
+    b = _valor_en(sketch, n, np.minimum(k + 1, n - 1))
+    t = h - k
+    # Misma interpolación que numpy (estable cerca de t = 1).
+    return np.where(t >= 0.5, b - (b - a) * (1 - t), a + (b - a) * t)
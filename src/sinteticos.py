@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+"""
+Generador determinista de datos sintéticos con los defectos de los CSV v2.
+
+Produce ``inventario_central_v2.csv``, ``feedback_clientes_v2.csv`` y
+``transacciones_logistica_v2.csv`` del tamaño que se pida (de miles a
+cientos de millones de transacciones), escribiéndolos por bloques para que
+la memoria no dependa del tamaño total. Los archivos tienen el mismo
+esquema que los de ``data/`` y reproducen los defectos que corrigen los
+limpiadores:
+
+- Inventario: categorías sucias (``smart-phone``, ``LAPTOP``, ``???``),
+  lead times en texto (``25-30 días``, ``Inmediato``, ``nan``), bodegas con
+  mayúsculas mezcladas, stock vacío o negativo, costos atípicos y filas de
+  SKU duplicadas.
+- Feedback: NPS en escalas mezcladas (-100 a 100 y 0 a 10), rating 99,
+  edades imposibles, tickets ``Sí``/``No``/``1``/``0``, ``Feedback_ID``
+  repetidos y varias respuestas por transacción.
+- Transacciones: centinela 999 en tiempo de entrega, ``Cantidad_Vendida``
+  negativa, estados de envío vacíos, costos de envío faltantes, ciudades
+  abreviadas (``BOG``, ``MED``, ``Ventas_Web``) y SKUs inexistentes en el
+  inventario.
+
+Cada bloque usa su propio generador derivado de ``(semilla, archivo,
+bloque)``: dos ejecuciones con la misma semilla y el mismo tamaño son
+idénticas byte a byte.
+
+Uso:
+    python -m src.sinteticos --transacciones 1000000 --salida data/sintetico_1m
+"""
+import argparse
+import math
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ARCHIVO_INVENTARIO = "inventario_central_v2.csv"
+ARCHIVO_FEEDBACK = "feedback_clientes_v2.csv"
+ARCHIVO_TRANSACCIONES = "transacciones_logistica_v2.csv"
+
+# Filas por bloque; forma parte de la secuencia aleatoria (cambiarlo cambia
+# los datos generados para una misma semilla).
+_FILAS_BLOQUE = 250_000
+
+# -----------------------------
+# Proporciones observadas en data/ (10k transacciones)
+# -----------------------------
+
+SKUS_POR_TRANSACCION = 0.25
+FRACCION_SKU_FANTASMA = 0.175       # transacciones con SKU fuera del inventario
+FRACCION_SKU_DUPLICADO = 0.01       # filas de inventario repetidas
+FEEDBACK_POR_TRANSACCION = 0.45
+FRACCION_FEEDBACK_ID_REPETIDO = 0.11
+
+_ID_SKU_BASE = 1000
+_ID_TRANSACCION_BASE = 10000
+_ID_FEEDBACK_BASE = 8000
+
+_CATEGORIAS = np.array(["Laptops", "Monitores", "Smartphones", "Tablets",
+                        "Accesorios", "smart-phone", "???", "LAPTOP"])
+_LEAD_TIMES = np.array(["25-30 días", "Inmediato", "10", "nan", "5", "3"])
+_BODEGAS = np.array(["norte", "Sur", "BOD-EXT-99", "ZONA_FRANCA", "Norte",
+                     "Occidente"])
+_COMENTARIOS = np.array(["Excelente", "Lento", "N/A", "Dañado", "---",
+                         "No volvería", "Precio justo"])
+_RECOMIENDA = np.array(["SI", "NO", "N/A", "Maybe"])
+_TICKETS = np.array(["Sí", "1", "0", "No"])
+_ESTADOS = np.array(["Retrasado", "Entregado", "", "Devuelto", "En Camino",
+                     "Perdido"])
+_CIUDADES = np.array(["Ventas_Web", "BOG", "Bogotá", "Cali", "Bucaramanga",
+                      "Medellín", "MED", "Barranquilla"])
+_CANALES = np.array(["Físico", "Online", "WhatsApp", "App"])
+
+_REVISION_DESDE, _REVISION_HASTA = "2024-03-04", "2026-01-31"
+_VENTA_DESDE, _VENTA_HASTA = "2024-09-23", "2026-02-04"
+
+
+# =====================================================================
+#  Utilidades
+# =====================================================================
+
+def _rng(semilla: int, archivo: int, bloque: int) -> np.random.Generator:
+    return np.random.default_rng([semilla, archivo, bloque])
+
+
+def _tabla_fechas(desde: str, hasta: str, formato: str) -> np.ndarray:
+    """Todas las fechas del rango ya formateadas (se indexan por offset)."""
+    return pd.date_range(desde, hasta, freq="D").strftime(formato).to_numpy()
+
+
+def _ids(prefijo: str, numeros: np.ndarray) -> np.ndarray:
+    return np.char.add(prefijo, numeros.astype(str))
+
+
+def _escribir(df: pd.DataFrame, ruta: str, primero: bool) -> None:
+    df.to_csv(ruta, mode="w" if primero else "a", header=primero,
+              index=False, lineterminator="\n")
+
+
+def _bloques(total: int):
+    for indice in range(math.ceil(total / _FILAS_BLOQUE)):
+        inicio = indice * _FILAS_BLOQUE
+        yield indice, inicio, min(_FILAS_BLOQUE, total - inicio)
+
+
+# =====================================================================
+#  Generadores por archivo
+# =====================================================================
+
+def _bloque_inventario(rng, inicio: int, n: int) -> pd.DataFrame:
+    stock = rng.integers(0, 2000, n).astype(float)
+    negativo = rng.random(n) < 0.025
+    stock[negativo] = -rng.integers(1, 51, negativo.sum())
+    stock[rng.random(n) < 0.04] = np.nan
+
+    costo = np.round(rng.uniform(50, 1500, n), 2)
+    atipico = rng.random(n) < 0.002
+    costo[atipico] = rng.choice([0.05, 0.5, 85_000.0, 850_000.0], atipico.sum())
+
+    revisiones = _tabla_fechas(_REVISION_DESDE, _REVISION_HASTA, "%Y-%m-%d")
+    df = pd.DataFrame({
+        "SKU_ID": _ids("PROD-", _ID_SKU_BASE + inicio + np.arange(n)),
+        "Categoria": rng.choice(_CATEGORIAS, n),
+        "Stock_Actual": stock,
+        "Costo_Unitario_USD": costo,
+        "Punto_Reorden": rng.integers(100, 300, n),
+        "Lead_Time_Dias": rng.choice(_LEAD_TIMES, n),
+        "Bodega_Origen": rng.choice(_BODEGAS, n),
+        "Ultima_Revision": revisiones[rng.integers(0, len(revisiones), n)],
+    })
+    duplicados = df[rng.random(n) < FRACCION_SKU_DUPLICADO]
+    if len(duplicados):
+        df = pd.concat([df, duplicados], ignore_index=True)
+    return df
+
+
+def _bloque_transacciones(rng, inicio: int, n: int, skus: int) -> pd.DataFrame:
+    # El rango de SKUs se extiende más allá del inventario para que una
+    # fracción de las ventas apunte a productos no catalogados.
+    rango_skus = int(round(skus / (1 - FRACCION_SKU_FANTASMA)))
+    cantidad = rng.integers(1, 15, n)
+    cantidad[rng.random(n) < 0.01] = -5
+
+    envio = np.round(rng.uniform(5, 100, n), 2)
+    envio[rng.random(n) < 0.083] = np.nan
+
+    tiempo = rng.integers(1, 30, n)
+    tiempo[rng.random(n) < 0.005] = 999
+
+    fechas = _tabla_fechas(_VENTA_DESDE, _VENTA_HASTA, "%d/%m/%Y")
+    dias = rng.integers(0, len(fechas), n)
+    if inicio == 0:
+        # pd.to_datetime infiere el formato con la primera fila: como en
+        # data/, el archivo empieza con un día > 12 (dd/mm inequívoco).
+        inequivocos = np.flatnonzero([int(f[:2]) > 12 for f in fechas])
+        dias[0] = inequivocos[dias[0] % len(inequivocos)]
+    return pd.DataFrame({
+        "Transaccion_ID": _ids("TRX-", _ID_TRANSACCION_BASE + inicio + np.arange(n)),
+        "SKU_ID": _ids("PROD-", _ID_SKU_BASE + rng.integers(0, rango_skus, n)),
+        "Fecha_Venta": fechas[dias],
+        "Cantidad_Vendida": cantidad,
+        "Precio_Venta_Final": np.round(rng.uniform(10, 2000, n), 2),
+        "Costo_Envio": envio,
+        "Tiempo_Entrega_Real": tiempo,
+        "Estado_Envio": rng.choice(_ESTADOS, n),
+        "Ciudad_Destino": rng.choice(_CIUDADES, n),
+        "Canal_Venta": rng.choice(_CANALES, n),
+    })
+
+
+def _bloque_feedback(rng, inicio_trx: int, n_trx: int,
+                     inicio_fb: int) -> pd.DataFrame:
+    n = int(round(n_trx * FEEDBACK_POR_TRANSACCION))
+    if n == 0:
+        return pd.DataFrame()
+
+    # Con reemplazo: algunas transacciones reciben varias respuestas.
+    transacciones = _ID_TRANSACCION_BASE + inicio_trx + rng.integers(0, n_trx, n)
+
+    numeros_fb = _ID_FEEDBACK_BASE + inicio_fb + np.arange(n)
+    repetidos = np.flatnonzero(rng.random(n) < FRACCION_FEEDBACK_ID_REPETIDO)
+    repetidos = repetidos[repetidos > 0]
+    numeros_fb[repetidos] = numeros_fb[rng.integers(0, repetidos)]
+
+    rating = rng.integers(1, 6, n)
+    rating[rng.random(n) < 0.007] = 99
+
+    edad = rng.integers(18, 85, n)
+    atipica = rng.random(n) < 0.005
+    edad[atipica] = rng.integers(150, 200, atipica.sum())
+
+    # NPS en dos escalas: la mayoría -100..100 con un decimal, el resto 0..10.
+    nps = np.round(rng.uniform(-100, 100, n), 1)
+    escala_10 = rng.random(n) < 0.1
+    nps[escala_10] = rng.integers(0, 11, escala_10.sum())
+
+    return pd.DataFrame({
+        "Feedback_ID": _ids("FB-", numeros_fb),
+        "Transaccion_ID": _ids("TRX-", transacciones),
+        "Rating_Producto": rating,
+        "Rating_Logistica": rng.integers(1, 6, n),
+        "Comentario_Texto": rng.choice(_COMENTARIOS, n),
+        "Recomienda_Marca": rng.choice(_RECOMIENDA, n),
+        "Ticket_Soporte_Abierto": rng.choice(_TICKETS, n),
+        "Edad_Cliente": edad,
+        "Satisfaccion_NPS": nps,
+    })
+
+
+# =====================================================================
+#  Punto de entrada
+# =====================================================================
+
+def generar_datos_sinteticos(directorio_salida: str, transacciones: int,
+                             skus: int = None, semilla: int = 42,
+                             progreso=None) -> dict:
+    """Escribe los tres CSV en *directorio_salida* y devuelve sus conteos.
+
+    ``skus`` por defecto escala con las transacciones (una cuarta parte,
+    mínimo 2.500, como en ``data/``). ``progreso`` recibe
+    ``(archivo, filas_escritas)`` después de cada bloque.
+    """
+    if transacciones <= 0:
+        raise ValueError("transacciones debe ser mayor que cero")
+    skus = skus or max(2500, int(transacciones * SKUS_POR_TRANSACCION))
+    os.makedirs(directorio_salida, exist_ok=True)
+    inicio = time.perf_counter()
+    conteos = {ARCHIVO_INVENTARIO: 0, ARCHIVO_FEEDBACK: 0,
+               ARCHIVO_TRANSACCIONES: 0}
+
+    ruta = os.path.join(directorio_salida, ARCHIVO_INVENTARIO)
+    for indice, desde, n in _bloques(skus):
+        df = _bloque_inventario(_rng(semilla, 0, indice), desde, n)
+        _escribir(df, ruta, indice == 0)
+        conteos[ARCHIVO_INVENTARIO] += len(df)
+        if progreso:
+            progreso(ARCHIVO_INVENTARIO, conteos[ARCHIVO_INVENTARIO])
+
+    ruta_trx = os.path.join(directorio_salida, ARCHIVO_TRANSACCIONES)
+    ruta_fb = os.path.join(directorio_salida, ARCHIVO_FEEDBACK)
+    for indice, desde, n in _bloques(transacciones):
+        df_trx = _bloque_transacciones(_rng(semilla, 1, indice), desde, n, skus)
+        _escribir(df_trx, ruta_trx, indice == 0)
+        conteos[ARCHIVO_TRANSACCIONES] += n
+
+        df_fb = _bloque_feedback(_rng(semilla, 2, indice), desde, n,
+                                 conteos[ARCHIVO_FEEDBACK])
+        _escribir(df_fb, ruta_fb, indice == 0)
+        conteos[ARCHIVO_FEEDBACK] += len(df_fb)
+        if progreso:
+            progreso(ARCHIVO_TRANSACCIONES, conteos[ARCHIVO_TRANSACCIONES])
+
+    return {
+        "directorio": directorio_salida,
+        "semilla": semilla,
+        "filas": conteos,
+        "duracion_s": round(time.perf_counter() - inicio, 2),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(
+        description="Genera CSV sintéticos con los defectos de los datos v2.")
+    parser.add_argument("--transacciones", type=int, required=True)
+    parser.add_argument("--skus", type=int, default=None)
+    parser.add_argument("--semilla", type=int, default=42)
+    parser.add_argument("--salida", required=True)
+    args = parser.parse_args(argv)
+
+    def _progreso(archivo, filas):
+        print(f"  {archivo}: {filas:,} filas", file=sys.stderr)
+
+    resultado = generar_datos_sinteticos(
+        args.salida, args.transacciones, skus=args.skus,
+        semilla=args.semilla, progreso=_progreso)
+    print(f"Datos sintéticos en {args.salida} ({resultado['duracion_s']} s): "
+          + ", ".join(f"{k}={v:,}" for k, v in resultado["filas"].items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,332 @@
+# -*- coding: utf-8 -*-
+"""
+Métricas del proceso (contadores e histogramas) en formato texto de Prometheus.
+
+Los módulos declaran sus métricas a nivel de módulo y las actualizan en los
+puntos calientes::
+
+    _DURACION = histograma("dss_filtros_segundos", "Aplicación de filtros")
+
+    @_DURACION.cronometrar()
+    def crear_sidebar_filtros(df_dss): ...
+
+La exposición es opcional y local al proceso (ver ``iniciar_exposicion``):
+
+- ``DSS_METRICAS_PUERTO``: servidor HTTP en ``DSS_METRICAS_HOST`` (por
+  defecto 127.0.0.1) que responde ``/metrics``.
+- ``DSS_METRICAS_ARCHIVO``: archivo reescrito cada
+  ``DSS_METRICAS_INTERVALO_S`` segundos (compatible con el *textfile
+  collector* de node_exporter). Con varios workers, ``{pid}`` en la ruta
+  da un archivo por proceso.
+
+Sin ninguna de las dos, las métricas solo se acumulan en memoria; actualizar
+una métrica cuesta un lock y una suma.
+"""
+import contextvars
+import logging
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from src import config
+
+logger = logging.getLogger(__name__)
+
+BUCKETS_SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0,
+                    10.0, 30.0, 60.0)
+
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", r"\\").replace("\n", r"\n").replace('"', r'\"')
+
+
+def _formatear_etiquetas(pares) -> str:
+    if not pares:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in pares) + "}"
+
+
+def _numero(valor: float) -> str:
+    return repr(float(valor)) if valor != int(valor) else str(int(valor))
+
+
+def percentil(valores, q: float):
+    """Percentil *q* (0–1) por rango más cercano, redondeado a 0.1; ``None`` sin datos.
+
+    Para las muestras recientes (``deque``) que los paneles de métricas
+    resumen en p50/p95.
+    """
+    if not valores:
+        return None
+    ordenados = sorted(valores)
+    idx = min(len(ordenados) - 1, int(round(q * (len(ordenados) - 1))))
+    return round(ordenados[idx], 1)
+
+
+# =====================================================================
+#  Tipos de métrica
+# =====================================================================
+
+class _Metrica:
+    tipo = None
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas=()):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.etiquetas = tuple(etiquetas)
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def _clave(self, valores: dict) -> tuple:
+        if set(valores) != set(self.etiquetas):
+            raise ValueError(
+                f"{self.nombre}: se esperaban las etiquetas {self.etiquetas}, "
+                f"se recibieron {tuple(valores)}"
+            )
+        return tuple(str(valores[e]) for e in self.etiquetas)
+
+    def exponer(self) -> list:
+        lineas = [f"# HELP {self.nombre} {_escapar(self.ayuda)}",
+                  f"# TYPE {self.nombre} {self.tipo}"]
+        with self._lock:
+            series = sorted(self._series.items())
+            series = [(clave, self._copiar(valor)) for clave, valor in series]
+        for clave, valor in series:
+            lineas.extend(self._lineas(list(zip(self.etiquetas, clave)), valor))
+        return lineas
+
+    def _copiar(self, valor):
+        return valor
+
+
+class Contador(_Metrica):
+    tipo = "counter"
+
+    def inc(self, valor: float = 1, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        with self._lock:
+            self._series[clave] = self._series.get(clave, 0) + valor
+
+    def valor(self, **etiquetas) -> float:
+        with self._lock:
+            return self._series.get(self._clave(etiquetas), 0)
+
+    def _lineas(self, pares, valor) -> list:
+        return [f"{self.nombre}{_formatear_etiquetas(pares)} {_numero(valor)}"]
+
+
+class Histograma(_Metrica):
+    tipo = "histogram"
+
+    def __init__(self, nombre: str, ayuda: str, etiquetas=(),
+                 buckets=BUCKETS_SEGUNDOS):
+        super().__init__(nombre, ayuda, etiquetas)
+        self.buckets = tuple(sorted(buckets))
+
+    def observar(self, valor: float, **etiquetas) -> None:
+        clave = self._clave(etiquetas)
+        with self._lock:
+            serie = self._series.get(clave)
+            if serie is None:
+                serie = self._series[clave] = {
+                    "conteos": [0] * len(self.buckets), "suma": 0.0, "n": 0}
+            for i, limite in enumerate(self.buckets):
+                if valor <= limite:
+                    serie["conteos"][i] += 1
+                    break
+            serie["suma"] += valor
+            serie["n"] += 1
+
+    @contextmanager
+    def cronometrar(self, **etiquetas):
+        """Observa la duración del bloque en segundos (también como decorador)."""
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observar(time.perf_counter() - inicio, **etiquetas)
+
+    def _copiar(self, serie):
+        return {"conteos": list(serie["conteos"]), "suma": serie["suma"], "n": serie["n"]}
+
+    def _lineas(self, pares, serie) -> list:
+        lineas = []
+        acumulado = 0
+        for limite, conteo in zip(self.buckets, serie["conteos"]):
+            acumulado += conteo
+            etq = _formatear_etiquetas(pares + [("le", _numero(limite))])
+            lineas.append(f"{self.nombre}_bucket{etq} {acumulado}")
+        etq = _formatear_etiquetas(pares + [("le", "+Inf")])
+        lineas.append(f"{self.nombre}_bucket{etq} {serie['n']}")
+        etq = _formatear_etiquetas(pares)
+        lineas.append(f"{self.nombre}_sum{etq} {_numero(round(serie['suma'], 6))}")
+        lineas.append(f"{self.nombre}_count{etq} {serie['n']}")
+        return lineas
+
+
+# =====================================================================
+#  Registro del proceso
+# =====================================================================
+
+class RegistroMetricas:
+    """Métricas declaradas en el proceso, por nombre."""
+
+    def __init__(self):
+        self._metricas = {}
+        self._lock = threading.Lock()
+
+    def _registrar(self, clase, nombre: str, *args, **kwargs):
+        with self._lock:
+            existente = self._metricas.get(nombre)
+            if existente is not None:
+                if not isinstance(existente, clase):
+                    raise ValueError(f"{nombre} ya está registrada como {existente.tipo}")
+                return existente
+            metrica = self._metricas[nombre] = clase(nombre, *args, **kwargs)
+            return metrica
+
+    def contador(self, nombre: str, ayuda: str, etiquetas=()) -> Contador:
+        return self._registrar(Contador, nombre, ayuda, etiquetas)
+
+    def histograma(self, nombre: str, ayuda: str, etiquetas=(),
+                   buckets=BUCKETS_SEGUNDOS) -> Histograma:
+        return self._registrar(Histograma, nombre, ayuda, etiquetas, buckets)
+
+    def exponer(self) -> str:
+        """Todas las métricas en formato de exposición de texto de Prometheus."""
+        with self._lock:
+            metricas = sorted(self._metricas.items())
+        lineas = []
+        for _, metrica in metricas:
+            lineas.extend(metrica.exponer())
+        return "\n".join(lineas) + "\n"
+
+
+REGISTRO = RegistroMetricas()
+
+
+def contador(nombre: str, ayuda: str, etiquetas=()) -> Contador:
+    return REGISTRO.contador(nombre, ayuda, etiquetas)
+
+
+def histograma(nombre: str, ayuda: str, etiquetas=(),
+               buckets=BUCKETS_SEGUNDOS) -> Histograma:
+    return REGISTRO.histograma(nombre, ayuda, etiquetas, buckets)
+
+
+# =====================================================================
+#  Aciertos de cachés de Streamlit
+# =====================================================================
+
+_CONSULTAS_CACHE = contador(
+    "dss_cache_consultas_total", "Consultas a cachés de Streamlit por resultado",
+    ("cache", "resultado"),
+)
+_fallo_cache = contextvars.ContextVar("fallo_cache", default=None)
+
+
+@contextmanager
+def observar_cache(cache: str):
+    """Cuenta la llamada a una función ``st.cache_*`` como acierto o fallo.
+
+    La función cacheada llama a ``marcar_fallo_cache()`` en su cuerpo, que
+    solo se ejecuta cuando no hay entrada en caché.
+    """
+    marca = [False]
+    token = _fallo_cache.set(marca)
+    try:
+        yield
+    finally:
+        _fallo_cache.reset(token)
+        _CONSULTAS_CACHE.inc(cache=cache, resultado="fallo" if marca[0] else "acierto")
+
+
+def marcar_fallo_cache() -> None:
+    marca = _fallo_cache.get()
+    if marca is not None:
+        marca[0] = True
+
+
+# =====================================================================
+#  Exposición (archivo y HTTP local)
+# =====================================================================
+
+def escribir_archivo(ruta: str, registro: RegistroMetricas = REGISTRO) -> None:
+    """Escribe las métricas en *ruta* de forma atómica (temporal + rename)."""
+    directorio = os.path.dirname(os.path.abspath(ruta))
+    os.makedirs(directorio, exist_ok=True)
+    fd, temporal = tempfile.mkstemp(dir=directorio, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as fh:
+            fh.write(registro.exponer())
+        os.replace(temporal, ruta)
+    except BaseException:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+        raise
+
+
+class _ManejadorMetricas(BaseHTTPRequestHandler):
+    registro = REGISTRO
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        cuerpo = self.registro.exponer().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, formato, *args):
+        logger.debug("metricas http " + formato, *args)
+
+
+def iniciar_servidor_http(puerto: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    servidor = ThreadingHTTPServer((host, puerto), _ManejadorMetricas)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, name="metricas-http",
+                     daemon=True).start()
+    return servidor
+
+
+def _escribir_periodicamente(ruta: str, intervalo_s: float) -> None:
+    while True:
+        try:
+            escribir_archivo(ruta)
+        except OSError:
+            logger.exception("No se pudieron escribir las métricas en %s", ruta)
+        time.sleep(intervalo_s)
+
+
+_exposicion_iniciada = False
+_lock_exposicion = threading.Lock()
+
+
+def iniciar_exposicion() -> None:
+    """Arranca (una sola vez por proceso) la exposición configurada."""
+    global _exposicion_iniciada
+    with _lock_exposicion:
+        if _exposicion_iniciada:
+            return
+        _exposicion_iniciada = True
+        if config.METRICAS_PUERTO:
+            try:
+                iniciar_servidor_http(config.METRICAS_PUERTO, config.METRICAS_HOST)
+                logger.info("Métricas en http://%s:%d/metrics",
+                            config.METRICAS_HOST, config.METRICAS_PUERTO)
+            except OSError:
+                # Otro worker del mismo host ya tiene el puerto.
+                logger.warning("Puerto de métricas %d ocupado", config.METRICAS_PUERTO)
+        if config.METRICAS_ARCHIVO:
+            ruta = config.METRICAS_ARCHIVO.replace("{pid}", str(os.getpid()))
+            threading.Thread(
+                target=_escribir_periodicamente,
+                args=(ruta, config.METRICAS_INTERVALO_S),
+                name="metricas-archivo", daemon=True,
+            ).start()
@@ -2,13 +2,63 @@
 import pandas as pd
 import numpy as np
 
-def procesar_transacciones(ruta_csv, df_inventario, df_feedback):
+from src import rutas
+from src.instrumentacion import iniciar_etapa
 
+# Columnas imputadas con la mediana de su ruta (bodega-ciudad)
+COLUMNAS_RUTA = ("Tiempo_Entrega_Real", "Costo_Envio")
+
+# Código de ruta (ver src.rutas) entre los PASOS 10 y 12; no llega al dataset
+COLUMNA_CODIGO_RUTA = "codigo_ruta"
+
+
+def procesar_transacciones(ruta_csv, df_inventario, df_feedback, estado_rutas=None):
+    """Pipeline de transacciones: ``(df_trans, metricas)``.
+
+    Con *estado_rutas* (un dict) deja además ahí lo que necesita la ingesta
+    incremental (``src.ingesta``): formato de fechas, dimensión de rutas y
+    sketches de los valores observados por ruta.
+    """
+    pasos = iniciar_etapa("transacciones")
+    pasos.paso("PASO 1: Lectura y nombres de columnas")
     try:
         df_raw = pd.read_csv(ruta_csv)
     except Exception as e:
+        pasos.cerrar()
         return pd.DataFrame(), {"error": str(e)}
 
+    df_trans, dimension_rutas = limpiar_transacciones(df_raw, df_inventario, df_feedback, pasos)
+    if estado_rutas is not None:
+        estado_rutas.update(
+            formato_fechas=formato_fecha(df_raw),
+            rutas=dimension_rutas,
+            sketches_ruta=sketches_ruta(df_trans),
+        )
+    df_trans = imputar_por_ruta(df_trans, dimension_rutas, pasos)
+    return completar_transacciones(df_trans, df_inventario, df_trans.Fecha_Venta.max(), pasos)
+
+
+# =====================================================================
+#  Pasos (compartidos con la ingesta incremental, ver src.ingesta)
+# =====================================================================
+
+def formato_fecha(df_raw):
+    """Formato que pandas infiere para ``Fecha_Venta`` (del primer valor no nulo)."""
+    valores = df_raw['Fecha_Venta'].dropna()
+    if valores.empty or not isinstance(valores.iloc[0], str):
+        return None
+    return pd.tseries.api.guess_datetime_format(valores.iloc[0])
+
+
+def limpiar_transacciones(df_raw, df_inventario, df_feedback, pasos, formato_fechas=None,
+                          dimension_rutas=None):
+    """PASOS 1–10: limpieza fila a fila, márgenes, bodega y ruta.
+
+    Devuelve ``(df_trans, dimension_rutas)``. *formato_fechas* fija el
+    formato de ``Fecha_Venta`` (un lote se lee con el del histórico) y
+    *dimension_rutas* los códigos de ruta ya asignados; por defecto se
+    infieren del propio archivo.
+    """
     df_trans = df_raw.copy()
 
     # 1. Limpieza de nombres de columnas
@@ -17,12 +67,14 @@ def procesar_transacciones(ruta_csv, df_inventario, df_feedback):
     # ==========================================
     # PASO 2: CONVERSIÓN DE TIPOS DE DATO
     # ==========================================
+    pasos.paso("PASO 2: Conversión de tipos", df_trans)
     # Convertir Fecha_Venta a datetime para análisis temporal
-    df_trans['Fecha_Venta'] = pd.to_datetime(df_trans['Fecha_Venta'])
+    df_trans['Fecha_Venta'] = pd.to_datetime(df_trans['Fecha_Venta'], format=formato_fechas)
 
     # ==========================================
     # PASO 3: NORMALIZACIÓN DE TEXTO
     # ==========================================
+    pasos.paso("PASO 3: Normalización de texto", df_trans)
     # Convertir todas las columnas de texto a minúsculas
     # Esto facilita comparaciones y evita inconsistencias
     cols_texto = df_trans.select_dtypes(include=['object', 'string']).columns
@@ -31,12 +83,14 @@ def procesar_transacciones(ruta_csv, df_inventario, df_feedback):
     # ==========================================
     # PASO 4: CONVERSIÓN DE CANTIDAD_VENDIDA A POSITIVO
     # ==========================================
+    pasos.paso("PASO 4: Cantidad_Vendida a positivo", df_trans)
     # Valores negativos son errores de entrada, se convierten a positivos
     df_trans.loc[:, 'Cantidad_Vendida'] = df_trans.loc[:, 'Cantidad_Vendida'].abs()
 
     # ==========================================
     # PASO 5: IMPUTACIÓN CONDICIONAL DE ESTADO_ENVIO
     # ==========================================
+    pasos.paso("PASO 5: Imputación condicional de Estado_Envio", df_trans)
     # Estrategia: Usar información de feedback para inferir estado de envío
 
     # Paso 5a: Transacciones SIN ticket de soporte -> "entregado"
@@ -60,6 +114,7 @@ def procesar_transacciones(ruta_csv, df_inventario, df_feedback):
     # ==========================================
     # PASO 6: NORMALIZACIÓN DE CIUDADES DESTINO
     # ==========================================
+    pasos.paso("PASO 6: Normalización de ciudades", df_trans)
     # Mapeo de abreviaturas a nombres completos
     dic_ciudades = {
         "bog": "bogotá", "bogota": "bogotá",
@@ -72,6 +127,7 @@ def procesar_transacciones(ruta_csv, df_inventario, df_feedback):
     # ==========================================
     # PASO 7: IMPUTACIÓN SELECTIVA DE COSTO_ENVIO
     # ==========================================
+    pasos.paso("PASO 7: Costo_Envio en canal físico", df_trans)
     # Lógica de negocio: No hay envío en transacciones de canal físico (tienda)
     df_trans.loc[
         df_trans['Canal_Venta'] == 'físico', 
@@ -81,6 +137,7 @@ def procesar_transacciones(ruta_csv, df_inventario, df_feedback):
     # ==========================================
     # PASO 8: FEATURE ENGINEERING - MÁRGENES
     # ==========================================
+    pasos.paso("PASO 8: Márgenes", df_trans)
     # Crear métricas de rentabilidad
 
     # Margen absoluto: Precio_Venta_Final - Costo_Envio
@@ -96,6 +153,7 @@ def procesar_transacciones(ruta_csv, df_inventario, df_feedback):
     # ==========================================
     # PASO 9: ENRIQUECIMIENTO - MERGE CON INVENTARIO
     # ==========================================
+    pasos.paso("PASO 9: Merge con inventario", df_trans)
     # Traer información de bodega del inventario
     # Left join: Mantener todas las transacciones, agregar bodega si existe
     df_trans = df_trans.merge(
@@ -107,40 +165,83 @@ def procesar_transacciones(ruta_csv, df_inventario, df_feedback):
     # ==========================================
     # PASO 10: CREACIÓN DE IDENTIFICADOR GRUPAL
     # ==========================================
-    # Crear ID único para cada ruta bodega-ciudad
+    pasos.paso("PASO 10: Identificador de ruta", df_trans)
+    # Código entero de cada ruta bodega-ciudad (dimensión de rutas)
     # Útil para imputación de tiempos y costos por ruta
-    df_trans['id_tiempos_entrega'] = (
-        df_trans['Bodega_Origen'] + "-" + df_trans['Ciudad_Destino']
+    codigos, dimension_rutas = rutas.codificar(
+        df_trans['Bodega_Origen'], df_trans['Ciudad_Destino'], dimension_rutas
     )
+    df_trans[COLUMNA_CODIGO_RUTA] = codigos
+    # ID legible de la ruta: el texto se arma por ruta, no por fila
+    df_trans['id_tiempos_entrega'] = rutas.etiquetas(codigos, dimension_rutas)
+    # Tiempo 999 = dato faltante codificado (no entra en las medianas)
+    df_trans.loc[df_trans['Tiempo_Entrega_Real'] == 999, 'Tiempo_Entrega_Real'] = np.nan
+    return df_trans, dimension_rutas
+
+
+def sketches_ruta(df_trans, previos=None):
+    """Columna imputada -> sketch por código de ruta (sumado a *previos*).
+
+    Usa los valores observados: se llama entre los PASOS 10 y 11.
+    """
+    codigos = df_trans[COLUMNA_CODIGO_RUTA].to_numpy()
+    previos = previos or {}
+    return {
+        columna: rutas.sumar(previos.get(columna), rutas.sketch_ruta(codigos, df_trans[columna]))
+        for columna in COLUMNAS_RUTA
+    }
+
+
+def imputar_por_ruta(df_trans, dimension_rutas, pasos, medianas=None):
+    """PASOS 11–12: nulos de tiempo y costo con la mediana de su ruta.
+
+    ``medianas`` (columna -> arreglo indexado por código de ruta) las aporta
+    la ingesta incremental desde sus sketches; por defecto se calculan
+    sobre *df_trans*.
+    """
+    codigos = df_trans.pop(COLUMNA_CODIGO_RUTA).to_numpy()
+    if medianas is None:
+        medianas = {
+            columna: rutas.mediana_por_codigo(codigos, df_trans[columna], len(dimension_rutas))
+            for columna in COLUMNAS_RUTA
+        }
 
     # ==========================================
     # PASO 11: IMPUTACIÓN GRUPAL - TIEMPO_ENTREGA_REAL
     # ==========================================
+    pasos.paso("PASO 11: Imputación de Tiempo_Entrega_Real por ruta", df_trans)
     # Llenar nulos con la mediana del grupo bodega-ciudad
     # Esto mantiene consistencia de tiempos por ruta
-
-    df_trans.loc[df_trans['Tiempo_Entrega_Real'] == 999, 'Tiempo_Entrega_Real'] = np.nan
     df_trans['Tiempo_Entrega_Real'] = df_trans['Tiempo_Entrega_Real'].fillna(
-        df_trans.groupby('id_tiempos_entrega')['Tiempo_Entrega_Real'].transform('median').fillna(0)
+        pd.Series(rutas.por_codigo(medianas['Tiempo_Entrega_Real'], codigos),
+                  index=df_trans.index).fillna(0)
     )
 
     # ==========================================
     # PASO 12: IMPUTACIÓN GRUPAL - COSTO_ENVIO
     # ==========================================
+    pasos.paso("PASO 12: Imputación de Costo_Envio por ruta", df_trans)
     # Llenar nulos con la mediana del grupo bodega-ciudad
     # Mantiene costos realistas por ruta
     df_trans['Costo_Envio'] = df_trans['Costo_Envio'].fillna(
-        df_trans.groupby('id_tiempos_entrega')['Costo_Envio'].transform('median')
+        pd.Series(rutas.por_codigo(medianas['Costo_Envio'], codigos), index=df_trans.index)
     )
+    return df_trans
+
 
+def completar_transacciones(df_trans, df_inventario, fecha_max, pasos):
+    """PASOS 13–15: fechas de entrega, estado de envío y métricas.
+
+    ``fecha_max`` es la última fecha de venta del dataset completo (en la
+    ingesta incremental, la del histórico más el lote).
+    """
 
     # ==========================================
     # PASO 13: CÁLCULO DE FECHA CALCULADA
     # ==========================================
+    pasos.paso("PASO 13: Fecha calculada de entrega", df_trans)
     # Calcular fecha esperada de entrega
     # Formula: Fecha_Venta + Tiempo_Entrega_Real (en días)
-    fecha_max = df_trans.Fecha_Venta.max()
-
     df_trans['Fecha_Calculada'] = df_trans.apply(
         lambda x: x['Fecha_Venta'] + pd.DateOffset(days=int(x['Tiempo_Entrega_Real'])), 
         axis=1
@@ -149,6 +250,7 @@ def procesar_transacciones(ruta_csv, df_inventario, df_feedback):
     # ==========================================
     # PASO 14: IMPUTACIÓN LÓGICA - ESTADO_ENVIO
     # ==========================================
+    pasos.paso("PASO 14: Imputación lógica de Estado_Envio", df_trans)
     # Paso 14a: Marcar como "entregado" (entregado)
     # Si la fecha calculada es menor a la fecha máxima del dataset
     # Significa que debería haber llegado ya
@@ -168,6 +270,7 @@ def procesar_transacciones(ruta_csv, df_inventario, df_feedback):
     # ==========================================
     # 15. ESTANDARIZACIÓN DIRECTA
     # ---------------------------------------------------------
+    pasos.paso("PASO 15: Estandarización y métricas", df_trans)
 
     if 'Tiempo_Entrega_Real' in df_trans.columns:
         df_trans = df_trans.rename(columns={'Tiempo_Entrega_Real': 'Tiempo_Entrega'})
@@ -189,5 +292,6 @@ def procesar_transacciones(ruta_csv, df_inventario, df_feedback):
         # "tiempos_outliers": tiempos_outliers,
         "skus_sin_inventario": skus_sin_inventario
     }
+    pasos.cerrar(df_trans)
   
     return df_trans, metricas
\ No newline at end of file
@@ -5,35 +5,78 @@ Módulo de chat con agente IA (Groq) para el DSS de TechLogistics.
 El usuario inserta su API key de Groq en la barra lateral y puede
 conversar con un agente que tiene contexto completo de los datos
 cargados en el dashboard.
+
+Las respuestas se transmiten token a token (``stream=True``). El cliente
+respeta la variable de entorno ``GROQ_BASE_URL``, lo que permite apuntarlo a
+un servidor local compatible con la API de OpenAI para pruebas sin red.
+
+En lugar de volcar todos los rankings en el prompt, el modelo puede pedir
+agregados bajo demanda con la herramienta ``consultar_agregado``
+(``src.asistente.consultas``), que se ejecuta localmente sobre la vista.
 """
+import logging
+import time
+import uuid
+
 import streamlit as st
 import pandas as pd
 import numpy as np
 
+from src import config
+from src.asistente.cache_respuestas import CacheRespuestas, clave_respuesta
+from src.asistente.clientes import PoolClientesLLM
+from src.asistente.cola import PlanificadorLLM
+from src.asistente.consultas import HERRAMIENTAS, MotorConsultas
+from src.asistente.contexto import ensamblar_contexto, es_error
+from src.telemetria import contador, histograma
+
+logger = logging.getLogger(__name__)
+
+_SOLICITUDES = contador("dss_chat_solicitudes_total",
+                        "Preguntas al asistente por resultado", ("modelo", "resultado"))
+_TTFT = histograma("dss_chat_ttft_segundos",
+                   "Tiempo hasta el primer token del asistente", ("modelo",))
+_DURACION = histograma("dss_chat_duracion_segundos",
+                       "Duración total de la respuesta del asistente", ("modelo",))
+_DURACION_HERRAMIENTA = histograma("dss_chat_herramienta_segundos",
+                                   "Ejecución local de herramientas del asistente",
+                                   ("herramienta",))
+
 
 # =====================================================================
 #  Helpers para construir el contexto de datos
 # =====================================================================
 
-def _resumen_dataframe(df: pd.DataFrame) -> str:
-    """Genera un resumen estadístico compacto del dataframe filtrado."""
+def _resumen_dataframe(df: pd.DataFrame, detallado: bool = True) -> str:
+    """Genera un resumen estadístico compacto del dataframe filtrado.
+
+    Trabaja sobre series y agregados del propio dataframe: no lo copia ni le
+    agrega columnas, y reutiliza los totales que se necesitan varias veces.
+    Con ``detallado=False`` omite los rankings (categorías, ciudades,
+    bodegas), que el modelo puede pedir con la herramienta de consultas.
+    """
     lines: list[str] = []
-    lines.append(f"Registros: {len(df):,}  |  Columnas: {df.shape[1]}")
+    n = len(df)
+    lines.append(f"Registros: {n:,}  |  Columnas: {df.shape[1]}")
+
+    ingreso = df["ingreso_total"] if "ingreso_total" in df.columns else None
+    ingreso_total = ingreso.sum() if ingreso is not None else 0
 
     # KPIs financieros
-    if "ingreso_total" in df.columns:
-        lines.append(f"Ingresos totales: ${df['ingreso_total'].sum():,.2f}")
+    if ingreso is not None:
+        lines.append(f"Ingresos totales: ${ingreso_total:,.2f}")
     if "margen_real" in df.columns:
-        margen = df["margen_real"].sum()
-        pct = (margen / df["ingreso_total"].sum() * 100) if df["ingreso_total"].sum() else 0
+        margen_real = df["margen_real"]
+        margen = margen_real.sum()
+        pct = (margen / ingreso_total * 100) if ingreso_total else 0
         lines.append(f"Margen neto: ${margen:,.2f} ({pct:.1f}%)")
-        perdidas = df[df["margen_real"] < 0]
-        lines.append(f"Transacciones con pérdida: {len(perdidas):,} (fuga ${abs(perdidas['margen_real'].sum()):,.2f})")
+        perdidas = margen_real[margen_real < 0]
+        lines.append(f"Transacciones con pérdida: {len(perdidas):,} (fuga ${abs(perdidas.sum()):,.2f})")
 
     # Venta invisible
     if "venta_sin_inventario" in df.columns:
         vi = df["venta_sin_inventario"].sum()
-        lines.append(f"Ventas sin inventario (venta invisible): {vi:,} ({vi / len(df) * 100:.1f}%)")
+        lines.append(f"Ventas sin inventario (venta invisible): {vi:,} ({vi / n * 100:.1f}%)")
 
     # NPS
     if "NPS_Numerico" in df.columns:
@@ -61,30 +104,30 @@ def _resumen_dataframe(df: pd.DataFrame) -> str:
         lines.append(f"Casos paradoja fidelidad: {int(df['paradoja_fidelidad'].sum()):,}")
 
     # Categorías y ciudades
-    if "Categoria" in df.columns:
-        top_cat = df.groupby("Categoria")["ingreso_total"].sum().nlargest(5)
+    if detallado and "Categoria" in df.columns:
+        top_cat = ingreso.groupby(df["Categoria"]).sum().nlargest(5)
         lines.append("Top 5 categorías por ingreso:")
         for cat, val in top_cat.items():
             lines.append(f"  - {cat}: ${val:,.0f}")
 
-    if "Ciudad_Destino" in df.columns:
-        top_city = df.groupby("Ciudad_Destino")["ingreso_total"].sum().nlargest(5)
+    if detallado and "Ciudad_Destino" in df.columns:
+        top_city = ingreso.groupby(df["Ciudad_Destino"]).sum().nlargest(5)
         lines.append("Top 5 ciudades por ingreso:")
         for city, val in top_city.items():
             lines.append(f"  - {city}: ${val:,.0f}")
 
     # Bodegas y riesgo operativo
-    if "Bodega_Origen" in df.columns and "Ultima_Revision" in df.columns:
-        df_temp = df.copy()
-        df_temp["Ultima_Revision"] = pd.to_datetime(df_temp["Ultima_Revision"], errors="coerce")
-        ref = df_temp["Ultima_Revision"].max()
+    if detallado and "Bodega_Origen" in df.columns and "Ultima_Revision" in df.columns:
+        revision = df["Ultima_Revision"]
+        if not pd.api.types.is_datetime64_any_dtype(revision):
+            revision = pd.to_datetime(revision, errors="coerce")
+        ref = revision.max()
         if pd.notna(ref):
-            df_temp["_dias"] = (ref - df_temp["Ultima_Revision"]).dt.days
-            bod = (
-                df_temp.groupby("Bodega_Origen")
-                .agg(dias=("_dias", "mean"), ing=("ingreso_total", "sum"))
-                .nlargest(5, "dias")
-            )
+            grupos = df["Bodega_Origen"]
+            bod = pd.DataFrame({
+                "dias": (ref - revision).dt.days.groupby(grupos).mean(),
+                "ing": ingreso.groupby(grupos).sum(),
+            }).nlargest(5, "dias")
             lines.append("Top 5 bodegas con mayor antigüedad de revisión:")
             for idx, r in bod.iterrows():
                 lines.append(f"  - {idx}: {r['dias']:.0f} días, ${r['ing']:,.0f}")
@@ -96,9 +139,20 @@ def _resumen_dataframe(df: pd.DataFrame) -> str:
     return "\n".join(lines)
 
 
-def _build_system_prompt(df: pd.DataFrame, health_scores: dict) -> str:
-    """Construye el system prompt con el contexto de datos."""
-    resumen = _resumen_dataframe(df)
+_INSTRUCCIONES_HERRAMIENTAS = """- Para cifras que no estén en el contexto (rankings, cortes por \
+categoría, ciudad, bodega, canal o periodo) usa la herramienta \
+consultar_agregado; no inventes números.
+"""
+
+
+def _build_system_prompt(df: pd.DataFrame, health_scores: dict,
+                         herramientas: bool = False) -> str:
+    """Construye el system prompt con el contexto de datos.
+
+    Con ``herramientas=True`` el resumen es corto y se indica al modelo que
+    pida el resto de cifras con ``consultar_agregado``.
+    """
+    resumen = _resumen_dataframe(df, detallado=not herramientas)
 
     # Health scores
     hs_lines = []
@@ -132,7 +186,192 @@ Reglas:
 - Si detectas hallazgos críticos, menciónalos proactivamente.
 - Puedes sugerir acciones de mejora basadas en los datos.
 - Usa formato markdown para tablas y listas cuando sea útil.
-"""
+""" + (_INSTRUCCIONES_HERRAMIENTAS if herramientas else "")
+
+
+
+@st.cache_data(show_spinner=False, max_entries=256)
+def _system_prompt_cacheado(version_dataset: str, hash_filtros: str,
+                            health_scores: dict, herramientas: bool,
+                            _df: pd.DataFrame) -> str:
+    """System prompt memoizado por vista (versión del dataset + filtros).
+
+    ``_df`` queda fuera de la clave de caché (prefijo ``_``): la pareja
+    versión/filtros identifica el dataframe filtrado, así que preguntas
+    consecutivas sobre la misma vista reutilizan el mismo prefijo sin volver
+    a recorrer los datos.
+    """
+    return _build_system_prompt(_df, health_scores, herramientas)
+
+
+def _clave_vista():
+    """Identificador de la vista actual (versión del dataset + filtros)."""
+    version = st.session_state.get("version_dataset")
+    hash_filtros = st.session_state.get("hash_filtros")
+    if version and hash_filtros:
+        return f"{version}:{hash_filtros}"
+    return None
+
+
+def _system_prompt_vista(df: pd.DataFrame, health_scores: dict,
+                         herramientas: bool = False) -> str:
+    """Devuelve el system prompt de la vista actual, cacheado si es posible."""
+    if _clave_vista():
+        return _system_prompt_cacheado(
+            st.session_state["version_dataset"], st.session_state["hash_filtros"],
+            health_scores, herramientas, df,
+        )
+    return _build_system_prompt(df, health_scores, herramientas)
+
+
+# =====================================================================
+#  Streaming de la respuesta
+# =====================================================================
+
+def _stream_respuesta(client, model: str, messages: list, metricas: dict,
+                      ejecutar_herramienta=None, max_rondas: int = 3,
+                      llamar=None, **kwargs):
+    """Genera los fragmentos de texto de una completion en streaming.
+
+    No depende de Streamlit. Si se pasa *ejecutar_herramienta*
+    (``nombre, argumentos_json -> contenido``), se ofrecen al modelo las
+    herramientas de consulta: las tool calls que llegan fragmentadas en el
+    stream se acumulan, se ejecutan localmente y se reenvían sus resultados
+    en una nueva ronda, hasta *max_rondas*. Al terminar deja en *metricas*
+    el tiempo hasta el primer token (``ttft_ms``), la duración total
+    (``total_ms``), los fragmentos y las herramientas ejecutadas, y los
+    registra en el logger del módulo.
+
+    *llamar* (``funcion -> resultado``) envuelve cada creación de stream; el
+    panel lo usa para aplicar los reintentos del planificador.
+    """
+    inicio = time.perf_counter()
+    llamar = llamar or (lambda funcion: funcion())
+    metricas.update({"modelo": model, "ttft_ms": None, "fragmentos": 0,
+                     "herramientas": 0, "rondas": 0})
+    messages = list(messages)
+    try:
+        for ronda in range(max_rondas + 1):
+            opciones = dict(kwargs)
+            if ejecutar_herramienta is not None and ronda < max_rondas:
+                opciones.update(tools=HERRAMIENTAS, tool_choice="auto")
+            stream = llamar(lambda: client.chat.completions.create(
+                model=model, messages=messages, stream=True, **opciones
+            ))
+            metricas["rondas"] += 1
+
+            llamadas = {}
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta
+                for tc in getattr(delta, "tool_calls", None) or []:
+                    acum = llamadas.setdefault(
+                        tc.index, {"id": "", "name": "", "arguments": ""})
+                    if tc.id:
+                        acum["id"] = tc.id
+                    if tc.function is not None:
+                        acum["name"] += tc.function.name or ""
+                        acum["arguments"] += tc.function.arguments or ""
+                texto = delta.content
+                if not texto:
+                    continue
+                if metricas["ttft_ms"] is None:
+                    metricas["ttft_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+                metricas["fragmentos"] += 1
+                yield texto
+
+            if not llamadas:
+                break
+
+            llamadas = [llamadas[i] for i in sorted(llamadas)]
+            messages.append({
+                "role": "assistant",
+                "content": "",
+                "tool_calls": [
+                    {"id": ll["id"], "type": "function",
+                     "function": {"name": ll["name"], "arguments": ll["arguments"]}}
+                    for ll in llamadas
+                ],
+            })
+            for ll in llamadas:
+                t0 = time.perf_counter()
+                contenido = ejecutar_herramienta(ll["name"], ll["arguments"])
+                segundos = time.perf_counter() - t0
+                _DURACION_HERRAMIENTA.observar(segundos, herramienta=ll["name"])
+                logger.info(
+                    "chat herramienta=%s ms=%.1f args=%s",
+                    ll["name"], segundos * 1000, ll["arguments"],
+                )
+                messages.append({"role": "tool", "tool_call_id": ll["id"],
+                                 "content": contenido})
+                metricas["herramientas"] += 1
+    finally:
+        metricas["total_ms"] = round((time.perf_counter() - inicio) * 1000, 1)
+        _DURACION.observar(metricas["total_ms"] / 1000, modelo=model)
+        if metricas["ttft_ms"] is not None:
+            _TTFT.observar(metricas["ttft_ms"] / 1000, modelo=model)
+        logger.info(
+            "chat modelo=%s ttft_ms=%s total_ms=%.1f fragmentos=%d "
+            "herramientas=%d rondas=%d",
+            model, metricas["ttft_ms"], metricas["total_ms"],
+            metricas["fragmentos"], metricas["herramientas"], metricas["rondas"],
+        )
+
+
+@st.cache_resource(show_spinner=False)
+def _pool_clientes() -> PoolClientesLLM:
+    """Pool de clientes LLM compartido por todas las sesiones del proceso."""
+    return PoolClientesLLM()
+
+
+@st.cache_resource(show_spinner=False)
+def _planificador() -> PlanificadorLLM:
+    """Cola de solicitudes al proveedor compartida por todas las sesiones."""
+    return PlanificadorLLM()
+
+
+@st.cache_resource(show_spinner=False)
+def _motor_consultas() -> MotorConsultas:
+    """Motor de consultas agregadas (con su caché) compartido por el proceso."""
+    return MotorConsultas()
+
+
+@st.cache_resource(show_spinner=False)
+def _cache_respuestas() -> CacheRespuestas:
+    """Caché de respuestas compartida por todas las sesiones del proceso."""
+    return CacheRespuestas()
+
+
+def _clave_cache(prompt: str):
+    """Clave de caché de la pregunta, o ``None`` si no es cacheable.
+
+    Solo son cacheables las preguntas que abren conversación sobre una vista
+    identificada (versión del dataset + hash de filtros).
+    """
+    if not _clave_vista():
+        return None
+    if any(not es_error(m) for m in st.session_state.chat_messages):
+        return None
+    return clave_respuesta(
+        prompt, st.session_state.groq_model,
+        st.session_state["hash_filtros"], st.session_state["version_dataset"],
+    )
+
+
+def _render_panel_admin() -> None:
+    """Métricas internas del asistente (solo con ``DSS_ADMIN=1``)."""
+    with st.sidebar.expander("🛠️ Métricas del asistente"):
+        st.caption("Caché de respuestas")
+        st.json(_cache_respuestas().estadisticas())
+        st.caption("Consultas agregadas")
+        st.json(_motor_consultas().estadisticas())
+        st.caption("Cola de solicitudes")
+        st.json(_planificador().estadisticas())
+        st.caption("Pool de clientes LLM")
+        st.json(_pool_clientes().estadisticas())
+        if st.button("Vaciar caché de respuestas"):
+            _cache_respuestas().limpiar()
 
 
 # =====================================================================
@@ -146,6 +385,8 @@ def _init_chat_state() -> None:
         st.session_state.chat_messages = []
     if "groq_model" not in st.session_state:
         st.session_state.groq_model = "llama-3.3-70b-versatile"
+    if "chat_sesion_id" not in st.session_state:
+        st.session_state.chat_sesion_id = uuid.uuid4().hex
 
 
 # =====================================================================
@@ -190,6 +431,9 @@ def render_chat_sidebar_config() -> None:
         st.session_state.chat_messages = []
         st.rerun()
 
+    if config.MODO_ADMIN:
+        _render_panel_admin()
+
 
 def render_chat_panel(df_filtrado: pd.DataFrame, health_scores: dict) -> None:
     """Renderiza el panel de chat en el contenedor donde se invoque (lado derecho)."""
@@ -216,9 +460,9 @@ def render_chat_panel(df_filtrado: pd.DataFrame, health_scores: dict) -> None:
         st.info("🔑 Ingresa tu API Key de Groq en la barra lateral para habilitar el chat.")
         return
 
-    # Intentar importar groq
+    # Verificar que groq esté disponible (el pool lo importa bajo demanda)
     try:
-        from groq import Groq
+        import groq  # noqa: F401
     except ImportError:
         st.error(
             "❌ La librería `groq` no está instalada. "
@@ -240,6 +484,7 @@ def render_chat_panel(df_filtrado: pd.DataFrame, health_scores: dict) -> None:
     )
 
     if prompt:
+        clave_cache = _clave_cache(prompt)
         st.session_state.chat_messages.append(
             {"role": "user", "content": prompt}
         )
@@ -249,38 +494,97 @@ def render_chat_panel(df_filtrado: pd.DataFrame, health_scores: dict) -> None:
                 st.markdown(prompt)
 
             with st.chat_message("assistant"):
-                with st.spinner("Pensando..."):
+                inicio = time.perf_counter()
+                cache = _cache_respuestas()
+                reply = cache.obtener(clave_cache) if clave_cache else None
+                if reply is not None:
+                    st.markdown(reply)
+                    st.session_state.chat_ultima_metrica = {
+                        "modelo": st.session_state.groq_model,
+                        "cache": True,
+                        "total_ms": round((time.perf_counter() - inicio) * 1000, 1),
+                    }
+                    logger.info("chat cache=acierto modelo=%s",
+                                st.session_state.groq_model)
+                    _SOLICITUDES.inc(modelo=st.session_state.groq_model,
+                                     resultado="cache")
+                    st.session_state.chat_messages.append(
+                        {"role": "assistant", "content": reply}
+                    )
+                else:
                     try:
-                        client = Groq(api_key=api_key)
-
-                        system_prompt = _build_system_prompt(
-                            df_filtrado, health_scores
+                        herramientas = config.CHAT_HERRAMIENTAS
+                        system_prompt = _system_prompt_vista(
+                            df_filtrado, health_scores, herramientas
                         )
-
-                        messages = [{"role": "system", "content": system_prompt}]
-                        messages.extend(
-                            st.session_state.chat_messages[-20:]
+                        ejecutar_herramienta = None
+                        if herramientas:
+                            motor = _motor_consultas()
+                            clave_vista = _clave_vista()
+
+                            def ejecutar_herramienta(nombre, argumentos):
+                                return motor.ejecutar_herramienta(
+                                    df_filtrado, nombre, argumentos, clave_vista
+                                )
+
+                        messages, info_contexto = ensamblar_contexto(
+                            system_prompt, st.session_state.chat_messages
                         )
-
-                        response = client.chat.completions.create(
-                            model=st.session_state.groq_model,
-                            messages=messages,
-                            temperature=0.3,
-                            max_tokens=2048,
+                        logger.info(
+                            "chat contexto tokens=%d/%d turnos=%d recortados=%d "
+                            "descartados=%d errores_omitidos=%d",
+                            info_contexto["tokens_prompt"],
+                            info_contexto["presupuesto"],
+                            info_contexto["turnos_enviados"],
+                            info_contexto["turnos_recortados"],
+                            info_contexto["turnos_descartados"],
+                            info_contexto["errores_omitidos"],
                         )
 
-                        reply = response.choices[0].message.content
-                        st.markdown(reply)
+                        metricas = {"contexto": info_contexto}
+                        pool = _pool_clientes()
+                        planificador = _planificador()
+                        with planificador.turno(
+                            st.session_state.chat_sesion_id
+                        ) as limite:
+                            # En préstamo: el pool no cierra el cliente a mitad de la respuesta.
+                            with pool.prestar(api_key, st.session_state.groq_model) as client:
+                                reply = st.write_stream(
+                                    _stream_respuesta(
+                                        client,
+                                        st.session_state.groq_model,
+                                        messages,
+                                        metricas,
+                                        ejecutar_herramienta=ejecutar_herramienta,
+                                        llamar=lambda funcion: planificador.con_reintentos(
+                                            funcion, limite
+                                        ),
+                                        temperature=0.3,
+                                        max_tokens=2048,
+                                    )
+                                )
+                        st.session_state.chat_ultima_metrica = metricas
+                        pool.registrar_latencia(
+                            api_key, st.session_state.groq_model,
+                            metricas.get("total_ms"), metricas.get("ttft_ms"),
+                        )
 
                         st.session_state.chat_messages.append(
                             {"role": "assistant", "content": reply}
                         )
+                        _SOLICITUDES.inc(modelo=st.session_state.groq_model,
+                                         resultado="ok")
+                        if clave_cache:
+                            cache.guardar(clave_cache, reply)
 
                     except Exception as e:
+                        _SOLICITUDES.inc(modelo=st.session_state.groq_model,
+                                         resultado="error")
                         error_msg = f"❌ Error al comunicarse con Groq: {e}"
                         st.error(error_msg)
                         st.session_state.chat_messages.append(
-                            {"role": "assistant", "content": error_msg}
+                            {"role": "assistant", "content": error_msg,
+                             "error": True}
                         )
 
 
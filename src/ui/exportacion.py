@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+import pandas as pd
+import streamlit as st
+
+from src import config, exportacion
+from src.telemetria import marcar_fallo_cache, observar_cache
+
+
+@st.cache_data(show_spinner=False, max_entries=config.EXPORTACION_CACHE_ENTRADAS)
+def _construir_archivo(clave: str, formato: str, codificacion: str, _df, _almacen, _hojas_extra):
+    marcar_fallo_cache()
+    return exportacion.construir(formato, _df, _almacen, codificacion=codificacion,
+                                 hojas_extra=_hojas_extra)
+
+
+def _hojas_extra(metricas_calidad) -> dict:
+    """Hojas del XLSX además de los datos: filtros aplicados y calidad."""
+    filtros = st.session_state.get("filtros_activos") or {}
+    hojas = {"Filtros": pd.DataFrame({
+        "Filtro": list(filtros),
+        "Valor": [", ".join(map(str, v)) if isinstance(v, (list, tuple)) else str(v)
+                  for v in filtros.values()],
+    })}
+    if metricas_calidad:
+        hojas["Calidad"] = pd.DataFrame(metricas_calidad).T.rename_axis("Modulo").reset_index()
+    return hojas
+
+
+def render_exportacion(df_filtrado, almacen=None, *, clave: str, nombre_archivo: str,
+                       contenedor=st, metricas_calidad=None,
+                       codificacion: str = "utf-8-sig") -> None:
+    """Selector de formato y botón que prepara el archivo solo cuando se pide.
+
+    El archivo se cachea por versión del dataset, estado de filtros y formato
+    (compartido entre sesiones): un rerun normal no serializa la vista.
+    """
+    formatos = exportacion.formatos_disponibles()
+    formato = contenedor.selectbox(
+        "Formato",
+        formatos,
+        format_func=lambda f: exportacion.FORMATOS[f]["etiqueta"],
+        key=f"{clave}_formato",
+    )
+    vista = f"{st.session_state.get('version_dataset')}:{st.session_state.get('hash_filtros')}"
+    estado = f"{clave}_archivo"
+
+    if contenedor.button("🛠️ Preparar archivo", key=f"{clave}_preparar"):
+        with st.spinner("🔄 Preparando exportación..."):
+            with observar_cache("exportacion"):
+                datos = _construir_archivo(vista, formato, codificacion, df_filtrado,
+                                           almacen, _hojas_extra(metricas_calidad))
+        st.session_state[estado] = (vista, formato, datos)
+
+    preparado = st.session_state.get(estado)
+    if preparado is None:
+        return
+    if preparado[:2] != (vista, formato):
+        # Cambió la vista o el formato: el archivo ya no corresponde.
+        del st.session_state[estado]
+        return
+    descripcion = exportacion.FORMATOS[formato]
+    contenedor.download_button(
+        label=f"⬇️ Descargar {descripcion['etiqueta']}",
+        data=preparado[2],
+        file_name=f"{nombre_archivo}.{descripcion['extension']}",
+        mime=descripcion["mime"],
+        key=f"{clave}_descargar",
+    )
@@ -3,7 +3,12 @@ from datetime import datetime
 import streamlit as st
 
 
-def render_header(df_filtrado, health_scores) -> None:
+def render_header(df_filtrado, health_scores, columnas_modelo=None) -> None:
+    # El frame analítico no trae todas las columnas de la tabla maestra
+    # (``src.columnas``); app.py pasa el total del modelo.
+    if columnas_modelo is None:
+        columnas_modelo = df_filtrado.shape[1]
+
     st.title("📊 TechLogistics S.A.S")
     st.markdown("### Sistema de Soporte a Decisiones (DSS) – Auditoría de Consultoría")
 
@@ -11,7 +16,7 @@ def render_header(df_filtrado, health_scores) -> None:
     with col_a:
         st.metric("Transacciones Analizadas", f"{len(df_filtrado):,}")
     with col_b:
-        st.metric("Columnas del Modelo", f"{df_filtrado.shape[1]:,}")
+        st.metric("Columnas del Modelo", f"{columnas_modelo:,}")
     with col_c:
         fecha_act = datetime.now().strftime("%d/%m/%Y %H:%M")
         st.metric("Última Actualización", fecha_act)
@@ -0,0 +1,283 @@
+# -*- coding: utf-8 -*-
+"""
+Perfilador de renders por rerun de Streamlit.
+
+Modo opcional (``DSS_PERFIL_RENDER=1`` o el interruptor de la barra lateral
+en modo administrador) que mide cada función de render de ``app.py`` y de
+las pestañas::
+
+    iniciar_rerun()
+    with medir("render_header"):
+        render_header(df_filtrado, health_scores)
+    ...
+    finalizar_rerun()
+
+Por rerun se guardan los milisegundos de cada función. Con el muestreo
+activado (``DSS_PERFIL_MUESTREO=1``) un hilo toma cada pocos milisegundos la
+pila del hilo del script y la acumula bajo la función de render en curso; el
+historial se exporta en formato de pilas colapsadas (``a;b;c N``), que leen
+``flamegraph.pl``, speedscope o Perfetto.
+
+El historial es del proceso (``st.cache_resource``): incluye los reruns de
+todas las sesiones, con un tope de ``DSS_PERFIL_HISTORIAL`` entradas.
+"""
+import contextvars
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from datetime import datetime
+
+import pandas as pd
+import streamlit as st
+
+from src import config
+from src.telemetria import histograma
+
+_rerun_activo = contextvars.ContextVar("perfil_rerun", default=None)
+
+_DURACION_RENDER = histograma(
+    "dss_render_segundos", "Duración de las funciones de render por rerun", ("funcion",)
+)
+
+
+# =====================================================================
+#  Muestreo de pilas
+# =====================================================================
+
+def _etiqueta(codigo) -> str:
+    return f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})"
+
+
+class _Muestreador(threading.Thread):
+    """Toma la pila del hilo del script a intervalos regulares."""
+
+    def __init__(self, rerun: "RerunPerfilado", intervalo_s: float):
+        super().__init__(name="perfil-muestreo", daemon=True)
+        self._rerun = rerun
+        self._hilo = threading.get_ident()
+        self._intervalo = intervalo_s
+        self._detener = threading.Event()
+
+    def run(self) -> None:
+        while not self._detener.wait(self._intervalo):
+            pila_render = list(self._rerun.pila)
+            if not pila_render:
+                continue
+            frame = sys._current_frames().get(self._hilo)
+            # Se recorre desde la hoja hasta el frame que abrió el ``medir``
+            # más interno; lo de arriba (runtime de Streamlit) es ruido.
+            tope = pila_render[-1][1]
+            marcos = []
+            while frame is not None and frame is not tope:
+                marcos.append(_etiqueta(frame.f_code))
+                frame = frame.f_back
+            if frame is None:
+                # El ``medir`` terminó entre la copia de la pila y la muestra.
+                continue
+            nombres = [nombre for nombre, _ in pila_render]
+            self._rerun.muestras[";".join(nombres + marcos[::-1])] += 1
+
+    def detener(self) -> None:
+        self._detener.set()
+        self.join()
+
+
+# =====================================================================
+#  Registro de un rerun e historial del proceso
+# =====================================================================
+
+class RerunPerfilado:
+    """Tiempos (y muestras de pila) de un rerun del script."""
+
+    def __init__(self, sesion: str, muestreo: bool, intervalo_s: float):
+        self.sesion = sesion
+        self.fecha = datetime.now().isoformat(timespec="seconds")
+        self.inicio = time.perf_counter()
+        self.tiempos = []
+        self.pila = []
+        self.muestras = Counter()
+        self._muestreador = _Muestreador(self, intervalo_s) if muestreo else None
+        if self._muestreador is not None:
+            self._muestreador.start()
+
+    def cerrar(self) -> dict:
+        if self._muestreador is not None:
+            self._muestreador.detener()
+        return {
+            "sesion": self.sesion,
+            "fecha": self.fecha,
+            "total_ms": round((time.perf_counter() - self.inicio) * 1000, 1),
+            "funciones": self.tiempos,
+            "muestras": dict(self.muestras),
+        }
+
+
+class HistorialPerfiles:
+    """Últimos reruns perfilados del proceso (thread-safe)."""
+
+    def __init__(self, max_reruns: int = None):
+        self._reruns = deque(maxlen=max_reruns or config.PERFIL_HISTORIAL)
+        self._lock = threading.Lock()
+
+    def agregar(self, rerun: dict) -> None:
+        with self._lock:
+            self._reruns.append(rerun)
+
+    def reruns(self) -> list:
+        with self._lock:
+            return list(self._reruns)
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._reruns.clear()
+
+    def resumen_funciones(self) -> pd.DataFrame:
+        """Estadísticos por función de render sobre todo el historial."""
+        filas = [f for r in self.reruns() for f in r["funciones"]]
+        if not filas:
+            return pd.DataFrame(columns=["funcion", "llamadas", "media_ms", "p95_ms", "max_ms"])
+        df = pd.DataFrame(filas)
+        resumen = df.groupby("funcion")["ms"].agg(
+            llamadas="count", media_ms="mean",
+            p95_ms=lambda s: s.quantile(0.95), max_ms="max",
+        ).round(1)
+        return resumen.sort_values("media_ms", ascending=False).reset_index()
+
+    def a_pilas_colapsadas(self) -> str:
+        """Pilas agregadas en formato colapsado (una línea ``pila N``).
+
+        Sin muestreo se usa una pila por función de render con sus
+        milisegundos como peso, que también se puede dibujar como flame graph.
+        """
+        total = Counter()
+        for r in self.reruns():
+            if r["muestras"]:
+                total.update(r["muestras"])
+            else:
+                for f in r["funciones"]:
+                    total[f["pila"]] += max(1, round(f["ms"]))
+        return "".join(f"{pila} {n}\n" for pila, n in total.most_common())
+
+    def a_json(self) -> str:
+        return json.dumps(self.reruns(), ensure_ascii=False, indent=2)
+
+
+@st.cache_resource(show_spinner=False)
+def historial_perfiles() -> HistorialPerfiles:
+    """Historial de reruns perfilados compartido por todas las sesiones."""
+    return HistorialPerfiles()
+
+
+# =====================================================================
+#  API usada desde app.py y las pestañas
+# =====================================================================
+
+def perfil_activo() -> bool:
+    return st.session_state.get("perfil_render_activo", config.PERFIL_RENDER)
+
+
+def iniciar_rerun() -> None:
+    """Abre el registro del rerun actual si el perfilador está activo.
+
+    Si quedó abierto el de un rerun anterior (interrumpido sin pasar por
+    ``finalizar_rerun``), se cierra primero: detiene su muestreador y lo
+    deja en el historial.
+    """
+    finalizar_rerun()
+    if "perfil_sesion_id" not in st.session_state:
+        st.session_state.perfil_sesion_id = uuid.uuid4().hex[:8]
+    rerun = None
+    if perfil_activo():
+        rerun = RerunPerfilado(
+            st.session_state.perfil_sesion_id,
+            st.session_state.get("perfil_muestreo", config.PERFIL_MUESTREO),
+            config.PERFIL_INTERVALO_MS / 1000,
+        )
+    _rerun_activo.set(rerun)
+
+
+def finalizar_rerun() -> None:
+    """Cierra el rerun actual y lo agrega al historial del proceso.
+
+    ``app.py`` la llama en un ``finally``: también cierra los reruns que
+    terminan con ``st.stop()`` o que Streamlit interrumpe.
+    """
+    rerun = _rerun_activo.get()
+    if rerun is None:
+        return
+    _rerun_activo.set(None)
+    historial_perfiles().agregar(rerun.cerrar())
+
+
+@contextmanager
+def medir(nombre: str):
+    """Mide el bloque como la función de render *nombre*.
+
+    La duración siempre se observa en ``dss_render_segundos``; el detalle
+    por rerun solo se guarda con el perfilador activo.
+    """
+    rerun = _rerun_activo.get()
+    if rerun is None:
+        with _DURACION_RENDER.cronometrar(funcion=nombre):
+            yield
+        return
+    # Frame que contiene el ``with``: el muestreador corta las pilas ahí.
+    rerun.pila.append((nombre, sys._getframe(2)))
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        ms = (time.perf_counter() - inicio) * 1000
+        _DURACION_RENDER.observar(ms / 1000, funcion=nombre)
+        pila = ";".join(n for n, _ in rerun.pila)
+        rerun.pila.pop()
+        rerun.tiempos.append({"funcion": nombre, "pila": pila, "ms": round(ms, 2)})
+
+
+# =====================================================================
+#  Panel de la barra lateral
+# =====================================================================
+
+def render_perfilador_sidebar() -> None:
+    """Interruptor y resultados del perfilador (modo admin o ``DSS_PERFIL_RENDER``)."""
+    if not (config.MODO_ADMIN or config.PERFIL_RENDER):
+        return
+
+    with st.sidebar.expander("⏱️ Perfilador de renders"):
+        st.checkbox("Perfilar cada rerun", value=config.PERFIL_RENDER,
+                    key="perfil_render_activo")
+        st.checkbox("Muestrear pilas", value=config.PERFIL_MUESTREO,
+                    key="perfil_muestreo",
+                    help="Necesario para ver funciones internas en el flame graph")
+
+        historial = historial_perfiles()
+        reruns = historial.reruns()
+        if not reruns:
+            st.caption("Sin reruns perfilados todavía.")
+            return
+
+        ultimo = reruns[-1]
+        st.caption(f"Último rerun: {ultimo['total_ms']:,.0f} ms · {len(reruns)} en historial")
+        st.dataframe(historial.resumen_funciones(), use_container_width=True,
+                     hide_index=True)
+
+        marca = datetime.now().strftime("%Y%m%d_%H%M%S")
+        st.download_button(
+            "🔥 Pilas colapsadas (flame graph)",
+            data=historial.a_pilas_colapsadas(),
+            file_name=f"perfil_renders_{marca}.folded",
+            mime="text/plain",
+        )
+        st.download_button(
+            "📥 Historial (JSON)",
+            data=historial.a_json(),
+            file_name=f"perfil_renders_{marca}.json",
+            mime="application/json",
+        )
+        if st.button("Vaciar historial"):
+            historial.limpiar()
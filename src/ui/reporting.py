@@ -4,8 +4,6 @@ from datetime import datetime
 
 import streamlit as st
 
-from src.reportes import generar_reporte_ejecutivo_pdf
-
 
 def _init_report_state() -> None:
     if "pdf_reporte" not in st.session_state:
@@ -21,6 +19,10 @@ def render_report_section(df_filtrado, health_scores, metricas_calidad) -> None:
     if st.sidebar.button("🛠️ Preparar Reporte"):
         try:
             with st.spinner("🔄 Generando reporte ejecutivo..."):
+                # Import diferido: ReportLab y matplotlib solo se cargan
+                # cuando alguien prepara un reporte, no en cada arranque.
+                from src.reportes import generar_reporte_ejecutivo_pdf
+
                 st.session_state.pdf_reporte = generar_reporte_ejecutivo_pdf(
                     df_filtrado=df_filtrado,
                     health_scores=health_scores,
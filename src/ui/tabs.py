@@ -8,9 +8,11 @@ from src.paginas.venta_invisible import mostrar_venta_invisible
 from src.paginas.diagnostico_fidelidad import mostrar_diagnostico_fidelidad
 from src.paginas.riesgo_operativo import mostrar_riesgo_operativo
 from src.paginas.salud_dato import mostrar_salud_datos
+from src.ui.perfilador import medir
 
 
-def render_tabs(df_filtrado, health_scores, metricas_calidad) -> None:
+def render_tabs(df_filtrado, health_scores, metricas_calidad, traza=None,
+                almacen=None) -> None:
     tabs = st.tabs([
         "📈 Resumen Ejecutivo",
         "💰 Fuga de Capital",
@@ -22,22 +24,30 @@ def render_tabs(df_filtrado, health_scores, metricas_calidad) -> None:
     ])
 
     with tabs[0]:
-        mostrar_resumen_ejecutivo(df_filtrado, health_scores, metricas_calidad)
+        with medir("mostrar_resumen_ejecutivo"):
+            mostrar_resumen_ejecutivo(df_filtrado, health_scores, metricas_calidad,
+                                      almacen=almacen)
 
     with tabs[1]:
-        mostrar_fuga_capital(df_filtrado)
+        with medir("mostrar_fuga_capital"):
+            mostrar_fuga_capital(df_filtrado)
 
     with tabs[2]:
-        mostrar_crisis_logistica(df_filtrado)
+        with medir("mostrar_crisis_logistica"):
+            mostrar_crisis_logistica(df_filtrado)
 
     with tabs[3]:
-        mostrar_venta_invisible(df_filtrado, renderizar=True)
+        with medir("mostrar_venta_invisible"):
+            mostrar_venta_invisible(df_filtrado, renderizar=True)
 
     with tabs[4]:
-        mostrar_diagnostico_fidelidad(df_filtrado)
+        with medir("mostrar_diagnostico_fidelidad"):
+            mostrar_diagnostico_fidelidad(df_filtrado)
 
     with tabs[5]:
-        mostrar_riesgo_operativo(df_filtrado, renderizar=True)
+        with medir("mostrar_riesgo_operativo"):
+            mostrar_riesgo_operativo(df_filtrado, renderizar=True)
 
     with tabs[6]:
-        mostrar_salud_datos(df_filtrado, metricas_calidad)
+        with medir("mostrar_salud_datos"):
+            mostrar_salud_datos(df_filtrado, metricas_calidad, traza=traza)
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+"""
+Configuración común de pytest.
+
+La raíz del repo va en ``sys.path`` (``from src import ...``) y el servidor
+LLM simulado de ``scripts/`` queda disponible como fixture.
+"""
+import os
+import sys
+
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path:
+    sys.path.insert(0, RAIZ)
+
+
+def _modulo_servidor():
+    import importlib.util
+
+    ruta = os.path.join(RAIZ, "scripts", "servidor_llm_simulado.py")
+    spec = importlib.util.spec_from_file_location("servidor_llm_simulado", ruta)
+    modulo = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+@pytest.fixture
+def servidor_llm():
+    """Arranca ``scripts/servidor_llm_simulado.py`` (puerto libre); devuelve ``iniciar``.
+
+    ``iniciar(**opciones)`` devuelve ``(servidor, url_base)``; los servidores
+    se detienen al terminar la prueba.
+    """
+    modulo = _modulo_servidor()
+    servidores = []
+
+    def iniciar(**opciones):
+        servidor = modulo.iniciar(0, **opciones)
+        servidores.append(servidor)
+        return servidor, f"http://127.0.0.1:{servidor.server_port}"
+
+    yield iniciar
+    for servidor in servidores:
+        servidor.shutdown()
+        servidor.server_close()
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""Respuestas del chat en streaming contra el servidor simulado."""
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("groq")
+
+from src.asistente.clientes import PoolClientesLLM
+from src.ui.chat import _stream_respuesta
+
+FRAGMENTOS = ["Respuesta ", "simulada ", "del ", "asistente."]
+LATENCIA_S = 0.05
+
+
+@pytest.fixture
+def pool(servidor_llm, monkeypatch):
+    _, url_base = servidor_llm(latencia_s=LATENCIA_S)
+    monkeypatch.setenv("GROQ_BASE_URL", url_base)
+    pool = PoolClientesLLM()
+    yield pool
+    pool.cerrar()
+
+
+def test_fragmentos_llegan_en_orden_y_de_a_uno(pool):
+    metricas = {}
+    recibidos = []
+    with pool.prestar("clave", "simulado") as cliente:
+        for texto in _stream_respuesta(cliente, "simulado",
+                                       [{"role": "user", "content": "hola"}], metricas):
+            recibidos.append((texto, time.perf_counter()))
+
+    assert [t for t, _ in recibidos] == FRAGMENTOS
+    assert metricas["fragmentos"] == len(FRAGMENTOS)
+    assert metricas["rondas"] == 1
+    # Cada fragmento se entrega al llegar, no al final de la respuesta.
+    instantes = [t for _, t in recibidos]
+    assert all(b - a >= LATENCIA_S / 2 for a, b in zip(instantes, instantes[1:]))
+    assert metricas["ttft_ms"] < metricas["total_ms"] - 2 * LATENCIA_S * 1000
+
+
+def test_respuestas_concurrentes_no_se_mezclan(pool):
+    textos = {}
+
+    def conversar(i):
+        with pool.prestar("clave", "simulado") as cliente:
+            textos[i] = list(_stream_respuesta(
+                cliente, "simulado", [{"role": "user", "content": str(i)}], {}))
+
+    hilos = [threading.Thread(target=conversar, args=(i,)) for i in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert textos == {i: FRAGMENTOS for i in range(4)}
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""Pool de clientes LLM contra el servidor simulado (``scripts/servidor_llm_simulado.py``)."""
+import pytest
+
+pytest.importorskip("groq")
+
+from src.asistente.clientes import PoolClientesLLM, _huella_key
+from src.telemetria import percentil
+
+
+@pytest.fixture
+def url(servidor_llm, monkeypatch):
+    _, url_base = servidor_llm(latencia_s=0.01)
+    monkeypatch.setenv("GROQ_BASE_URL", url_base)
+    return url_base
+
+
+def _completar(cliente) -> str:
+    respuesta = cliente.chat.completions.create(
+        model="simulado", messages=[{"role": "user", "content": "hola"}])
+    return respuesta.choices[0].message.content
+
+
+def _http(pool, api_key, modelo="simulado"):
+    """``httpx.Client`` del cliente de (api_key, modelo) en el pool."""
+    return pool._clientes[(_huella_key(api_key), modelo)].http_client
+
+
+def test_reutiliza_cliente_y_conexiones(url):
+    pool = PoolClientesLLM(max_clientes=2)
+    for _ in range(3):
+        with pool.prestar("clave", "simulado") as cliente:
+            assert _completar(cliente) == "Respuesta simulada del asistente."
+        pool.registrar_latencia("clave", "simulado", 12.0, 3.0)
+
+    stats = pool.estadisticas()
+    assert stats["creados"] == 1
+    (resumen,) = stats["clientes"].values()
+    assert resumen["solicitudes"] == 3
+    assert resumen["conexiones_nuevas"] == 1
+    assert resumen["conexiones_reutilizadas"] == 2
+    assert resumen["latencia_p50_ms"] == 12.0
+    pool.cerrar()
+
+
+def test_expulsion_con_prestamo_en_curso_difiere_el_cierre(url):
+    pool = PoolClientesLLM(max_clientes=1)
+    with pool.prestar("clave-a", "simulado") as cliente_a:
+        http_a = _http(pool, "clave-a")
+        stream = cliente_a.chat.completions.create(
+            model="simulado", messages=[{"role": "user", "content": "hola"}],
+            stream=True)
+        primero = next(iter(stream))
+
+        # Otra key llena el pool: "clave-a" sale, pero su préstamo sigue vivo.
+        with pool.prestar("clave-b", "simulado") as cliente_b:
+            assert _completar(cliente_b)
+        assert pool.expulsados == 1
+        assert not http_a.is_closed
+
+        resto = [c.choices[0].delta.content for c in stream]
+        texto = primero.choices[0].delta.content + "".join(t for t in resto if t)
+        assert texto == "Respuesta simulada del asistente."
+        assert _completar(cliente_a)
+    # Al devolver el último préstamo se cierra.
+    assert http_a.is_closed
+    pool.cerrar()
+
+
+def test_cerrar_sin_prestamos_cierra_de_inmediato(url):
+    pool = PoolClientesLLM(max_clientes=2)
+    with pool.prestar("clave", "simulado") as cliente:
+        _completar(cliente)
+    http = _http(pool, "clave")
+    pool.cerrar()
+    assert http.is_closed
+    assert pool.estadisticas()["activos"] == 0
+
+
+def test_expulsion_por_inactividad_no_cierra_prestamo(url):
+    reloj = [0.0]
+    pool = PoolClientesLLM(max_clientes=4, inactividad_s=10, reloj=lambda: reloj[0])
+    with pool.prestar("clave-a", "simulado") as cliente_a:
+        http_a = _http(pool, "clave-a")
+        reloj[0] = 60.0
+        with pool.prestar("clave-b", "simulado"):
+            pass
+        assert pool.expulsados == 1
+        assert not http_a.is_closed
+        assert _completar(cliente_a)
+    assert http_a.is_closed
+    pool.cerrar()
+
+
+def test_percentil():
+    assert percentil([], 0.5) is None
+    assert percentil([3.0, 1.0, 2.0], 0.5) == 2.0
+    assert percentil(range(1, 101), 0.95) == 95
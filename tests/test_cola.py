@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""Planificador de solicitudes LLM (``src.asistente.cola``) contra el servidor simulado."""
+import threading
+import time
+
+import pytest
+
+pytest.importorskip("groq")
+
+from src.asistente.clientes import PoolClientesLLM
+from src.asistente.cola import PlanificadorLLM, PlazoAgotado
+
+
+@pytest.fixture
+def iniciar_pool(servidor_llm, monkeypatch):
+    pools = []
+
+    def iniciar(**opciones):
+        _, url_base = servidor_llm(**opciones)
+        monkeypatch.setenv("GROQ_BASE_URL", url_base)
+        pool = PoolClientesLLM()
+        pools.append(pool)
+        return pool
+
+    yield iniciar
+    for pool in pools:
+        pool.cerrar()
+
+
+def _completar(cliente):
+    return cliente.chat.completions.create(
+        model="simulado", messages=[{"role": "user", "content": "hola"}])
+
+
+def test_reintento_respeta_retry_after(iniciar_pool):
+    # Una de cada dos solicitudes recibe 429 con Retry-After: 0.25
+    pool = iniciar_pool(limitar_cada=2, retry_after=0.25, latencia_s=0)
+    esperas = []
+    planificador = PlanificadorLLM(backoff_base_s=5, backoff_max_s=5, plazo_s=30,
+                                   dormir=esperas.append)
+    with pool.prestar("clave", "simulado") as cliente:
+        _completar(cliente)
+        with planificador.turno("s") as limite:
+            respuesta = planificador.con_reintentos(lambda: _completar(cliente), limite)
+
+    assert respuesta.choices[0].message.content
+    assert esperas == [0.25]
+    assert planificador.estadisticas()["reintentos_429"] == 1
+
+
+def test_retry_after_mas_alla_del_plazo(iniciar_pool):
+    pool = iniciar_pool(limitar_cada=1, retry_after=60, latencia_s=0)
+    esperas = []
+    planificador = PlanificadorLLM(plazo_s=1, dormir=esperas.append)
+    with pool.prestar("clave", "simulado") as cliente:
+        with pytest.raises(PlazoAgotado):
+            with planificador.turno("s") as limite:
+                planificador.con_reintentos(lambda: _completar(cliente), limite)
+    assert esperas == []
+    assert planificador.estadisticas()["plazos_agotados"] == 1
+
+
+def _esperar(condicion, plazo_s=5.0):
+    fin = time.monotonic() + plazo_s
+    while not condicion():
+        assert time.monotonic() < fin, "tiempo agotado esperando la cola"
+        time.sleep(0.005)
+
+
+def test_turnos_round_robin_entre_sesiones(iniciar_pool):
+    pool = iniciar_pool(latencia_s=0)
+    planificador = PlanificadorLLM(max_concurrencia=1, plazo_s=30)
+    orden = []
+    liberar = threading.Event()
+
+    def ocupar():
+        with planificador.turno("ocupada"):
+            liberar.wait()
+
+    def solicitar(sesion):
+        with planificador.turno(sesion) as limite:
+            orden.append(sesion)
+            with pool.prestar("clave", "simulado") as cliente:
+                planificador.con_reintentos(lambda: _completar(cliente), limite)
+
+    hilos = [threading.Thread(target=ocupar)]
+    hilos[0].start()
+    _esperar(lambda: planificador.estadisticas()["activos"] == 1)
+    # La sesión "a" encola tres preguntas seguidas antes que "b" y "c".
+    for i, sesion in enumerate(["a", "a", "a", "b", "c"], start=1):
+        hilo = threading.Thread(target=solicitar, args=(sesion,))
+        hilo.start()
+        hilos.append(hilo)
+        _esperar(lambda: planificador.estadisticas()["en_cola"] == i)
+
+    liberar.set()
+    for hilo in hilos:
+        hilo.join(10)
+
+    assert orden == ["a", "b", "c", "a", "a"]
+    stats = planificador.estadisticas()
+    assert stats["completadas"] == 6
+    assert stats["profundidad_max"] == 5
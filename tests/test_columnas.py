@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""Proyección del frame analítico y contrato de solo lectura."""
+import warnings
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.columnas import DERIVADAS, congelar, proyectar
+
+
+@pytest.fixture
+def df_dss():
+    return pd.DataFrame({
+        "Transaccion_ID": ["T1", "T2", "T3"],
+        "Categoria": ["A", "B", "A"],
+        "Ciudad_Destino": [" Cali ", "Canal Digital", "Bogotá"],
+        "Fecha_Venta": ["2024-01-01", "2024-02-01", "bad"],
+        "ingreso_total": [10.0, 20.0, 30.0],
+        "Bodega_Origen_x": ["N", "S", "N"],
+        "margen %": [0.1, 0.2, 0.3],
+    })
+
+
+def test_proyectar_sin_setting_with_copy(df_dss):
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        df, almacen = proyectar(df_dss)
+
+    assert set(DERIVADAS) <= set(df.columns)
+    assert "Bodega_Origen" in df.columns
+    assert almacen.columnas == ["margen %"]
+    assert pd.api.types.is_datetime64_any_dtype(df["Fecha_Venta"])
+    assert df["canal_digital"].tolist() == [False, True, False]
+    # El dataset original no cambia
+    assert df_dss["Fecha_Venta"].dtype == object
+    assert "ciudad_normalizada" not in df_dss.columns
+
+
+# =====================================================================
+#  Páginas sobre el frame congelado
+# =====================================================================
+
+@pytest.fixture(scope="module")
+def dataset(tmp_path_factory):
+    from src.data_loader import construir_dataset_dss
+    from src.sinteticos import (
+        ARCHIVO_FEEDBACK, ARCHIVO_INVENTARIO, ARCHIVO_TRANSACCIONES,
+        generar_datos_sinteticos,
+    )
+
+    directorio = tmp_path_factory.mktemp("sinteticos")
+    generar_datos_sinteticos(str(directorio), 3000, semilla=7)
+    rutas = [str(directorio / a) for a in
+             (ARCHIVO_INVENTARIO, ARCHIVO_FEEDBACK, ARCHIVO_TRANSACCIONES)]
+    df_dss, health_scores, metricas_calidad = construir_dataset_dss(*rutas)[:3]
+    df, almacen = proyectar(df_dss)
+    return df, almacen, health_scores, metricas_calidad
+
+
+def _paginas(almacen, health_scores, metricas_calidad):
+    from src.paginas.crisis_logistica import mostrar_crisis_logistica
+    from src.paginas.diagnostico_fidelidad import mostrar_diagnostico_fidelidad
+    from src.paginas.fuga_capital import mostrar_fuga_capital
+    from src.paginas.resumen_ejecutivo import mostrar_resumen_ejecutivo
+    from src.paginas.riesgo_operativo import mostrar_riesgo_operativo
+    from src.paginas.salud_dato import mostrar_salud_datos
+    from src.paginas.venta_invisible import mostrar_venta_invisible
+
+    return {
+        "resumen_ejecutivo": lambda df: mostrar_resumen_ejecutivo(
+            df, health_scores, metricas_calidad, almacen=almacen),
+        "fuga_capital": mostrar_fuga_capital,
+        "crisis_logistica": mostrar_crisis_logistica,
+        "venta_invisible": mostrar_venta_invisible,
+        "diagnostico_fidelidad": mostrar_diagnostico_fidelidad,
+        "riesgo_operativo": mostrar_riesgo_operativo,
+        "salud_datos": lambda df: mostrar_salud_datos(df, metricas_calidad),
+    }
+
+
+@pytest.mark.parametrize("filtrado", [False, True], ids=["sin_filtros", "filtrado"])
+def test_paginas_no_modifican_el_frame_congelado(dataset, filtrado):
+    df, almacen, health_scores, metricas_calidad = dataset
+    vista = congelar(df[df["Categoria"] == df["Categoria"].iloc[0]] if filtrado else df)
+    antes = vista.copy(deep=True)
+
+    for nombre, mostrar in _paginas(almacen, health_scores, metricas_calidad).items():
+        mostrar(vista)
+        pd.testing.assert_frame_equal(vista, antes, obj=nombre)
+    pd.testing.assert_frame_equal(df.loc[vista.index], antes)
+
+
+def test_congelar_no_copia_y_rechaza_escrituras(dataset):
+    df = dataset[0]
+    vista = congelar(df)
+
+    assert np.shares_memory(vista["ingreso_total"].to_numpy(), df["ingreso_total"].to_numpy())
+    with pytest.raises(ValueError, match="read-only"):
+        vista.loc[vista.index[0], "ingreso_total"] = -1.0
+    with pytest.raises(ValueError, match="read-only"):
+        vista["Categoria"].to_numpy()[0] = "otra"
+    assert df["ingreso_total"].iloc[0] != -1.0
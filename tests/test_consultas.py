@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+"""Validación de los argumentos de ``consultar_agregado`` (sandbox del asistente)."""
+import json
+
+import pandas as pd
+import pytest
+
+from src.asistente.consultas import ConsultaInvalida, MotorConsultas, normalizar_consulta
+
+
+@pytest.fixture
+def df():
+    return pd.DataFrame({
+        "Categoria": ["A", "A", "B"],
+        "Canal_Venta": ["Web", "Tienda", "Web"],
+        "ingreso_total": [10.0, 20.0, 5.0],
+    })
+
+
+def test_consultas_equivalentes_se_normalizan_igual():
+    a = normalizar_consulta({"metrica": "ingreso_total", "agregacion": "SUM",
+                             "agrupar_por": ["Categoria", "Categoria"]})
+    b = normalizar_consulta(json.dumps({"metrica": "ingreso_total",
+                                        "agrupar_por": "Categoria"}))
+    assert a == b
+
+
+@pytest.mark.parametrize("argumentos", [
+    {"metrica": "ingreso_total", "agrupar_por": [{"a": 1}]},
+    {"metrica": "ingreso_total", "agrupar_por": [["Categoria"]]},
+    {"metrica": "ingreso_total", "agrupar_por": 3},
+    {"metrica": ["ingreso_total"]},
+    {"metrica": "ingreso_total", "periodo": ["mes"]},
+    {"metrica": "ingreso_total", "filtros": 3},
+    {"metrica": "ingreso_total", "filtros": [{"columna": ["Categoria"], "operador": "==", "valor": "a"}]},
+    {"metrica": "ingreso_total", "filtros": [{"columna": "Categoria", "operador": {"x": 1}, "valor": "a"}]},
+    {"metrica": "ingreso_total", "filtros": [{"columna": "Categoria", "operador": "in", "valor": [{"a": 1}]}]},
+])
+def test_argumentos_no_hashables_son_consulta_invalida(argumentos, df):
+    with pytest.raises(ConsultaInvalida):
+        normalizar_consulta(argumentos)
+
+    motor = MotorConsultas()
+    assert "error" in motor.ejecutar(df, argumentos, clave_vista="v")
+    assert "error" in json.loads(
+        motor.ejecutar_herramienta(df, "consultar_agregado", json.dumps(argumentos)))
+
+
+def test_motor_agrega_y_cachea(df):
+    motor = MotorConsultas()
+    argumentos = {"metrica": "ingreso_total", "agrupar_por": ["Categoria"]}
+    primero = motor.ejecutar(df, argumentos, clave_vista="v")
+    assert motor.ejecutar(df, argumentos, clave_vista="v") is primero
+    assert motor.estadisticas()["aciertos"] == 1
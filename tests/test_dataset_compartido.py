@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""Publicación del dataset compartido: metadatos JSON y archivos solo del usuario."""
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+pytest.importorskip("pyarrow")
+
+from src import config, dataset_compartido
+
+
+@pytest.fixture
+def directorio(tmp_path, monkeypatch):
+    ruta = tmp_path / "dss"
+    monkeypatch.setattr(config, "DATASET_DIR", str(ruta))
+    return ruta
+
+
+def _df():
+    return pd.DataFrame({"SKU_ID": ["A", "B"], "Cantidad_Vendida": [1, 2]})
+
+
+def test_metadatos_viajan_como_json(directorio):
+    ruta = dataset_compartido.ruta_dataset("v1")
+    metadatos = {"health_scores": {"ventas": np.float64(0.5)}, "filas": np.int64(2)}
+    dataset_compartido.publicar(ruta, _df(), metadatos)
+
+    tabla, leidos = dataset_compartido.abrir(ruta)
+    assert leidos == {"health_scores": {"ventas": 0.5}, "filas": 2}
+    crudos = tabla.schema.metadata[dataset_compartido._CLAVE_METADATOS]
+    assert json.loads(crudos) == leidos
+    assert os.stat(directorio).st_mode & 0o777 == 0o700
+    assert os.stat(ruta).st_mode & 0o077 == 0
+
+
+def test_archivo_escribible_por_otros_no_se_abre(directorio):
+    ruta = dataset_compartido.ruta_dataset("v1")
+    dataset_compartido.publicar(ruta, _df(), {})
+    os.chmod(ruta, 0o666)
+    with pytest.raises(PermissionError):
+        dataset_compartido.abrir(ruta)
+
+    # obtener() descarta el archivo ajeno y reconstruye
+    df, metadatos = dataset_compartido.obtener("v1", lambda: (_df(), {"nuevo": True}))
+    assert metadatos == {"nuevo": True}
+    assert len(df) == 2
+
+
+def test_directorio_escribible_por_otros_no_se_usa(directorio):
+    os.makedirs(directorio)
+    os.chmod(directorio, 0o777)
+    with pytest.raises(PermissionError):
+        dataset_compartido.preparar_directorio()
+
+
+def test_anexos_ajenos_se_ignoran(directorio):
+    import pyarrow as pa
+
+    tablas = {"rutas": pa.table({"codigo": [0, 1]})}
+    dataset_compartido.publicar_anexos("v1", tablas, {"lotes": []})
+    tablas_leidas, metadatos = dataset_compartido.abrir_anexos("v1")
+    assert metadatos == {"lotes": []}
+    assert tablas_leidas["rutas"].equals(tablas["rutas"])
+
+    os.chmod(os.path.join(dataset_compartido.ruta_anexos("v1"), "rutas.arrow"), 0o666)
+    assert dataset_compartido.abrir_anexos("v1") is None
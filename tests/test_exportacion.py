@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+"""Exportación bajo demanda de la tabla maestra filtrada."""
+import io
+import subprocess
+import sys
+
+import pandas as pd
+import pytest
+
+from conftest import RAIZ
+from src import exportacion
+
+
+def test_formatos_disponibles_no_importa_los_escritores():
+    codigo = (
+        "import sys; from src import exportacion; "
+        "f = exportacion.formatos_disponibles(); "
+        "print(sorted(m for m in ('openpyxl', 'pyarrow.parquet') if m in sys.modules))"
+    )
+    salida = subprocess.run([sys.executable, "-c", codigo], cwd=RAIZ, check=True,
+                            capture_output=True, text=True).stdout
+    assert salida.strip() == "[]"
+
+
+@pytest.mark.parametrize("formato", exportacion.formatos_disponibles())
+def test_construir_en_bloques(formato):
+    df = pd.DataFrame({"SKU_ID": [f"S{i}" for i in range(5)],
+                       "ingreso_total": [1.5, 2.0, None, 4.0, 5.0],
+                       "Fecha_Venta": pd.to_datetime(["2024-01-0%d" % (i + 1) for i in range(5)])})
+    datos = exportacion.construir(formato, df, filas=2)
+
+    if formato.startswith("csv"):
+        leido = pd.read_csv(io.BytesIO(datos), compression="gzip" if formato == "csv.gz" else None,
+                            encoding="utf-8-sig", parse_dates=["Fecha_Venta"])
+    elif formato == "parquet":
+        leido = pd.read_parquet(io.BytesIO(datos))
+    else:
+        leido = pd.read_excel(io.BytesIO(datos), sheet_name="Datos")
+    pd.testing.assert_frame_equal(leido, df, check_dtype=False, check_datetimelike_compat=True)
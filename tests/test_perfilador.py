@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+"""Ciclo de vida de los reruns del perfilador de renders."""
+import pytest
+
+from src import config
+from src.ui import perfilador
+
+
+@pytest.fixture
+def perfil(monkeypatch):
+    monkeypatch.setattr(config, "PERFIL_RENDER", True)
+    monkeypatch.setattr(config, "PERFIL_MUESTREO", True)
+    monkeypatch.setattr(config, "PERFIL_INTERVALO_MS", 1)
+    historial = perfilador.HistorialPerfiles()
+    monkeypatch.setattr(perfilador, "historial_perfiles", lambda: historial)
+    yield historial
+    perfilador.finalizar_rerun()
+
+
+def _muestreador():
+    return perfilador._rerun_activo.get()._muestreador
+
+
+def test_rerun_interrumpido_se_cierra_al_iniciar_el_siguiente(perfil):
+    perfilador.iniciar_rerun()
+    with perfilador.medir("render_header"):
+        pass
+    anterior = _muestreador()
+    assert anterior.is_alive()
+
+    # Sin finalizar_rerun (p. ej. Streamlit interrumpió el script)
+    perfilador.iniciar_rerun()
+    assert not anterior.is_alive()
+    assert [f["funcion"] for f in perfil.reruns()[0]["funciones"]] == ["render_header"]
+    assert _muestreador() is not anterior
+
+    perfilador.finalizar_rerun()
+    assert len(perfil.reruns()) == 2
+    assert perfilador._rerun_activo.get() is None
+
+
+def test_finally_cierra_el_rerun_ante_una_interrupcion(perfil):
+    class Interrupcion(BaseException):
+        pass
+
+    perfilador.iniciar_rerun()
+    muestreador = _muestreador()
+    with pytest.raises(Interrupcion):
+        try:
+            with perfilador.medir("render_tabs"):
+                raise Interrupcion
+        finally:
+            perfilador.finalizar_rerun()
+    assert not muestreador.is_alive()
+    assert perfil.reruns()[0]["funciones"][0]["funcion"] == "render_tabs"
@@ -0,0 +1,18 @@
+# -*- coding: utf-8 -*-
+"""Nombres de archivo del lote de reportes segmentados."""
+from src.reportes_lote import _nombre_unico, _slug
+
+
+def test_slugs_repetidos_reciben_sufijo():
+    usados = set()
+    nombres = [
+        _nombre_unico(f"Reporte_{_slug('Bodega_Origen')}_{_slug(v)}", usados)
+        for v in ("Norte", "norte", "Zona Franca", "zona_franca", "NORTE")
+    ]
+    assert nombres == [
+        "Reporte_bodega_origen_norte",
+        "Reporte_bodega_origen_norte_2",
+        "Reporte_bodega_origen_zona_franca",
+        "Reporte_bodega_origen_zona_franca_2",
+        "Reporte_bodega_origen_norte_3",
+    ]
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""Dimensión de rutas, sketches de imputación e ingesta incremental de lotes."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from src import config, ingesta, rutas
+
+
+@pytest.fixture
+def observaciones():
+    rng = np.random.default_rng(3)
+    n = 5000
+    bodega = pd.Series(rng.choice(["Norte", "Sur", "Occidente", None], n))
+    ciudad = pd.Series(rng.choice(["Cali", "Bogotá", "Medellín", None], n))
+    # Valores repetidos (como los costos y tiempos reales) y algunos nulos
+    valores = pd.Series(np.round(rng.gamma(2.0, 30.0, n), 0))
+    valores[rng.random(n) < 0.1] = np.nan
+    return bodega, ciudad, valores
+
+
+def _esperado(codigos, valores, n_rutas, agregar):
+    validos = pd.Series(valores.to_numpy())[codigos != rutas.SIN_RUTA]
+    por_ruta = validos.groupby(codigos[codigos != rutas.SIN_RUTA])
+    return agregar(por_ruta).reindex(range(n_rutas)).to_numpy(dtype=float)
+
+
+def test_codigos_estables_al_agregar_rutas(observaciones):
+    bodega, ciudad, _ = observaciones
+    codigos, dimension = rutas.codificar(bodega[:100], ciudad[:100])
+    codigos_todo, dimension_todo = rutas.codificar(bodega, ciudad, dimension)
+
+    assert (codigos_todo[:100] == codigos).all()
+    pd.testing.assert_frame_equal(dimension_todo.iloc[:len(dimension)], dimension)
+    etiquetas = rutas.etiquetas(codigos_todo, dimension_todo)
+    sin_ruta = bodega.isna() | ciudad.isna()
+    assert pd.isna(etiquetas[sin_ruta.to_numpy()]).all()
+    assert (etiquetas[~sin_ruta.to_numpy()] == (bodega + "-" + ciudad)[~sin_ruta]).all()
+
+
+def test_medianas_y_cuantiles_como_groupby(observaciones):
+    bodega, ciudad, valores = observaciones
+    codigos, dimension = rutas.codificar(bodega, ciudad)
+    n = len(dimension)
+    sketch = rutas.sketch_ruta(codigos, valores)
+
+    np.testing.assert_array_equal(
+        rutas.medianas(sketch, n), _esperado(codigos, valores, n, lambda g: g.median()))
+    np.testing.assert_array_equal(
+        rutas.medianas(sketch, n), rutas.mediana_por_codigo(codigos, valores, n))
+    for q in (0.1, 0.25, 0.75, 0.9):
+        np.testing.assert_allclose(
+            rutas.cuantiles(sketch, n, q),
+            _esperado(codigos, valores, n, lambda g: g.quantile(q)), rtol=1e-12)
+
+
+def test_sumar_sketches_por_lotes_es_exacto(observaciones):
+    bodega, ciudad, valores = observaciones
+    codigos, dimension = rutas.codificar(bodega, ciudad)
+    sketch = None
+    for inicio in range(0, len(codigos), 1000):
+        parte = slice(inicio, inicio + 1000)
+        sketch = rutas.sumar(sketch, rutas.sketch_ruta(codigos[parte], valores[parte]),
+                             max_valores=10_000)
+
+    pd.testing.assert_series_equal(sketch, rutas.sketch_ruta(codigos, valores),
+                                   check_names=False, check_dtype=False)
+
+
+def test_compactar_conserva_conteos_y_aproxima_la_mediana(observaciones):
+    bodega, ciudad, valores = observaciones
+    codigos, dimension = rutas.codificar(bodega, ciudad)
+    n = len(dimension)
+    exacto = rutas.sketch_ruta(codigos, valores)
+    compacto = rutas.compactar(exacto, 20)
+
+    distintos = compacto.groupby(level="codigo").size()
+    assert (distintos <= 20).all()
+    pd.testing.assert_series_equal(compacto.groupby(level="codigo").sum(),
+                                   exacto.groupby(level="codigo").sum(), check_names=False)
+    # Cada centroide agrupa ~1/20 de las observaciones de la ruta.
+    medianas = rutas.medianas(exacto, n)
+    rango = _esperado(codigos, valores, n, lambda g: g.quantile(0.6) - g.quantile(0.4))
+    assert (np.abs(rutas.medianas(compacto, n) - medianas) <= rango).all()
+
+
+def test_cuantil_conteos_como_quantile():
+    serie = pd.Series(np.random.default_rng(5).integers(0, 40, 999).astype(float))
+    for q in (0.25, 0.5, 0.75):
+        assert ingesta.cuantil_conteos(serie.value_counts(), q) == serie.quantile(q)
+    assert ingesta.cuantil_conteos(pd.Series(dtype="int64"), 0.75) == 0
+
+
+# =====================================================================
+#  Lote incremental contra reconstrucción completa
+# =====================================================================
+
+def test_lote_igual_a_reconstruccion_completa(tmp_path, monkeypatch):
+    from src.data_loader import construir_dataset_dss
+    from src.sinteticos import (
+        ARCHIVO_FEEDBACK, ARCHIVO_INVENTARIO, ARCHIVO_TRANSACCIONES,
+        generar_datos_sinteticos,
+    )
+
+    monkeypatch.setattr(config, "RUTAS_VALORES_SKETCH", 1_000_000)
+    generar_datos_sinteticos(str(tmp_path), 3000, semilla=7)
+    inventario, feedback, transacciones = (
+        str(tmp_path / a) for a in (ARCHIVO_INVENTARIO, ARCHIVO_FEEDBACK, ARCHIVO_TRANSACCIONES))
+    crudo = pd.read_csv(transacciones)
+    ruta_base, ruta_lote = str(tmp_path / "base.csv"), str(tmp_path / "lote.csv")
+    crudo.iloc[:2500].to_csv(ruta_base, index=False)
+    crudo.iloc[2500:].to_csv(ruta_lote, index=False)
+
+    estado = {}
+    construir_dataset_dss(inventario, feedback, ruta_base, motor="pandas", estado_ingesta=estado)
+    df_lote, _, estado, _, _ = ingesta.procesar_lote(ruta_lote, "lote", estado)
+    completo, _, _ = construir_dataset_dss(
+        inventario, feedback, transacciones, motor="pandas")
+
+    ids_lote = set(crudo.iloc[2500:]["Transaccion_ID"].str.lower())
+    esperado = completo[completo["Transaccion_ID"].isin(ids_lote)].reset_index(drop=True)
+    assert len(esperado) == 500
+    pd.testing.assert_frame_equal(df_lote.reset_index(drop=True)[esperado.columns], esperado)
+    assert estado["lotes"] == ["lote"]
+
+    # El mismo lote no se ingiere dos veces
+    assert ingesta.procesar_lote(ruta_lote, "lote", estado)[0] is None